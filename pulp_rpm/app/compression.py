@@ -0,0 +1,352 @@
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from gettext import gettext as _
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from pulp_rpm.app.constants import COMPRESSION_SUFFIXES, COMPRESSION_TYPES
+
+# Size of the blocks compressed as separate gzip members
+GZIP_BLOCK_SIZE = 4 * 1024 * 1024
+GZIP_THREADS = min(os.cpu_count() or 1, 8)
+
+READ_SIZE = 1024 * 1024
+
+ZCHUNK_MAGIC = b'\x00ZCK1'
+# Sizes of the header digests by zchunk hash type: SHA-1, SHA-256, SHA-512 and SHA-512/128
+ZCHUNK_DIGEST_SIZES = {0: 20, 1: 32, 2: 64, 3: 16}
+
+
+def available_compression_types():
+    """
+    Get the compression types which can be used.
+
+    Returns:
+        list: the compression types, zstd only if the zstandard package is installed
+
+    """
+    return [
+        compression for compression in COMPRESSION_SUFFIXES
+        if compression != COMPRESSION_TYPES.ZSTD or zstandard is not None
+    ]
+
+
+def compression_type(path):
+    """
+    Get the compression type of a file from its name.
+
+    Args:
+        path (str): the name or path of the file
+
+    Returns:
+        str: the compression type, None if the file isn't compressed
+
+    """
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def open_compressed(fileobj, compression):
+    """
+    Open a compressed file for reading text.
+
+    Args:
+        fileobj (file): the compressed file, opened in binary mode
+        compression (str): the compression type, None if the file isn't compressed
+
+    Returns:
+        file: the uncompressed file, opened in text mode
+
+    """
+    if compression == COMPRESSION_TYPES.GZ:
+        stream = gzip.open(fileobj, 'rb')
+    elif compression == COMPRESSION_TYPES.BZ2:
+        stream = bz2.open(fileobj, 'rb')
+    elif compression == COMPRESSION_TYPES.XZ:
+        stream = lzma.open(fileobj, 'rb')
+    elif compression == COMPRESSION_TYPES.ZSTD:
+        stream = zstandard.ZstdDecompressor().stream_reader(fileobj)
+    else:
+        stream = fileobj
+    return io.TextIOWrapper(stream, encoding='utf-8')
+
+
+class HashingWriter:
+    """
+    A binary file which computes the checksum and size of what is written to it.
+    """
+
+    def __init__(self, fileobj):
+        """
+        Wrap a file.
+
+        Args:
+            fileobj (file): the file to write to, opened in binary mode
+
+        """
+        self.fileobj = fileobj
+        self.checksum = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        """
+        Write data to the file.
+
+        Args:
+            data (bytes): the data to write
+
+        Returns:
+            int: the number of bytes written
+
+        """
+        self.checksum.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        """
+        Flush the file.
+        """
+        self.fileobj.flush()
+
+    def close(self):
+        """
+        Flush the file, it is closed by whoever opened it.
+        """
+        self.fileobj.flush()
+
+
+def _read_blocks(path, size, checksum):
+    """
+    Read a file in blocks, computing its checksum.
+
+    Args:
+        path (str): the path of the file
+        size (int): the size of the blocks
+        checksum (hashlib.sha256): the checksum to update
+
+    Yields:
+        bytes: the blocks of the file
+
+    """
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(size), b''):
+            checksum.update(block)
+            yield block
+
+
+def _compress_gzip(blocks, target, level):
+    """
+    Compress blocks of a file as gzip members in parallel.
+
+    The members are concatenated, which is a valid gzip file for all the gzip readers used by
+    yum and dnf. zlib releases the GIL while compressing, so threads are enough.
+
+    Args:
+        blocks (iterable): the blocks of the file to compress
+        target (HashingWriter): the compressed file
+        level (int): the compression level
+
+    """
+    with ThreadPoolExecutor(GZIP_THREADS) as executor:
+        pending = deque()
+        for block in blocks:
+            pending.append(executor.submit(gzip.compress, block, level))
+            # keep a bounded number of blocks in memory
+            if len(pending) > GZIP_THREADS * 2:
+                target.write(pending.popleft().result())
+        while pending:
+            target.write(pending.popleft().result())
+
+
+def compress_file(path, compression, level=None):
+    """
+    Compress a file, the uncompressed file is removed.
+
+    Args:
+        path (str): the path of the file to compress
+        compression (str): the compression type
+
+    Keyword Args:
+        level (int): the compression level, the default one of the compression type if None
+
+    Returns:
+        dict: the path of the compressed file and the checksums and sizes of both files, under
+            the names of the RepomdRecord fields
+
+    Raises:
+        ValueError: if the compression type is not available
+
+    """
+    if compression not in available_compression_types():
+        raise ValueError(_('Compression type {compression} is not available').format(
+            compression=compression))
+
+    compressed_path = path + COMPRESSION_SUFFIXES[compression]
+    open_checksum = hashlib.sha256()
+
+    with open(compressed_path, 'wb') as raw_target:
+        target = HashingWriter(raw_target)
+        if compression == COMPRESSION_TYPES.GZ:
+            blocks = _read_blocks(path, GZIP_BLOCK_SIZE, open_checksum)
+            _compress_gzip(blocks, target, 6 if level is None else level)
+        else:
+            if compression == COMPRESSION_TYPES.BZ2:
+                compressed = bz2.open(target, 'wb', compresslevel=9 if level is None else level)
+            elif compression == COMPRESSION_TYPES.XZ:
+                compressed = lzma.open(target, 'wb', preset=level)
+            else:
+                compressor = zstandard.ZstdCompressor(level=3 if level is None else level,
+                                                      threads=-1)
+                compressed = compressor.stream_writer(target)
+            with compressed:
+                for block in _read_blocks(path, READ_SIZE, open_checksum):
+                    compressed.write(block)
+
+    open_size = os.path.getsize(path)
+    os.remove(path)
+    return {
+        'path': compressed_path,
+        'checksum': target.checksum.hexdigest(),
+        'size': target.size,
+        'checksum_open': open_checksum.hexdigest(),
+        'size_open': open_size,
+    }
+
+
+def zchunk_available():
+    """
+    Check whether zchunk files can be created.
+
+    Returns:
+        bool: whether the zck tool of zchunk is installed
+
+    """
+    return shutil.which('zck') is not None
+
+
+def _file_checksum(path):
+    """
+    Compute the checksum and size of a file.
+
+    Args:
+        path (str): the path of the file
+
+    Returns:
+        tuple: the sha256 hex digest and the size of the file
+
+    """
+    checksum = hashlib.sha256()
+    for block in _read_blocks(path, READ_SIZE, checksum):
+        pass
+    return checksum.hexdigest(), os.path.getsize(path)
+
+
+def _read_compressed_int(data, offset):
+    """
+    Read an integer in the variable length format of zchunk.
+
+    Each byte holds 7 bits of the integer, starting with the lowest ones, the highest bit is set
+    on its last byte.
+
+    Args:
+        data (bytes): the data to read from
+        offset (int): the position of the integer
+
+    Returns:
+        tuple: the integer and the position after it
+
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def zchunk_header(path):
+    """
+    Compute the checksum and size of the header of a zchunk file.
+
+    Clients download the header first to find out which chunks they already have, so it is
+    described in repomd.xml as well.
+
+    Args:
+        path (str): the path of the zchunk file
+
+    Returns:
+        tuple: the sha256 hex digest and the size of the header, including the lead
+
+    Raises:
+        ValueError: if the file is not a zchunk file
+
+    """
+    with open(path, 'rb') as zchunk_file:
+        lead = zchunk_file.read(len(ZCHUNK_MAGIC) + 20)
+        if not lead.startswith(ZCHUNK_MAGIC):
+            raise ValueError(_('{path} is not a zchunk file').format(path=path))
+        hash_type, offset = _read_compressed_int(lead, len(ZCHUNK_MAGIC))
+        header_size, offset = _read_compressed_int(lead, offset)
+        size = offset + ZCHUNK_DIGEST_SIZES[hash_type] + header_size
+
+        zchunk_file.seek(0)
+        header = zchunk_file.read(size)
+    return hashlib.sha256(header).hexdigest(), size
+
+
+def compress_zchunk(path, split):
+    """
+    Compress a file with zchunk, the uncompressed file is kept.
+
+    A new chunk is started at each occurrence of the split string, so the same content always
+    ends up in the same chunk, whatever comes before or after it.
+
+    Args:
+        path (str): the path of the file to compress
+        split (str): the string the chunks start with
+
+    Returns:
+        dict: the path of the compressed file and the checksums and sizes of both files and of
+            the zchunk header, under the names of the RepomdRecord fields
+
+    Raises:
+        ValueError: if zck fails
+
+    """
+    compressed_path = path + '.zck'
+    process = subprocess.run(['zck', '--manual', '--split', split, '-o', compressed_path, path],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True)
+    if process.returncode:
+        raise ValueError(_('zchunk compression of {path} failed: {error}').format(
+            path=path, error=process.stdout.strip()))
+
+    checksum, size = _file_checksum(compressed_path)
+    checksum_open, size_open = _file_checksum(path)
+    checksum_header, size_header = zchunk_header(compressed_path)
+    return {
+        'path': compressed_path,
+        'checksum': checksum,
+        'size': size,
+        'checksum_open': checksum_open,
+        'size_open': size_open,
+        'checksum_header': checksum_header,
+        'size_header': size_header,
+    }
@@ -72,9 +72,80 @@ CR_PACKAGE_ATTRS = SimpleNamespace(
     VERSION='version'
 )
 
+SIGNATURE_POLICIES = SimpleNamespace(
+    REJECT='reject',
+    WARN='warn'
+)
+
+SIGNATURE_POLICY_CHOICES = (
+    (SIGNATURE_POLICIES.REJECT, SIGNATURE_POLICIES.REJECT),
+    (SIGNATURE_POLICIES.WARN, SIGNATURE_POLICIES.WARN)
+)
+
+# Results of a package signature check
+SIGNATURE_STATUSES = SimpleNamespace(
+    SIGNED='signed',
+    UNSIGNED='unsigned',
+    BAD_SIGNATURE='bad signature'
+)
+
+CAPABILITY_KINDS = SimpleNamespace(
+    PROVIDES='provides',
+    REQUIRES='requires',
+    FILE='file'
+)
+
+CAPABILITY_KIND_CHOICES = (
+    (CAPABILITY_KINDS.PROVIDES, CAPABILITY_KINDS.PROVIDES),
+    (CAPABILITY_KINDS.REQUIRES, CAPABILITY_KINDS.REQUIRES),
+    (CAPABILITY_KINDS.FILE, CAPABILITY_KINDS.FILE)
+)
+
+# Location of a package in its pre-rendered primary XML, replaced when it is published
+LOCATION_HREF_PLACEHOLDER = 'PULP_RPM_LOCATION_HREF'
+
+# Compression of the published metadata files
+COMPRESSION_TYPES = SimpleNamespace(
+    GZ='gz',
+    BZ2='bz2',
+    XZ='xz',
+    ZSTD='zstd'
+)
+
+COMPRESSION_CHOICES = (
+    (COMPRESSION_TYPES.GZ, COMPRESSION_TYPES.GZ),
+    (COMPRESSION_TYPES.BZ2, COMPRESSION_TYPES.BZ2),
+    (COMPRESSION_TYPES.XZ, COMPRESSION_TYPES.XZ),
+    (COMPRESSION_TYPES.ZSTD, COMPRESSION_TYPES.ZSTD)
+)
+
+COMPRESSION_SUFFIXES = {
+    COMPRESSION_TYPES.GZ: '.gz',
+    COMPRESSION_TYPES.BZ2: '.bz2',
+    COMPRESSION_TYPES.XZ: '.xz',
+    COMPRESSION_TYPES.ZSTD: '.zst',
+}
+
+# Lowest and highest compression level of each compression type
+COMPRESSION_LEVELS = {
+    COMPRESSION_TYPES.GZ: (1, 9),
+    COMPRESSION_TYPES.BZ2: (1, 9),
+    COMPRESSION_TYPES.XZ: (0, 9),
+    COMPRESSION_TYPES.ZSTD: (1, 22),
+}
+
 PACKAGE_REPODATA = ['primary', 'filelists', 'other']
 UPDATE_REPODATA = ['updateinfo']
 
+# repomd.xml and its optional detached signature and key, kept as-is when mirroring
+REPOMD_DATA_TYPE = 'repomd'
+# the treeinfo file of a kickstart tree, kept as-is when mirroring
+TREEINFO_DATA_TYPE = 'treeinfo'
+REPOMD_SIGNATURE_FILES = {
+    'repomd_asc': 'repodata/repomd.xml.asc',
+    'repomd_key': 'repodata/repomd.xml.key',
+}
+
 CR_UPDATE_RECORD_ATTRS = SimpleNamespace(
     ID='id',
     UPDATED_DATE='updated_date',
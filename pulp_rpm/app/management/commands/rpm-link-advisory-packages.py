@@ -0,0 +1,23 @@
+from gettext import gettext as _
+
+from django.core.management import BaseCommand
+
+from pulp_rpm.app.models import Package
+from pulp_rpm.app.tasks.linking import link_batches
+
+
+class Command(BaseCommand):
+    """
+    Django management command for linking the packages of existing advisories.
+    """
+
+    help = _('Link the packages of the advisories to the packages with the same checksum. '
+             'Advisories synced before the links existed are only linked by this command, or '
+             'by a sync adding the packages they refer to.')
+
+    def handle(self, *args, **options):
+        """
+        Link the packages of the advisories to all the packages.
+        """
+        total = sum(link_batches(Package.objects.all()))
+        self.stdout.write(_('Linked {count} advisory packages').format(count=total))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2019-09-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0003_repometadatafile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmremote',
+            name='verify_headers',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.5 on 2019-09-19 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0004_rpmremote_verify_headers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmremote',
+            name='gpgkey',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rpmremote',
+            name='signature_policy',
+            field=models.CharField(choices=[('reject', 'reject'), ('warn', 'warn')], default='reject', max_length=10),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.5 on 2019-09-20 09:41
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0005_rpmremote_signatures'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='package',
+            name='conflicts',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='enhances',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='obsoletes',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='provides',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='recommends',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='requires',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='suggests',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='supplements',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list),
+        ),
+    ]
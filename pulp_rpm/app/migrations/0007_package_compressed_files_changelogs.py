@@ -0,0 +1,63 @@
+# Generated by Django 2.2.5 on 2019-09-20 14:12
+
+import json
+
+from django.db import migrations
+
+import pulp_rpm.app.model_fields
+
+
+def compress_files_and_changelogs(apps, schema_editor):
+    """
+    Copy the JSON encoded files and changelogs of packages to the compressed fields.
+    """
+    Package = apps.get_model('rpm', 'Package')
+    batch = []
+    packages = Package.objects.only('pk', 'files', 'changelogs').iterator(chunk_size=500)
+    for package in packages:
+        package.files_compressed = json.loads(package.files)
+        package.changelogs_compressed = json.loads(package.changelogs)
+        batch.append(package)
+        if len(batch) == 500:
+            Package.objects.bulk_update(batch, ['files_compressed', 'changelogs_compressed'])
+            batch = []
+    Package.objects.bulk_update(batch, ['files_compressed', 'changelogs_compressed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0006_package_dependencies_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='changelogs_compressed',
+            field=pulp_rpm.app.model_fields.CompressedJSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='files_compressed',
+            field=pulp_rpm.app.model_fields.CompressedJSONField(default=list),
+        ),
+        migrations.RunPython(compress_files_and_changelogs, elidable=True),
+        migrations.RemoveField(
+            model_name='package',
+            name='changelogs',
+        ),
+        migrations.RemoveField(
+            model_name='package',
+            name='files',
+        ),
+        migrations.RenameField(
+            model_name='package',
+            old_name='changelogs_compressed',
+            new_name='changelogs',
+        ),
+        migrations.RenameField(
+            model_name='package',
+            old_name='files_compressed',
+            new_name='files',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2019-09-23 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0007_package_compressed_files_changelogs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='changelog_limit',
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
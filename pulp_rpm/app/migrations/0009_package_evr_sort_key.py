@@ -0,0 +1,41 @@
+# Generated by Django 2.2.5 on 2019-09-24 08:30
+
+from django.db import migrations, models
+
+from pulp_rpm.app.rpm_version import evr_sort_key
+
+
+def compute_evr_sort_keys(apps, schema_editor):
+    """
+    Compute the EVR sort key of the existing packages.
+    """
+    Package = apps.get_model('rpm', 'Package')
+    batch = []
+    packages = Package.objects.only('pk', 'epoch', 'version', 'release').iterator(chunk_size=1000)
+    for package in packages:
+        package.evr_sort_key = evr_sort_key(package.epoch, package.version, package.release)
+        batch.append(package)
+        if len(batch) == 1000:
+            Package.objects.bulk_update(batch, ['evr_sort_key'])
+            batch = []
+    Package.objects.bulk_update(batch, ['evr_sort_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0008_changelog_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='evr_sort_key',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(compute_evr_sort_keys, elidable=True),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['name', 'arch', 'evr_sort_key'], name='rpm_package_evr_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.5 on 2019-09-25 11:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def create_capabilities(apps, schema_editor):
+    """
+    Create the capabilities of the existing packages.
+    """
+    Package = apps.get_model('rpm', 'Package')
+    PackageCapability = apps.get_model('rpm', 'PackageCapability')
+    capabilities = []
+    packages = Package.objects.only('pk', 'provides', 'requires', 'files').iterator(chunk_size=500)
+    for package in packages:
+        names = {
+            'provides': {provide[0] for provide in package.provides},
+            'requires': {require[0] for require in package.requires},
+            'file': {file[1] + file[2] for file in package.files},
+        }
+        for kind, kind_names in names.items():
+            capabilities.extend(
+                PackageCapability(kind=kind, name=name, package=package) for name in kind_names
+            )
+        if len(capabilities) >= 10000:
+            PackageCapability.objects.bulk_create(capabilities, batch_size=1000)
+            capabilities = []
+    PackageCapability.objects.bulk_create(capabilities, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0009_package_evr_sort_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageCapability',
+            fields=[
+                ('_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('_created', models.DateTimeField(auto_now_add=True)),
+                ('_last_updated', models.DateTimeField(auto_now=True, null=True)),
+                ('kind', models.CharField(choices=[('provides', 'provides'), ('requires', 'requires'), ('file', 'file')], max_length=10)),
+                ('name', models.TextField()),
+                ('package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capabilities', to='rpm.Package')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='packagecapability',
+            index=models.Index(fields=['kind', 'name'], name='rpm_capability_kind_name_idx'),
+        ),
+        migrations.RunPython(create_capabilities, elidable=True),
+    ]
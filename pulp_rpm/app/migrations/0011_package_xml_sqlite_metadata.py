@@ -0,0 +1,35 @@
+# Generated by Django 2.2.5 on 2019-09-26 13:48
+
+from django.db import migrations, models
+
+import pulp_rpm.app.model_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0010_packagecapability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='filelists_xml',
+            field=pulp_rpm.app.model_fields.CompressedTextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='other_xml',
+            field=pulp_rpm.app.model_fields.CompressedTextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='primary_xml',
+            field=pulp_rpm.app.model_fields.CompressedTextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='sqlite_metadata',
+            field=models.BooleanField(default=True),
+        ),
+    ]
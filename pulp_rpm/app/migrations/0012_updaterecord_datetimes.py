@@ -0,0 +1,95 @@
+# Generated by Django 2.2.5 on 2019-09-27 09:02
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import dateparse, timezone
+
+
+def parse_date(date):
+    """
+    Parse a date stored as text, in any of the formats of upstream updateinfo.xml files.
+
+    They are "%Y-%m-%d %H:%M:%S", "%Y-%m-%d" or seconds since the epoch, in UTC. Empty and
+    unparsable values, including the "None" stored for missing dates, are None.
+    """
+    date = (date or '').strip()
+    if date.isdigit():
+        return datetime.fromtimestamp(int(date), timezone.utc)
+    try:
+        parsed = dateparse.parse_datetime(date)
+        if parsed is None:
+            day = dateparse.parse_date(date)
+            if day is not None:
+                parsed = datetime(day.year, day.month, day.day)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def parse_dates(apps, schema_editor):
+    """
+    Parse the issued and updated dates of the existing update records.
+    """
+    UpdateRecord = apps.get_model('rpm', 'UpdateRecord')
+    batch = []
+    records = UpdateRecord.objects.only('pk', 'issued_date', 'updated_date').iterator(chunk_size=1000)
+    for record in records:
+        record.issued = parse_date(record.issued_date)
+        record.updated = parse_date(record.updated_date)
+        batch.append(record)
+        if len(batch) == 1000:
+            UpdateRecord.objects.bulk_update(batch, ['issued', 'updated'])
+            batch = []
+    UpdateRecord.objects.bulk_update(batch, ['issued', 'updated'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0011_package_xml_sqlite_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updaterecord',
+            name='issued',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='updaterecord',
+            name='updated',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(parse_dates, elidable=True),
+        migrations.RemoveField(
+            model_name='updaterecord',
+            name='issued_date',
+        ),
+        migrations.RemoveField(
+            model_name='updaterecord',
+            name='updated_date',
+        ),
+        migrations.RenameField(
+            model_name='updaterecord',
+            old_name='issued',
+            new_name='issued_date',
+        ),
+        migrations.RenameField(
+            model_name='updaterecord',
+            old_name='updated',
+            new_name='updated_date',
+        ),
+        migrations.AlterField(
+            model_name='updaterecord',
+            name='issued_date',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='updaterecord',
+            name='updated_date',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.5 on 2019-09-27 15:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0012_updaterecord_datetimes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updatecollectionpackage',
+            name='package',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='update_collection_packages', to='rpm.Package'),
+        ),
+    ]
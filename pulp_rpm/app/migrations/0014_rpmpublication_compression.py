@@ -0,0 +1,33 @@
+# Generated by Django 2.2.5 on 2019-09-30 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0013_updatecollectionpackage_package'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='metadata_compression_level',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='metadata_compression',
+            field=models.CharField(choices=[('gz', 'gz'), ('bz2', 'bz2'), ('xz', 'xz'), ('zstd', 'zstd')], default='gz', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='sqlite_compression',
+            field=models.CharField(choices=[('gz', 'gz'), ('bz2', 'bz2'), ('xz', 'xz'), ('zstd', 'zstd')], default='bz2', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='sqlite_compression_level',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+    ]
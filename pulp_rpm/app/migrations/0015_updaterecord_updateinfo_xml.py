@@ -0,0 +1,19 @@
+# Generated by Django 2.2.5 on 2019-09-30 14:48
+
+from django.db import migrations
+import pulp_rpm.app.model_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0014_rpmpublication_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updaterecord',
+            name='updateinfo_xml',
+            field=pulp_rpm.app.model_fields.CompressedTextField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2019-10-01 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0015_updaterecord_updateinfo_xml'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='zchunk_metadata',
+            field=models.BooleanField(default=False),
+        ),
+    ]
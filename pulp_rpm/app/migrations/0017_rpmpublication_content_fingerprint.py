@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2019-10-01 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rpm', '0016_rpmpublication_zchunk_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rpmpublication',
+            name='content_fingerprint',
+            field=models.CharField(db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,131 @@
+import json
+import zlib
+
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    A model field storing a text as compressed UTF-8.
+
+    It is meant for big values which are only loaded and stored as a whole, like the XML
+    rendered for a package. The value is compressed when it is saved, and decompressed when a
+    row is loaded, so the model attribute holds the plain text.
+    """
+
+    def __init__(self, *args, compression_level=6, **kwargs):
+        """
+        Initialize the field.
+
+        Keyword Args:
+            compression_level(int): zlib compression level, from 1 (fastest) to 9 (smallest)
+
+        """
+        self.compression_level = compression_level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        """
+        Return the arguments of the field for migrations.
+        """
+        name, path, args, kwargs = super().deconstruct()
+        if self.compression_level != 6:
+            kwargs['compression_level'] = self.compression_level
+        return name, path, args, kwargs
+
+    def decompress(self, value):
+        """
+        Decode a value stored by the field.
+
+        Args:
+            value(bytes): the compressed value
+
+        Returns:
+            the decoded value
+
+        """
+        return zlib.decompress(value).decode('utf-8')
+
+    def compress(self, value):
+        """
+        Encode and compress a value to be stored.
+
+        Args:
+            value: the value to store
+
+        Returns:
+            bytes: the compressed value
+
+        """
+        return zlib.compress(value.encode('utf-8'), self.compression_level)
+
+    def from_db_value(self, value, expression, connection):
+        """
+        Decode a value loaded from the database.
+        """
+        if value is None:
+            return value
+        return self.decompress(value)
+
+    def to_python(self, value):
+        """
+        Decode a value if it is still compressed.
+        """
+        if isinstance(value, (bytes, memoryview)):
+            return self.decompress(value)
+        return value
+
+    def get_prep_value(self, value):
+        """
+        Compress a value to be stored.
+        """
+        if value is None:
+            return value
+        return self.compress(value)
+
+    def value_to_string(self, obj):
+        """
+        Serialize the value as text.
+        """
+        return self.value_from_object(obj)
+
+
+class CompressedJSONField(CompressedTextField):
+    """
+    A model field storing a JSON serializable value as compressed JSON.
+
+    Like the files and the changelogs of a package. The value is encoded when it is saved and
+    decoded when a row is loaded, so the model attribute holds the plain value.
+    """
+
+    def decompress(self, value):
+        """
+        Decode a value stored by the field.
+
+        Args:
+            value(bytes): compressed JSON
+
+        Returns:
+            the decoded value
+
+        """
+        return json.loads(super().decompress(value))
+
+    def compress(self, value):
+        """
+        Encode and compress a value to be stored.
+
+        Args:
+            value: a JSON serializable value
+
+        Returns:
+            bytes: the compressed JSON
+
+        """
+        return super().compress(json.dumps(value))
+
+    def value_to_string(self, obj):
+        """
+        Serialize the value as JSON.
+        """
+        return json.dumps(self.value_from_object(obj))
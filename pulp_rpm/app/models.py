@@ -1,9 +1,12 @@
 import json
 from logging import getLogger
+from xml.sax.saxutils import escape
 
 import createrepo_c as cr
 
+from django.contrib.postgres.fields import JSONField
 from django.db import models
+from django.utils import timezone
 from pulpcore.plugin.models import (
     Content,
     ContentArtifact,
@@ -14,7 +17,10 @@ from pulpcore.plugin.models import (
     PublicationDistribution
 )
 
-from pulp_rpm.app.constants import (CHECKSUM_CHOICES, CR_PACKAGE_ATTRS,
+from pulp_rpm.app.constants import (CAPABILITY_KIND_CHOICES, CAPABILITY_KINDS,
+                                    CHECKSUM_CHOICES, COMPRESSION_CHOICES,
+                                    COMPRESSION_TYPES, CR_PACKAGE_ATTRS,
+                                    LOCATION_HREF_PLACEHOLDER,
                                     CR_UPDATE_COLLECTION_ATTRS,
                                     CR_UPDATE_COLLECTION_PACKAGE_ATTRS,
                                     CR_UPDATE_RECORD_ATTRS,
@@ -25,8 +31,12 @@ from pulp_rpm.app.constants import (CHECKSUM_CHOICES, CR_PACKAGE_ATTRS,
                                     PULP_UPDATE_COLLECTION_ATTRS_MODULE,
                                     PULP_UPDATE_COLLECTION_PACKAGE_ATTRS,
                                     PULP_UPDATE_RECORD_ATTRS,
-                                    PULP_UPDATE_REFERENCE_ATTRS
+                                    PULP_UPDATE_REFERENCE_ATTRS,
+                                    SIGNATURE_POLICIES,
+                                    SIGNATURE_POLICY_CHOICES
                                     )
+from pulp_rpm.app.model_fields import CompressedJSONField, CompressedTextField
+from pulp_rpm.app.rpm_version import evr_sort_key
 
 log = getLogger(__name__)
 
@@ -67,26 +77,26 @@ class Package(Content):
             URL with more information about the packaged software. This could be the project's
             website or its code repository.
 
-        changelogs (Text):
+        changelogs (Binary):
             Changelogs that package contains - see comments below
-        files (Text):
+        files (Binary):
             Files that package contains - see comments below
 
-        requires (Text):
+        requires (JSON):
             Capabilities the package requires - see comments below
-        provides (Text):
+        provides (JSON):
             Capabilities the package provides - see comments below
-        conflicts (Text):
+        conflicts (JSON):
             Capabilities the package conflicts with - see comments below
-        obsoletes (Text):
+        obsoletes (JSON):
             Capabilities the package obsoletes - see comments below
-        suggests (Text):
+        suggests (JSON):
             Capabilities the package suggests - see comments below
-        enhances (Text):
+        enhances (JSON):
             Capabilities the package enhances - see comments below
-        recommends (Text):
+        recommends (JSON):
             Capabilities the package recommends - see comments below
-        supplements (Text):
+        supplements (JSON):
             Capabilities the package supplements - see comments below
 
         location_base (Text):
@@ -125,6 +135,16 @@ class Package(Content):
         time_file (BigInteger):
             The mtime of the package file in seconds since the epoch; this is the 'file' time
             attribute in the primary XML.
+
+        evr_sort_key (Binary):
+            Sort key of the epoch, version and release of the package
+
+        primary_xml (Binary):
+            The package entry of primary.xml, without the location of the package
+        filelists_xml (Binary):
+            The package entry of filelists.xml
+        other_xml (Binary):
+            The package entry of other.xml
     """
 
     TYPE = 'package'
@@ -144,24 +164,24 @@ class Package(Content):
     description = models.TextField()
     url = models.TextField()
 
-    # A string containing a JSON-encoded list of dictionaries, each of which represents a single
-    # changelog. Each changelog dict contains the following fields:
+    # A list of lists, each of which represents a single changelog, stored as compressed JSON.
+    # Each changelog list contains the following fields:
     #
-    #   date (int):     date of changelog - seconds since epoch
     #   author (str):   author of the changelog
+    #   date (int):     date of changelog - seconds since epoch
     #   changelog (str: changelog text
-    changelogs = models.TextField(default='[]')
+    changelogs = CompressedJSONField(default=list)
 
-    # A string containing a JSON-encoded list of dictionaries, each of which represents a single
-    # file. Each file dict contains the following fields:
+    # A list of lists, each of which represents a single file, stored as compressed JSON.
+    # Each file list contains the following fields:
     #
     #   type (str):     one of "" (regular file), "dir", "ghost"
     #   path (str):     path to file
     #   name (str):     filename
-    files = models.TextField(default='[]')
+    files = CompressedJSONField(default=list)
 
-    # Each of these is a string containing a JSON-encoded list of dictionaries, each of which
-    # represents a dependency. Each dependency dict contains the following fields:
+    # Each of these is a JSON list of lists, each of which represents a dependency in the
+    # createrepo_c format. Each dependency list contains the following fields:
     #
     #   name (str):     name
     #   flags (str):    flags
@@ -169,14 +189,14 @@ class Package(Content):
     #   version (str):  version
     #   release (str):  release
     #   pre (bool):     preinstall
-    requires = models.TextField(default='[]')
-    provides = models.TextField(default='[]')
-    conflicts = models.TextField(default='[]')
-    obsoletes = models.TextField(default='[]')
-    suggests = models.TextField(default='[]')
-    enhances = models.TextField(default='[]')
-    recommends = models.TextField(default='[]')
-    supplements = models.TextField(default='[]')
+    requires = JSONField(default=list)
+    provides = JSONField(default=list)
+    conflicts = JSONField(default=list)
+    obsoletes = JSONField(default=list)
+    suggests = JSONField(default=list)
+    enhances = JSONField(default=list)
+    recommends = JSONField(default=list)
+    supplements = JSONField(default=list)
 
     location_base = models.TextField()
     location_href = models.TextField()
@@ -199,6 +219,24 @@ class Package(Content):
     time_build = models.BigIntegerField(null=True)
     time_file = models.BigIntegerField(null=True)
 
+    # The fields the other XML of a package is rendered from.
+    OTHER_XML_FIELDS = (
+        PULP_PACKAGE_ATTRS.PKGID, PULP_PACKAGE_ATTRS.NAME, PULP_PACKAGE_ATTRS.ARCH,
+        PULP_PACKAGE_ATTRS.EPOCH, PULP_PACKAGE_ATTRS.VERSION, PULP_PACKAGE_ATTRS.RELEASE,
+        PULP_PACKAGE_ATTRS.CHANGELOGS,
+    )
+
+    # Computed from epoch, version and release, see `pulp_rpm.app.rpm_version.evr_sort_key`.
+    # Keys of packages compare like rpm compares their EVRs, so packages can be ordered by it.
+    evr_sort_key = models.BinaryField(default=b'')
+
+    # The primary, filelists and other XML of the package rendered by createrepo_c, so they
+    # don't need to be rendered again on every publish. The location of the package in the
+    # primary XML is the LOCATION_HREF_PLACEHOLDER, see `primary_xml_at`.
+    primary_xml = CompressedTextField(null=True)
+    filelists_xml = CompressedTextField(null=True)
+    other_xml = CompressedTextField(null=True)
+
     @property
     def filename(self):
         """
@@ -227,12 +265,151 @@ class Package(Content):
         unique_together = (
             'name', 'epoch', 'version', 'release', 'arch', 'checksum_type', 'pkgId'
         )
+        indexes = [
+            models.Index(fields=['name', 'arch', 'evr_sort_key'], name='rpm_package_evr_sort_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Compute the EVR sort key, render the XML of the package if needed and save it.
+        """
+        self.evr_sort_key = evr_sort_key(self.epoch, self.version, self.release)
+        if self.primary_xml is None:
+            self.render_xml()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def createrepo_c_packages(cls, queryset, changelog_limit=None, chunk_size=500):
+        """
+        Convert the packages of a queryset to createrepo_c package objects in bulk.
+
+        Unlike `to_createrepo_c`, no model instances are created. The fields are streamed from
+        the database as tuples in chunks and set on the createrepo_c packages through a list of
+        accessors which is computed once.
+
+        Args:
+            queryset(django.db.models.QuerySet): packages to convert
+
+        Keyword Args:
+            changelog_limit(int): number of the newest changelogs to keep, all if None
+            chunk_size(int): number of rows fetched from the database at once
+
+        Yields:
+            tuple: the pk of a package and the package as a createrepo_c package object, in the
+                order of the queryset
+
+        """
+        list_attrs = {
+            PULP_PACKAGE_ATTRS.CHANGELOGS, PULP_PACKAGE_ATTRS.CONFLICTS,
+            PULP_PACKAGE_ATTRS.ENHANCES, PULP_PACKAGE_ATTRS.FILES, PULP_PACKAGE_ATTRS.OBSOLETES,
+            PULP_PACKAGE_ATTRS.PROVIDES, PULP_PACKAGE_ATTRS.RECOMMENDS,
+            PULP_PACKAGE_ATTRS.REQUIRES, PULP_PACKAGE_ATTRS.SUGGESTS,
+            PULP_PACKAGE_ATTRS.SUPPLEMENTS,
+        }
+        attrs = tuple(vars(PULP_PACKAGE_ATTRS).values())
+        scalars = [(index, attr) for index, attr in enumerate(attrs, 1) if attr not in list_attrs]
+        lists = [(index, attr) for index, attr in enumerate(attrs, 1) if attr in list_attrs]
+        changelogs_index = attrs.index(PULP_PACKAGE_ATTRS.CHANGELOGS) + 1
+
+        rows = queryset.prefetch_related(None).values_list('pk', *attrs)
+        for row in rows.iterator(chunk_size=chunk_size):
+            package = cr.Package()
+            for index, attr in scalars:
+                setattr(package, attr, row[index])
+            for index, attr in lists:
+                items = row[index]
+                if index == changelogs_index:
+                    items = cls.limit_changelogs(items, changelog_limit)
+                # createrepo_c expects tuples, JSON only has lists
+                setattr(package, attr, [
+                    tuple(item) if isinstance(item, list) else item for item in items
+                ])
+            yield row[0], package
+
+    def render_other_xml(self, changelog_limit=None):
+        """
+        Render the other XML of the package from only the fields it is made of.
+
+        Args:
+            changelog_limit(int): number of the newest changelogs to keep, all if None
+
+        Returns:
+            str: the package entry of other.xml
+
+        """
+        package = cr.Package()
+        for attr in self.OTHER_XML_FIELDS:
+            if attr != PULP_PACKAGE_ATTRS.CHANGELOGS:
+                setattr(package, attr, getattr(self, attr))
+        package.changelogs = [
+            tuple(changelog) for changelog in self.limit_changelogs(
+                getattr(self, PULP_PACKAGE_ATTRS.CHANGELOGS), changelog_limit)
+        ]
+        return cr.xml_dump_other(package)
+
+    def render_xml(self, package=None):
+        """
+        Render the primary, filelists and other XML of the package.
+
+        Args:
+            package(createrepo_c.Package): the package converted to createrepo_c already, e.g.
+                by `createrepo_c_packages`, it is converted with `to_createrepo_c` if None
+
+        """
+        if package is None:
+            package = self.to_createrepo_c()
+        package.location_href = LOCATION_HREF_PLACEHOLDER
+        self.primary_xml = cr.xml_dump_primary(package)
+        self.filelists_xml = cr.xml_dump_filelists(package)
+        self.other_xml = cr.xml_dump_other(package)
+
+    def primary_xml_at(self, location_href):
+        """
+        Get the primary XML of the package published at a location.
+
+        Args:
+            location_href(str): location of the package relative to the repository
+
+        Returns:
+            str: the package entry of primary.xml
+
+        """
+        return self.primary_xml.replace(
+            'href="{placeholder}"'.format(placeholder=LOCATION_HREF_PLACEHOLDER),
+            'href="{href}"'.format(href=escape(location_href, {'"': '&quot;'})),
+            1
+        )
+
+    @staticmethod
+    def limit_changelogs(changelogs, limit=None):
+        """
+        Keep only the newest changelogs, like the --changelog-limit option of createrepo.
+
+        Args:
+            changelogs(list): changelogs in the createrepo_c format
+
+        Keyword Args:
+            limit(int): number of changelogs to keep, all of them are kept if None
+
+        Returns:
+            list: the newest changelogs, oldest first
+
+        """
+        if limit is None or len(changelogs) <= limit:
+            return changelogs
+        if not limit:
+            return []
+        # a changelog is (author, date, text), the sort is stable for entries of the same date
+        return sorted(changelogs, key=lambda changelog: changelog[1])[-limit:]
 
     @classmethod
     def createrepo_to_dict(cls, package):
         """
         Convert createrepo_c package object to dict for instantiating Package object.
 
+        All the changelogs are kept, a package is shared by all the repositories it is in, so
+        changelogs are only limited when publishing.
+
         Args:
             package(createrepo_c.Package): a RPM/SRPM package to convert
 
@@ -242,30 +419,23 @@ class Package(Content):
         """
         return {
             PULP_PACKAGE_ATTRS.ARCH: getattr(package, CR_PACKAGE_ATTRS.ARCH),
-            PULP_PACKAGE_ATTRS.CHANGELOGS: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.CHANGELOGS) or []),
+            PULP_PACKAGE_ATTRS.CHANGELOGS: getattr(package, CR_PACKAGE_ATTRS.CHANGELOGS) or [],
             PULP_PACKAGE_ATTRS.CHECKSUM_TYPE: getattr(package, CR_PACKAGE_ATTRS.CHECKSUM_TYPE),
-            PULP_PACKAGE_ATTRS.CONFLICTS: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.CONFLICTS) or []),
+            PULP_PACKAGE_ATTRS.CONFLICTS: getattr(package, CR_PACKAGE_ATTRS.CONFLICTS) or [],
             PULP_PACKAGE_ATTRS.DESCRIPTION: getattr(package, CR_PACKAGE_ATTRS.DESCRIPTION) or '',
-            PULP_PACKAGE_ATTRS.ENHANCES: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.ENHANCES) or []),
+            PULP_PACKAGE_ATTRS.ENHANCES: getattr(package, CR_PACKAGE_ATTRS.ENHANCES) or [],
             PULP_PACKAGE_ATTRS.EPOCH: getattr(package, CR_PACKAGE_ATTRS.EPOCH) or '',
-            PULP_PACKAGE_ATTRS.FILES: json.dumps(getattr(package, CR_PACKAGE_ATTRS.FILES) or []),
+            PULP_PACKAGE_ATTRS.FILES: getattr(package, CR_PACKAGE_ATTRS.FILES) or [],
             PULP_PACKAGE_ATTRS.LOCATION_BASE: getattr(
                 package, CR_PACKAGE_ATTRS.LOCATION_BASE) or '',
             PULP_PACKAGE_ATTRS.LOCATION_HREF: getattr(package, CR_PACKAGE_ATTRS.LOCATION_HREF),
             PULP_PACKAGE_ATTRS.NAME: getattr(package, CR_PACKAGE_ATTRS.NAME),
-            PULP_PACKAGE_ATTRS.OBSOLETES: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.OBSOLETES) or []),
+            PULP_PACKAGE_ATTRS.OBSOLETES: getattr(package, CR_PACKAGE_ATTRS.OBSOLETES) or [],
             PULP_PACKAGE_ATTRS.PKGID: getattr(package, CR_PACKAGE_ATTRS.PKGID),
-            PULP_PACKAGE_ATTRS.PROVIDES: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.PROVIDES) or []),
-            PULP_PACKAGE_ATTRS.RECOMMENDS: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.RECOMMENDS) or []),
+            PULP_PACKAGE_ATTRS.PROVIDES: getattr(package, CR_PACKAGE_ATTRS.PROVIDES) or [],
+            PULP_PACKAGE_ATTRS.RECOMMENDS: getattr(package, CR_PACKAGE_ATTRS.RECOMMENDS) or [],
             PULP_PACKAGE_ATTRS.RELEASE: getattr(package, CR_PACKAGE_ATTRS.RELEASE),
-            PULP_PACKAGE_ATTRS.REQUIRES: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.REQUIRES) or []),
+            PULP_PACKAGE_ATTRS.REQUIRES: getattr(package, CR_PACKAGE_ATTRS.REQUIRES) or [],
             PULP_PACKAGE_ATTRS.RPM_BUILDHOST: getattr(
                 package, CR_PACKAGE_ATTRS.RPM_BUILDHOST) or '',
             PULP_PACKAGE_ATTRS.RPM_GROUP: getattr(package, CR_PACKAGE_ATTRS.RPM_GROUP) or '',
@@ -280,77 +450,65 @@ class Package(Content):
             PULP_PACKAGE_ATTRS.SIZE_ARCHIVE: getattr(package, CR_PACKAGE_ATTRS.SIZE_ARCHIVE),
             PULP_PACKAGE_ATTRS.SIZE_INSTALLED: getattr(package, CR_PACKAGE_ATTRS.SIZE_INSTALLED),
             PULP_PACKAGE_ATTRS.SIZE_PACKAGE: getattr(package, CR_PACKAGE_ATTRS.SIZE_PACKAGE),
-            PULP_PACKAGE_ATTRS.SUGGESTS: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.SUGGESTS) or []),
+            PULP_PACKAGE_ATTRS.SUGGESTS: getattr(package, CR_PACKAGE_ATTRS.SUGGESTS) or [],
             PULP_PACKAGE_ATTRS.SUMMARY: getattr(package, CR_PACKAGE_ATTRS.SUMMARY) or '',
-            PULP_PACKAGE_ATTRS.SUPPLEMENTS: json.dumps(
-                getattr(package, CR_PACKAGE_ATTRS.SUPPLEMENTS) or []),
+            PULP_PACKAGE_ATTRS.SUPPLEMENTS: getattr(package, CR_PACKAGE_ATTRS.SUPPLEMENTS) or [],
             PULP_PACKAGE_ATTRS.TIME_BUILD: getattr(package, CR_PACKAGE_ATTRS.TIME_BUILD),
             PULP_PACKAGE_ATTRS.TIME_FILE: getattr(package, CR_PACKAGE_ATTRS.TIME_FILE),
             PULP_PACKAGE_ATTRS.URL: getattr(package, CR_PACKAGE_ATTRS.URL) or '',
             PULP_PACKAGE_ATTRS.VERSION: getattr(package, CR_PACKAGE_ATTRS.VERSION)
         }
 
-    def to_createrepo_c(self):
+    def to_createrepo_c(self, changelog_limit=None):
         """
         Convert Package object to a createrepo_c package object.
 
         Currently it works under assumption that Package attributes' names are exactly the same
         as createrepo_c ones.
 
+        Keyword Args:
+            changelog_limit(int): number of the newest changelogs to keep, all if None
+
         Returns:
             createrepo_c.Package: package itself in a format of a createrepo_c package object
 
         """
-        def str_list_to_createrepo_c(s):
+        def list_to_createrepo_c(items):
             """
-            Convert string representation of list to createrepo_c format.
+            Convert a list to createrepo_c format.
 
             Createrepo_c expects list of tuples, not list of lists.
             The assumption is that there are no nested lists, which is true for the data on the
             Package model at the moment.
 
             Args:
-                s(str): string representation of a list
+                items(list): list of strings and/or lists
 
             Returns:
                 list: list of strings and/or tuples
 
             """
-            createrepo_c_list = []
-            for item in json.loads(s):
-                if isinstance(item, list):
-                    createrepo_c_list.append(tuple(item))
-                else:
-                    createrepo_c_list.append(item)
-
-            return createrepo_c_list
+            return [tuple(item) if isinstance(item, list) else item for item in items]
 
         package = cr.Package()
         package.arch = getattr(self, PULP_PACKAGE_ATTRS.ARCH)
-        package.changelogs = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.CHANGELOGS))
+        package.changelogs = list_to_createrepo_c(self.limit_changelogs(
+            getattr(self, PULP_PACKAGE_ATTRS.CHANGELOGS), changelog_limit))
         package.checksum_type = getattr(self, PULP_PACKAGE_ATTRS.CHECKSUM_TYPE)
-        package.conflicts = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.CONFLICTS))
+        package.conflicts = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.CONFLICTS))
         package.description = getattr(self, PULP_PACKAGE_ATTRS.DESCRIPTION)
-        package.enhances = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.ENHANCES))
+        package.enhances = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.ENHANCES))
         package.epoch = getattr(self, PULP_PACKAGE_ATTRS.EPOCH)
-        package.files = str_list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.FILES))
+        package.files = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.FILES))
         package.location_base = getattr(self, PULP_PACKAGE_ATTRS.LOCATION_BASE)
         package.location_href = getattr(self, PULP_PACKAGE_ATTRS.LOCATION_HREF)
         package.name = getattr(self, PULP_PACKAGE_ATTRS.NAME)
-        package.obsoletes = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.OBSOLETES))
+        package.obsoletes = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.OBSOLETES))
         package.pkgId = getattr(self, PULP_PACKAGE_ATTRS.PKGID)
-        package.provides = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.PROVIDES))
-        package.recommends = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.RECOMMENDS))
+        package.provides = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.PROVIDES))
+        package.recommends = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.RECOMMENDS))
         package.release = getattr(self, PULP_PACKAGE_ATTRS.RELEASE)
-        package.requires = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.REQUIRES))
+        package.requires = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.REQUIRES))
         package.rpm_buildhost = getattr(self, PULP_PACKAGE_ATTRS.RPM_BUILDHOST)
         package.rpm_group = getattr(self, PULP_PACKAGE_ATTRS.RPM_GROUP)
         package.rpm_header_end = getattr(self, PULP_PACKAGE_ATTRS.RPM_HEADER_END)
@@ -362,11 +520,9 @@ class Package(Content):
         package.size_archive = getattr(self, PULP_PACKAGE_ATTRS.SIZE_ARCHIVE)
         package.size_installed = getattr(self, PULP_PACKAGE_ATTRS.SIZE_INSTALLED)
         package.size_package = getattr(self, PULP_PACKAGE_ATTRS.SIZE_PACKAGE)
-        package.suggests = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.SUGGESTS))
+        package.suggests = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.SUGGESTS))
         package.summary = getattr(self, PULP_PACKAGE_ATTRS.SUMMARY)
-        package.supplements = str_list_to_createrepo_c(
-            getattr(self, PULP_PACKAGE_ATTRS.SUPPLEMENTS))
+        package.supplements = list_to_createrepo_c(getattr(self, PULP_PACKAGE_ATTRS.SUPPLEMENTS))
         package.time_build = getattr(self, PULP_PACKAGE_ATTRS.TIME_BUILD)
         package.time_file = getattr(self, PULP_PACKAGE_ATTRS.TIME_FILE)
         package.url = getattr(self, PULP_PACKAGE_ATTRS.URL)
@@ -375,6 +531,74 @@ class Package(Content):
         return package
 
 
+class PackageCapability(Model):
+    """
+    A capability a package provides or requires, or a file it contains.
+
+    Capabilities are created together with their package, so which packages provide, require
+    or contain something can be queried by an indexed name instead of scanning the JSON data of
+    packages.
+
+    Fields:
+
+        kind (Text):
+            One of the CAPABILITY_KINDS: 'provides', 'requires' or 'file'
+        name (Text):
+            Name of the capability, or the full path of the file
+
+    Relations:
+
+        package (models.ForeignKey): The package which has the capability
+    """
+
+    kind = models.CharField(choices=CAPABILITY_KIND_CHOICES, max_length=10)
+    name = models.TextField()
+
+    package = models.ForeignKey(Package, related_name='capabilities', on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'name'], name='rpm_capability_kind_name_idx'),
+        ]
+
+    @classmethod
+    def for_package(cls, package):
+        """
+        Build the capabilities of a package.
+
+        Args:
+            package(Package): a saved package
+
+        Returns:
+            list: unsaved PackageCapability instances, one for each distinct name of each kind
+
+        """
+        names = {
+            CAPABILITY_KINDS.PROVIDES: {provide[0] for provide in package.provides},
+            CAPABILITY_KINDS.REQUIRES: {require[0] for require in package.requires},
+            # a file is (type, directory, name), the directory ends with a slash
+            CAPABILITY_KINDS.FILE: {file[1] + file[2] for file in package.files},
+        }
+        return [
+            cls(kind=kind, name=name, package=package)
+            for kind, kind_names in names.items() for name in kind_names
+        ]
+
+    @classmethod
+    def create_for_packages(cls, packages):
+        """
+        Create the capabilities of packages in bulk.
+
+        Args:
+            packages(iterable): saved packages which have no capabilities yet
+
+        """
+        capabilities = []
+        for package in packages:
+            capabilities.extend(cls.for_package(package))
+        cls.objects.bulk_create(capabilities, batch_size=1000)
+
+
 class UpdateRecord(Content):
     """
     The "UpdateRecord" content type, formerly "Errata" model in Pulp 2.
@@ -385,12 +609,12 @@ class UpdateRecord(Content):
     Fields:
         id (Text):
             Update id (short update name, e.g. RHEA-2013:1777)
-        updated_date (Text):
+        updated_date (DateTime):
             Date when the update was updated (e.g. "2013-12-02 00:00:00")
 
         description (Text):
             Update description
-        issued_date (Text):
+        issued_date (DateTime):
             Date when the update was issued (e.g. "2013-12-02 00:00:00")
         fromstr (Text):
             Source of the update (e.g. security@redhat.com)
@@ -417,17 +641,20 @@ class UpdateRecord(Content):
         pushcount (Text):
             Push count
 
+        updateinfo_xml (Binary):
+            The entry of the update in updateinfo.xml, rendered when it is first published
+
     """
 
     TYPE = 'advisory'
 
     # Required metadata
     id = models.CharField(max_length=255, db_index=True)
-    updated_date = models.TextField()
+    updated_date = models.DateTimeField(null=True, db_index=True)
 
     # Optional metadata
     description = models.TextField()
-    issued_date = models.TextField()
+    issued_date = models.DateTimeField(null=True, db_index=True)
     fromstr = models.TextField()  # formerly "errata_from"
     status = models.TextField()
     title = models.TextField()
@@ -447,6 +674,10 @@ class UpdateRecord(Content):
     # UpdateCollection or UpdateCollectionPackage.
     digest = models.CharField(unique=True, max_length=64)
 
+    # The updateinfo XML of the update rendered by createrepo_c. An update with the same digest
+    # always renders the same, so it is only rendered by the first publish which includes it.
+    updateinfo_xml = CompressedTextField(null=True)
+
     @classmethod
     def natural_key_fields(cls):
         """
@@ -466,14 +697,22 @@ class UpdateRecord(Content):
             dict: data for UpdateRecord content creation
 
         """
+        def aware(date):
+            """
+            Make a date parsed by createrepo_c, which has no time zone, a UTC one.
+            """
+            if date is None or timezone.is_aware(date):
+                return date
+            return timezone.make_aware(date, timezone.utc)
+
         return {
             PULP_UPDATE_RECORD_ATTRS.ID: getattr(update, CR_UPDATE_RECORD_ATTRS.ID),
-            PULP_UPDATE_RECORD_ATTRS.UPDATED_DATE: str(
+            PULP_UPDATE_RECORD_ATTRS.UPDATED_DATE: aware(
                 getattr(update, CR_UPDATE_RECORD_ATTRS.UPDATED_DATE)),
             PULP_UPDATE_RECORD_ATTRS.DESCRIPTION: getattr(
                 update, CR_UPDATE_RECORD_ATTRS.DESCRIPTION) or '',
-            PULP_UPDATE_RECORD_ATTRS.ISSUED_DATE: str(
-                getattr(update, CR_UPDATE_RECORD_ATTRS.ISSUED_DATE)) or '',
+            PULP_UPDATE_RECORD_ATTRS.ISSUED_DATE: aware(
+                getattr(update, CR_UPDATE_RECORD_ATTRS.ISSUED_DATE)),
             PULP_UPDATE_RECORD_ATTRS.FROMSTR: getattr(update, CR_UPDATE_RECORD_ATTRS.FROMSTR) or '',
             PULP_UPDATE_RECORD_ATTRS.STATUS: getattr(update, CR_UPDATE_RECORD_ATTRS.STATUS) or '',
             PULP_UPDATE_RECORD_ATTRS.TITLE: getattr(update, CR_UPDATE_RECORD_ATTRS.TITLE) or '',
@@ -588,6 +827,7 @@ class UpdateCollectionPackage(Model):
     Relations:
 
         update_collection (models.ForeignKey): The associated UpdateCollection
+        package (models.ForeignKey): The Package whose checksum is the sum, if there is one
     """
 
     arch = models.TextField()
@@ -603,6 +843,40 @@ class UpdateCollectionPackage(Model):
 
     update_collection = models.ForeignKey(UpdateCollection, related_name='packages',
                                           on_delete=models.CASCADE)
+    package = models.ForeignKey(Package, related_name='update_collection_packages', null=True,
+                                on_delete=models.SET_NULL)
+
+    @classmethod
+    def link_packages(cls, collection_packages):
+        """
+        Set the package of each collection package to the Package whose checksum is its sum.
+
+        Packages are only matched by checksum. Advisories are shared by all the repositories
+        they are synced into, so a match by NEVRA in one repository would link a package which
+        can be a different build than the one with the same NEVRA in another repository. The
+        packages are looked up with a single query.
+
+        Args:
+            collection_packages(list): UpdateCollectionPackage instances
+
+        Returns:
+            list: the collection packages which a package was found for
+
+        """
+        sums = {collection_package.sum for collection_package in collection_packages}
+        sums.discard('')
+        if not sums:
+            return []
+        by_checksum = dict(Package.objects.filter(pkgId__in=sums).values_list('pkgId', 'pk'))
+
+        linked = []
+        for collection_package in collection_packages:
+            pk = by_checksum.get(collection_package.sum)
+            if pk is None:
+                continue
+            collection_package.package_id = pk
+            linked.append(collection_package)
+        return linked
 
     @classmethod
     def createrepo_to_dict(cls, package):
@@ -698,6 +972,9 @@ class PackageGroup(Content):
     Maps directly to the fields provided by libcomps.
     https://github.com/rpm-software-management/libcomps
 
+    The lists and dictionaries are stored as JSON text, in which they are published to
+    comps.xml by `pulp_rpm.app.tasks.repodata`. An empty text stands for an empty value.
+
     Fields:
 
         id (Text):
@@ -714,7 +991,8 @@ class PackageGroup(Content):
         description (Text):
             Description of the group
         packages (Text):
-            The list of packages in this group
+            The list of packages in this group, names or dicts with a 'name' and optionally a
+            'type', 'requires' and 'basearchonly'
         biarch_only (Bool):
             Flag to identify whether the group is biarch
         desc_by_lang (Text):
@@ -756,6 +1034,8 @@ class Category(Content):
     Maps directly to the fields provided by libcomps.
     https://github.com/rpm-software-management/libcomps
 
+    The lists and dictionaries are stored as JSON text, like for `PackageGroup`.
+
     Fields:
 
         id (Text):
@@ -767,7 +1047,7 @@ class Category(Content):
         display_order (Int):
             Number representing the order of display
         group_ids (Text):
-            A list of group ids
+            A list of group ids, ids or dicts with a 'name' and a 'default' flag
         desc_by_lang (Text):
             A dictionary of descriptions by language
         name_by_lang (Text):
@@ -803,6 +1083,8 @@ class Environment(Content):
     Maps directly to the fields provided by libcomps.
     https://github.com/rpm-software-management/libcomps
 
+    The lists and dictionaries are stored as JSON text, like for `PackageGroup`.
+
     Fields:
 
         id (Text):
@@ -814,9 +1096,9 @@ class Environment(Content):
         display_order (Int):
             Number representing the order of display
         group_ids (Text):
-            A list of group ids
+            A list of group ids, ids or dicts with a 'name' and a 'default' flag
         option_ids (Text):
-            A list of option ids
+            A list of option ids, like group_ids
         desc_by_lang (Text):
             A dictionary of descriptions by language
         name_by_lang (Text):
@@ -856,7 +1138,7 @@ class Langpacks(Content):
     Fields:
 
         matches (Dict):
-            The langpacks dictionary
+            The langpacks dictionary, install patterns by package name, stored as JSON text
     """
 
     TYPE = 'langpacks'
@@ -869,13 +1151,59 @@ class Langpacks(Content):
         default_related_name = "%(app_label)s_%(model_name)s"
 
 
+class RepoMetadataFile(Content):
+    """
+    The "RepoMetadataFile" content type.
+
+    A metadata file of an upstream repository kept byte for byte, so that a mirrored repository
+    can be published without regenerating its metadata.
+
+    Fields:
+        data_type (Text):
+            Type of the repomd.xml record the file is referenced by, e.g. 'primary' or
+            'productid'. The repomd.xml file itself and its detached signature and key
+            use the 'repomd', 'repomd_asc' and 'repomd_key' types, the treeinfo file of a
+            kickstart tree the 'treeinfo' type.
+        checksum_type (Text):
+            Type of checksum, e.g. 'sha256', 'md5'
+        checksum (Text):
+            Checksum of the file
+        relative_path (Text):
+            Location of the file relative to the root of the repository
+    """
+
+    TYPE = 'repo_metadata_file'
+
+    data_type = models.CharField(max_length=255)
+    checksum_type = models.CharField(choices=CHECKSUM_CHOICES, max_length=10)
+    checksum = models.CharField(max_length=128)
+    relative_path = models.TextField()
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+        unique_together = ('data_type', 'checksum', 'relative_path')
+
+
 class RpmRemote(Remote):
     """
     Remote for "rpm" content.
+
+    Fields:
+        verify_headers (Bool):
+            Flag to verify the headers of downloaded packages against the repository metadata
+        gpgkey (Text):
+            ASCII armored public keys to verify the signatures of downloaded packages with
+        signature_policy (Text):
+            What to do with packages which are unsigned or badly signed, 'reject' or 'warn'
     """
 
     TYPE = 'rpm'
 
+    verify_headers = models.BooleanField(default=False)
+    gpgkey = models.TextField(null=True)
+    signature_policy = models.CharField(choices=SIGNATURE_POLICY_CHOICES, max_length=10,
+                                        default=SIGNATURE_POLICIES.REJECT)
+
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
 
@@ -883,10 +1211,41 @@ class RpmRemote(Remote):
 class RpmPublication(Publication):
     """
     Publication for "rpm" content.
+
+    Fields:
+        changelog_limit (PositiveInteger):
+            Number of the newest changelogs to publish for each package, all if null
+        sqlite_metadata (Bool):
+            Flag to publish the sqlite databases of the metadata as well
+        metadata_compression (Text):
+            Compression type of the XML metadata files
+        sqlite_compression (Text):
+            Compression type of the sqlite databases
+        metadata_compression_level (PositiveSmallInteger):
+            Compression level of the XML metadata files, the default one of the type if null
+        sqlite_compression_level (PositiveSmallInteger):
+            Compression level of the sqlite databases, the default one of the type if null
+        zchunk_metadata (Bool):
+            Flag to publish zchunk files of the primary, filelists and other XML as well
+        content_fingerprint (Text):
+            Checksum of the set of content of the published repository version
     """
 
     TYPE = 'rpm'
 
+    changelog_limit = models.PositiveIntegerField(null=True)
+    sqlite_metadata = models.BooleanField(default=True)
+    metadata_compression = models.CharField(
+        choices=COMPRESSION_CHOICES, default=COMPRESSION_TYPES.GZ, max_length=10
+    )
+    sqlite_compression = models.CharField(
+        choices=COMPRESSION_CHOICES, default=COMPRESSION_TYPES.BZ2, max_length=10
+    )
+    metadata_compression_level = models.PositiveSmallIntegerField(null=True)
+    sqlite_compression_level = models.PositiveSmallIntegerField(null=True)
+    zchunk_metadata = models.BooleanField(default=False)
+    content_fingerprint = models.CharField(max_length=64, null=True, db_index=True)
+
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
 
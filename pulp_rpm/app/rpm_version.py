@@ -0,0 +1,103 @@
+"""
+Sort keys for RPM versions.
+
+The keys are byte strings which compare like `rpmvercmp` compares the versions they are made of,
+so RPM versions can be sorted and compared by the database.
+"""
+
+# Order of the tokens a version is made of, as in rpmvercmp:
+# '~' sorts before everything even the end of the version, '^' sorts after the end of the
+# version but before anything else, and a numeric segment is newer than an alphabetic one.
+TILDE = b'\x01'
+END = b'\x02'
+CARET = b'\x03'
+ALPHA = b'\x04'
+NUMERIC = b'\x05'
+
+
+def _is_digit(char):
+    return '0' <= char <= '9'
+
+
+def _is_alpha(char):
+    return 'a' <= char <= 'z' or 'A' <= char <= 'Z'
+
+
+def _numeric_key(digits):
+    """
+    Encode a number of any size so that the encoded numbers sort by their value.
+
+    Args:
+        digits(str): decimal digits of the number
+
+    Returns:
+        bytes: length prefixed digits without the leading zeros
+
+    """
+    digits = digits.lstrip('0')
+    length = len(digits)
+    if length < 0xFF:
+        prefix = bytes((length,))
+    else:
+        prefix = b'\xff' + length.to_bytes(4, 'big')
+    return NUMERIC + prefix + digits.encode('ascii')
+
+
+def version_sort_key(version):
+    """
+    Make a sort key of a version or a release of a package.
+
+    Args:
+        version(str): a version or a release
+
+    Returns:
+        bytes: the sort key
+
+    """
+    key = []
+    position = 0
+    length = len(version)
+    while position < length:
+        char = version[position]
+        if char == '~':
+            key.append(TILDE)
+            position += 1
+        elif char == '^':
+            key.append(CARET)
+            position += 1
+        elif _is_digit(char):
+            end = position
+            while end < length and _is_digit(version[end]):
+                end += 1
+            key.append(_numeric_key(version[position:end]))
+            position = end
+        elif _is_alpha(char):
+            end = position
+            while end < length and _is_alpha(version[end]):
+                end += 1
+            key.append(ALPHA + version[position:end].encode('ascii') + b'\x00')
+            position = end
+        else:
+            # any other character only separates segments
+            position += 1
+    key.append(END)
+    return b''.join(key)
+
+
+def evr_sort_key(epoch, version, release):
+    """
+    Make a sort key of the epoch, version and release of a package.
+
+    Keys of two packages compare like rpm compares the packages' EVRs.
+
+    Args:
+        epoch(str): the epoch, an empty one is the same as '0'
+        version(str): the version
+        release(str): the release
+
+    Returns:
+        bytes: the sort key
+
+    """
+    epoch = ''.join(char for char in epoch or '' if _is_digit(char)) or '0'
+    return _numeric_key(epoch) + version_sort_key(version) + version_sort_key(release)
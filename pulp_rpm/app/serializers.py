@@ -16,6 +16,7 @@ from pulpcore.plugin.serializers import (
     PublicationSerializer,
     PublicationDistributionSerializer,
     NestedRelatedField,
+    RepositorySyncURLSerializer,
     validate_unknown_fields,
 )
 
@@ -37,7 +38,15 @@ from pulp_rpm.app.models import (
 from pulp_rpm.app.fields import UpdateCollectionField, UpdateReferenceField
 
 
-from pulp_rpm.app.constants import RPM_PLUGIN_TYPE_CHOICE_MAP
+from pulp_rpm.app.compression import available_compression_types, zchunk_available
+from pulp_rpm.app.constants import (
+    COMPRESSION_CHOICES,
+    COMPRESSION_LEVELS,
+    COMPRESSION_TYPES,
+    RPM_PLUGIN_TYPE_CHOICE_MAP,
+    SIGNATURE_POLICIES,
+    SIGNATURE_POLICY_CHOICES,
+)
 
 
 class PackageSerializer(SingleArtifactContentSerializer):
@@ -92,46 +101,46 @@ class PackageSerializer(SingleArtifactContentSerializer):
         allow_blank=True, required=False,
     )
 
-    changelogs = serializers.CharField(
+    changelogs = serializers.JSONField(
         help_text=_("Changelogs that package contains"),
-        default="[]", required=False
+        default=list, required=False
     )
-    files = serializers.CharField(
+    files = serializers.JSONField(
         help_text=_("Files that package contains"),
-        default="[]", required=False
+        default=list, required=False
     )
 
-    requires = serializers.CharField(
+    requires = serializers.JSONField(
         help_text=_("Capabilities the package requires"),
-        default="[]", required=False
+        default=list, required=False
     )
-    provides = serializers.CharField(
+    provides = serializers.JSONField(
         help_text=_("Capabilities the package provides"),
-        default="[]", required=False
+        default=list, required=False
     )
-    conflicts = serializers.CharField(
+    conflicts = serializers.JSONField(
         help_text=_("Capabilities the package conflicts"),
-        default="[]", required=False
+        default=list, required=False
     )
-    obsoletes = serializers.CharField(
+    obsoletes = serializers.JSONField(
         help_text=_("Capabilities the package obsoletes"),
-        default="[]", required=False
+        default=list, required=False
     )
-    suggests = serializers.CharField(
+    suggests = serializers.JSONField(
         help_text=_("Capabilities the package suggests"),
-        default="[]", required=False
+        default=list, required=False
     )
-    enhances = serializers.CharField(
+    enhances = serializers.JSONField(
         help_text=_("Capabilities the package enhances"),
-        default="[]", required=False
+        default=list, required=False
     )
-    recommends = serializers.CharField(
+    recommends = serializers.JSONField(
         help_text=_("Capabilities the package recommends"),
-        default="[]", required=False
+        default=list, required=False
     )
-    supplements = serializers.CharField(
+    supplements = serializers.JSONField(
         help_text=_("Capabilities the package supplements"),
-        default="[]", required=False
+        default=list, required=False
     )
 
     location_base = serializers.CharField(
@@ -251,19 +260,131 @@ class RpmRemoteSerializer(RemoteSerializer):
         choices=Remote.POLICY_CHOICES,
         default=Remote.IMMEDIATE
     )
+    verify_headers = serializers.BooleanField(
+        help_text=_("Verify that the headers of downloaded packages match the repository "
+                    "metadata. Packages which are not downloaded during sync are not verified."),
+        required=False
+    )
+
+    gpgkey = serializers.CharField(
+        help_text=_("ASCII armored public keys to verify the signatures of downloaded packages "
+                    "with. Packages which are not downloaded during sync are not verified."),
+        required=False, allow_null=True
+    )
+    signature_policy = serializers.ChoiceField(
+        help_text=_("What to do with packages which are unsigned or whose signature can not be "
+                    "verified with the gpgkey: 'reject' them or only 'warn'. "
+                    "'reject' is the default."),
+        choices=SIGNATURE_POLICY_CHOICES,
+        default=SIGNATURE_POLICIES.REJECT
+    )
 
     class Meta:
-        fields = RemoteSerializer.Meta.fields
+        fields = RemoteSerializer.Meta.fields + (
+            'verify_headers', 'gpgkey', 'signature_policy'
+        )
         model = RpmRemote
 
 
+class RpmRepositorySyncURLSerializer(RepositorySyncURLSerializer):
+    """
+    A Serializer for the sync of RPM repositories.
+    """
+
+    mirror_metadata = serializers.BooleanField(
+        help_text=_("Store the upstream repomd.xml and the metadata files it references as "
+                    "well, and publish them unmodified. Implies mirror."),
+        default=False
+    )
+
+
 class RpmPublicationSerializer(PublicationSerializer):
     """
     A Serializer for RpmPublication.
     """
 
+    changelog_limit = serializers.IntegerField(
+        help_text=_("Number of the newest changelogs to publish for each package. "
+                    "All of them are published by default."),
+        min_value=0, required=False, allow_null=True
+    )
+    sqlite_metadata = serializers.BooleanField(
+        help_text=_("Publish the sqlite databases of the metadata as well, which old "
+                    "clients need. They are published by default."),
+        default=True
+    )
+    incremental = serializers.BooleanField(
+        help_text=_("Start from the metadata of the latest publication of the repository "
+                    "and only write the entries of the packages which have changed."),
+        default=False, write_only=True
+    )
+    metadata_compression = serializers.ChoiceField(
+        help_text=_("Compression of the XML metadata files. gz is compressed by several "
+                    "threads, zstd is only available if the zstandard package is installed."),
+        choices=COMPRESSION_CHOICES, default=COMPRESSION_TYPES.GZ
+    )
+    sqlite_compression = serializers.ChoiceField(
+        help_text=_("Compression of the sqlite databases of the metadata."),
+        choices=COMPRESSION_CHOICES, default=COMPRESSION_TYPES.BZ2
+    )
+    metadata_compression_level = serializers.IntegerField(
+        help_text=_("Compression level of the XML metadata files, within the levels of "
+                    "metadata_compression. The default level of the type is used by default."),
+        min_value=0, required=False, allow_null=True
+    )
+    sqlite_compression_level = serializers.IntegerField(
+        help_text=_("Compression level of the sqlite databases, within the levels of "
+                    "sqlite_compression. The default level of the type is used by default."),
+        min_value=0, required=False, allow_null=True
+    )
+    zchunk_metadata = serializers.BooleanField(
+        help_text=_("Publish zchunk files of the primary, filelists and other XML as well, so "
+                    "that clients only download the packages which have changed. Requires the "
+                    "zck tool of zchunk."),
+        default=False
+    )
+    content_fingerprint = serializers.CharField(
+        help_text=_("Checksum of the set of content of the published repository version. "
+                    "The metadata of a publication with the same content and options is reused."),
+        read_only=True
+    )
+
+    def validate(self, data):
+        """
+        Validate that the compression types are available and support their compression levels.
+        """
+        data = super().validate(data)
+        if data.get('zchunk_metadata') and not zchunk_available():
+            raise serializers.ValidationError(
+                _("zchunk metadata can't be published, the zck tool is not installed")
+            )
+        compressions = [(data.get('metadata_compression', COMPRESSION_TYPES.GZ),
+                         data.get('metadata_compression_level'))]
+        if data.get('sqlite_metadata', True):
+            compressions.append((data.get('sqlite_compression', COMPRESSION_TYPES.BZ2),
+                                 data.get('sqlite_compression_level')))
+
+        for compression, level in compressions:
+            if compression not in available_compression_types():
+                raise serializers.ValidationError(
+                    _("Compression type '{compression}' is not available").format(
+                        compression=compression)
+                )
+            lowest, highest = COMPRESSION_LEVELS[compression]
+            if level is not None and not lowest <= level <= highest:
+                raise serializers.ValidationError(
+                    _("The compression level of '{compression}' must be between {lowest} and "
+                      "{highest}").format(compression=compression, lowest=lowest,
+                                          highest=highest)
+                )
+        return data
+
     class Meta:
-        fields = PublicationSerializer.Meta.fields
+        fields = PublicationSerializer.Meta.fields + (
+            'changelog_limit', 'sqlite_metadata', 'incremental', 'metadata_compression',
+            'sqlite_compression', 'metadata_compression_level', 'sqlite_compression_level',
+            'zchunk_metadata', 'content_fingerprint'
+        )
         model = RpmPublication
 
 
@@ -275,15 +396,17 @@ class UpdateRecordSerializer(NoArtifactContentSerializer):
     id = serializers.CharField(
         help_text=_("Update id (short update name, e.g. RHEA-2013:1777)")
     )
-    updated_date = serializers.CharField(
-        help_text=_("Date when the update was updated (e.g. '2013-12-02 00:00:00')")
+    updated_date = serializers.DateTimeField(
+        help_text=_("Date when the update was updated (e.g. '2013-12-02 00:00:00')"),
+        allow_null=True
     )
 
     description = serializers.CharField(
         help_text=_("Update description")
     )
-    issued_date = serializers.CharField(
-        help_text=_("Date when the update was issued (e.g. '2013-12-02 00:00:00')")
+    issued_date = serializers.DateTimeField(
+        help_text=_("Date when the update was issued (e.g. '2013-12-02 00:00:00')"),
+        allow_null=True
     )
     fromstr = serializers.CharField(
         help_text=_("Source of the update (e.g. security@redhat.com)")
@@ -1,5 +1,4 @@
 import createrepo_c
-import json
 import os
 import tempfile
 import shutil
@@ -31,12 +30,4 @@ def _prepare_package(artifact, filename):
 
     package['location_href'] = filename
 
-    # parsing it into a saveable format
-    new_pkg = {}
-    for key, value in package.items():
-        if isinstance(value, list):
-            new_pkg[key] = json.dumps(value)
-        else:
-            new_pkg[key] = value
-
-    return new_pkg
+    return package
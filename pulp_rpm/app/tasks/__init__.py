@@ -2,3 +2,4 @@ from .publishing import publish  # noqa
 from .synchronizing import synchronize  # noqa
 from .upload import one_shot_upload  # noqa
 from .copy import copy_content  # noqa
+from .linking import link_update_collection_packages  # noqa
@@ -0,0 +1,274 @@
+import asyncio
+import time
+
+from pulpcore.plugin.stages import Stage
+
+# asyncio.Task.current_task() is deprecated since Python 3.7
+current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+
+
+class StageStatistics:
+    """
+    Statistics collected for a single stage of a sync pipeline.
+
+    Times are in seconds. The depth of the output queue of a stage is sampled on each put, at
+    most once per `SAMPLE_INTERVAL`, as pairs of the time since the start of the pipeline and
+    the number of items waiting in the queue.
+    """
+
+    SAMPLE_INTERVAL = 1.0
+
+    def __init__(self, position, name):
+        """
+        Statistics of a stage.
+
+        Args:
+            position(int): position of the stage in the pipeline
+            name(str): name of the stage
+
+        """
+        self.position = position
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.get_wait = 0.0
+        self.put_wait = 0.0
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.started = None
+        self.finished = None
+        self.queue_depth = []
+        self.max_queue_depth = 0
+
+    def sample_queue_depth(self, now, depth, origin):
+        """
+        Record the depth of the output queue.
+
+        Args:
+            now(float): current time
+            depth(int): number of items in the output queue
+            origin(float): time the pipeline started
+
+        """
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        elapsed = now - origin
+        if not self.queue_depth or elapsed - self.queue_depth[-1][0] >= self.SAMPLE_INTERVAL:
+            self.queue_depth.append((round(elapsed, 3), depth))
+
+    def to_dict(self):
+        """
+        Report the statistics.
+
+        Returns:
+            dict: the statistics in a JSON serializable form
+
+        """
+        run_time = None
+        if self.started is not None and self.finished is not None:
+            run_time = round(self.finished - self.started, 3)
+
+        return {
+            'position': self.position,
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'run_time': run_time,
+            'get_wait': round(self.get_wait, 3),
+            'put_wait': round(self.put_wait, 3),
+            'db_time': round(self.db_time, 3),
+            'db_queries': self.db_queries,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_depth': self.queue_depth,
+        }
+
+
+class InstrumentedQueue:
+    """
+    A proxy of a pipeline queue which measures the time stages are blocked on it.
+
+    The stage reading from the queue is charged for the time spent in `get`, the stage
+    writing to it for the time spent in `put`. The None sentinel ending the pipeline
+    is not counted as an item.
+    """
+
+    def __init__(self, queue, instrumentation, reader=None, writer=None):
+        """
+        Wrap a queue.
+
+        Args:
+            queue(asyncio.Queue): the queue to wrap
+            instrumentation(PipelineInstrumentation): the instrumentation of the pipeline
+
+        Keyword Args:
+            reader(StageStatistics): statistics of the stage reading from the queue
+            writer(StageStatistics): statistics of the stage writing to the queue
+
+        """
+        self._queue = queue
+        self._instrumentation = instrumentation
+        self._reader = reader
+        self._writer = writer
+
+    def __getattr__(self, name):
+        """
+        Delegate everything which is not measured to the wrapped queue.
+        """
+        return getattr(self._queue, name)
+
+    async def get(self):
+        """
+        Get an item, charging the reader for the time spent waiting.
+        """
+        start = time.perf_counter()
+        item = await self._queue.get()
+        self._reader.get_wait += time.perf_counter() - start
+        if item is not None:
+            self._reader.items_in += 1
+        return item
+
+    def get_nowait(self):
+        """
+        Get an item without waiting.
+        """
+        item = self._queue.get_nowait()
+        if item is not None:
+            self._reader.items_in += 1
+        return item
+
+    async def put(self, item):
+        """
+        Put an item, charging the writer for the time spent waiting.
+        """
+        start = time.perf_counter()
+        await self._queue.put(item)
+        now = time.perf_counter()
+        self._writer.put_wait += now - start
+        if item is not None:
+            self._writer.items_out += 1
+        self._writer.sample_queue_depth(now, self._queue.qsize(), self._instrumentation.started)
+
+
+class InstrumentedStage(Stage):
+    """
+    A stage wrapping another stage of a pipeline to collect its statistics.
+    """
+
+    def __init__(self, stage, instrumentation, statistics):
+        """
+        Wrap a stage.
+
+        Args:
+            stage(Stage): the stage to wrap
+            instrumentation(PipelineInstrumentation): the instrumentation of the pipeline
+            statistics(StageStatistics): statistics of the wrapped stage
+
+        """
+        super().__init__()
+        self.stage = stage
+        self.instrumentation = instrumentation
+        self.statistics = statistics
+
+    def _connect(self, in_q, out_q):
+        """
+        Connect the wrapped stage to proxies of its queues.
+        """
+        super()._connect(in_q, out_q)
+        if in_q is not None:
+            in_q = InstrumentedQueue(in_q, self.instrumentation, reader=self.statistics)
+        out_q = InstrumentedQueue(out_q, self.instrumentation, writer=self.statistics)
+        self.stage._connect(in_q, out_q)
+
+    async def __call__(self):
+        """
+        Run the wrapped stage and account the database time of its task to it.
+        """
+        self.instrumentation.tasks[current_task()] = self.statistics
+        self.statistics.started = time.perf_counter()
+        try:
+            await self.stage()
+        finally:
+            self.statistics.finished = time.perf_counter()
+
+
+class PipelineInstrumentation:
+    """
+    Collect per-stage statistics of a sync pipeline.
+
+    For each stage the number of items it received and emitted, the time it was blocked on
+    getting and putting items, the depth of its output queue over time and the time spent
+    in database queries made by its task are collected.
+
+    Usage::
+
+        instrumentation = PipelineInstrumentation()
+        stages = instrumentation.wrap(stages)
+        with connection.execute_wrapper(instrumentation.db_wrapper):
+            ...  # run the pipeline
+        report = instrumentation.report()
+    """
+
+    def __init__(self):
+        """
+        Instrumentation of a pipeline which has not started yet.
+        """
+        self.stages = []
+        self.tasks = {}
+        self.started = time.perf_counter()
+        self.other_db_time = 0.0
+        self.other_db_queries = 0
+
+    def wrap(self, stages):
+        """
+        Wrap the stages of a pipeline to collect their statistics.
+
+        Args:
+            stages(list): list of :class:`~pulpcore.plugin.stages.Stage` instances
+
+        Returns:
+            list: the instrumented stages
+
+        """
+        instrumented = []
+        for stage in stages:
+            statistics = StageStatistics(len(self.stages), type(stage).__name__)
+            self.stages.append(statistics)
+            instrumented.append(InstrumentedStage(stage, self, statistics))
+        return instrumented
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """
+        Time a database query and account it to the stage whose task made it.
+
+        To be installed with `django.db.connection.execute_wrapper`.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            try:
+                statistics = self.tasks.get(current_task())
+            except RuntimeError:
+                # not running in an event loop
+                statistics = None
+            if statistics is None:
+                self.other_db_time += elapsed
+                self.other_db_queries += 1
+            else:
+                statistics.db_time += elapsed
+                statistics.db_queries += 1
+
+    def report(self):
+        """
+        Report the statistics of the pipeline.
+
+        Returns:
+            dict: the statistics in a JSON serializable form
+
+        """
+        return {
+            'run_time': round(time.perf_counter() - self.started, 3),
+            'stages': [statistics.to_dict() for statistics in self.stages],
+            'other_db_time': round(self.other_db_time, 3),
+            'other_db_queries': self.other_db_queries,
+        }
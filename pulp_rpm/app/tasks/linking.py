@@ -0,0 +1,62 @@
+from gettext import gettext as _
+import logging
+
+from pulpcore.plugin.models import ProgressBar, RepositoryContent, RepositoryVersion
+
+from pulp_rpm.app.models import Package, UpdateCollectionPackage
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def link_update_collection_packages(repository_version_pk):
+    """
+    Link the advisory packages which are not linked yet to the packages added in a version.
+
+    Args:
+        repository_version_pk (str): Link to the packages added in this repository version.
+    """
+    repository_version = RepositoryVersion.objects.get(pk=repository_version_pk)
+    added = RepositoryContent.objects.filter(version_added=repository_version)
+    packages = Package.objects.filter(pk__in=added.values('content'))
+    with ProgressBar(message=_('Linking advisory packages')) as pb:
+        for linked in link_batches(packages):
+            pb.done += linked
+            pb.save()
+
+    log.info(_('Linked {count} advisory packages').format(count=pb.done))
+
+
+def link_batches(packages):
+    """
+    Link the advisory packages which are not linked yet to the given packages in batches.
+
+    A collection package is linked to the Package whose checksum is its sum, see
+    `UpdateCollectionPackage.link_packages`.
+
+    Args:
+        packages (django.db.models.QuerySet): the packages to link to
+
+    Yields:
+        int: the number of the collection packages linked in each batch
+
+    """
+    checksums = packages.order_by('pk').values_list('pk', 'pkgId')
+
+    last_pk = None
+    while True:
+        batch = checksums
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        collection_packages = UpdateCollectionPackage.objects.filter(
+            package__isnull=True, sum__in=[pkgId for pk, pkgId in batch]
+        ).only('pk', 'sum')
+        linked = UpdateCollectionPackage.link_packages(list(collection_packages))
+        UpdateCollectionPackage.objects.bulk_update(linked, ['package'])
+        yield len(linked)
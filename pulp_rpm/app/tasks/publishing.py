@@ -1,13 +1,17 @@
+import hashlib
 import os
+import re
 from gettext import gettext as _
+from itertools import islice
 import logging
 
 import createrepo_c as cr
 
 from django.core.files import File
-from django.utils.dateparse import parse_datetime
+from django.db.models import Exists, OuterRef
 
 from pulpcore.plugin.models import (
+    ContentArtifact,
     RepositoryVersion,
     PublishedArtifact,
     PublishedMetadata,
@@ -15,12 +19,39 @@ from pulpcore.plugin.models import (
 
 from pulpcore.plugin.tasking import WorkingDirectory
 
-from pulp_rpm.app.models import Package, RpmPublication, UpdateRecord
+from pulp_rpm.app.compression import compression_type, open_compressed, zchunk_available
+from pulp_rpm.app.constants import COMPRESSION_SUFFIXES, COMPRESSION_TYPES, PACKAGE_REPODATA
+from pulp_rpm.app.models import (
+    Category,
+    DistributionTree,
+    Environment,
+    Langpacks,
+    Package,
+    PackageGroup,
+    RepoMetadataFile,
+    RpmPublication,
+    UpdateRecord,
+)
+from pulp_rpm.app.tasks.repodata import (
+    COMPS_FOOTER,
+    COMPS_HEADER,
+    category_xml,
+    environment_xml,
+    langpacks_xml,
+    package_group_xml,
+)
+from pulp_rpm.app.tasks.writers import MetadataWriter, repomd_record
 
 log = logging.getLogger(__name__)
 
 REPODATA_PATH = 'repodata'
 
+# number of packages loaded, and of published artifacts created, at once
+CHUNK_SIZE = 1000
+
+# pkgId of a package entry of primary, filelists or other XML generated by createrepo_c
+PKGID_PATTERN = re.compile(r'pkgid="(?:YES">)?([^"<]+)')
+
 
 def update_record_xml(update_record):
     """
@@ -40,8 +71,8 @@ def update_record_xml(update_record):
     rec.version = update_record.version
     rec.id = update_record.id
     rec.title = update_record.title
-    rec.issued_date = parse_datetime(update_record.issued_date)
-    rec.updated_date = parse_datetime(update_record.updated_date)
+    rec.issued_date = update_record.issued_date
+    rec.updated_date = update_record.updated_date
     rec.rights = update_record.rights
     rec.summary = update_record.summary
     rec.description = update_record.description
@@ -80,13 +111,191 @@ def update_record_xml(update_record):
     return cr.xml_dump_updaterecord(rec)
 
 
-def publish(repository_version_pk):
+def content_fingerprint(repository_version):
+    """
+    Compute a checksum of the set of content of a repository version.
+
+    Repository versions with the same content have the same fingerprint, whichever repository
+    they belong to and however they were created.
+
+    Args:
+        repository_version (pulpcore.plugin.models.RepositoryVersion): the repository version
+
+    Returns:
+        str: the sha256 hex digest of the pks of the content
+
+    """
+    fingerprint = hashlib.sha256()
+    pks = repository_version.content.order_by('pk').values_list('pk', flat=True)
+    for pk in pks.iterator(chunk_size=CHUNK_SIZE):
+        fingerprint.update('{pk}\n'.format(pk=pk).encode())
+    return fingerprint.hexdigest()
+
+
+def identical_publication(publication):
+    """
+    Find a publication of the same content with the same options.
+
+    Args:
+        publication (pulp_rpm.app.models.RpmPublication): a new publication
+
+    Returns:
+        pulp_rpm.app.models.RpmPublication: the latest complete publication with the same content
+            fingerprint and options, or None if there is none
+
+    """
+    return RpmPublication.objects.filter(
+        complete=True,
+        content_fingerprint=publication.content_fingerprint,
+        changelog_limit=publication.changelog_limit,
+        sqlite_metadata=publication.sqlite_metadata,
+        metadata_compression=publication.metadata_compression,
+        sqlite_compression=publication.sqlite_compression,
+        metadata_compression_level=publication.metadata_compression_level,
+        sqlite_compression_level=publication.sqlite_compression_level,
+        zchunk_metadata=publication.zchunk_metadata,
+    ).exclude(pk=publication.pk).order_by('-_created').first()
+
+
+def copy_published_metadata(source, publication):
+    """
+    Publish the metadata files of a publication in another one, at the same relative paths.
+
+    Args:
+        source (pulp_rpm.app.models.RpmPublication): the publication to copy the metadata of
+        publication (pulp_rpm.app.models.RpmPublication): the new publication
+
+    """
+    for published_metadata in PublishedMetadata.objects.filter(publication=source):
+        with published_metadata.file.open('rb') as metadata_file:
+            PublishedMetadata(
+                relative_path=published_metadata.relative_path,
+                publication=publication,
+                file=File(metadata_file, name=os.path.basename(published_metadata.relative_path))
+            ).save()
+
+
+def previous_package_metadata(repository_version, changelog_limit):
+    """
+    Find the package metadata of the latest publication an incremental publish can start from.
+
+    It is the latest complete publication of an older version of the same repository, which
+    has been published with the same changelog limit and has package metadata generated by Pulp.
+    Publications of mirrored repository versions serve the upstream metadata and are skipped,
+    so a mirror publication of a newer version doesn't hide an older generated publication.
+
+    Args:
+        repository_version (pulpcore.plugin.models.RepositoryVersion): the version to publish
+        changelog_limit (int): the changelog limit of the new publication
+
+    Returns:
+        tuple: the previous publication and a dict of its PublishedMetadata with the
+            PACKAGE_REPODATA types as keys, or (None, None) if there is no such publication
+
+    """
+    primary = PublishedMetadata.objects.filter(
+        publication=OuterRef('pk'), relative_path__contains='-primary.xml'
+    )
+    previous = RpmPublication.objects.filter(
+        repository_version__repository=repository_version.repository,
+        repository_version__number__lt=repository_version.number,
+        complete=True,
+        changelog_limit=changelog_limit,
+        content_fingerprint__isnull=False,
+    ).annotate(
+        has_primary=Exists(primary)
+    ).filter(
+        has_primary=True
+    ).order_by('-repository_version__number', '-_created').first()
+    if previous is None:
+        return None, None
+
+    metadata = {}
+    for published_metadata in PublishedMetadata.objects.filter(publication=previous):
+        for data_type in PACKAGE_REPODATA:
+            name = os.path.basename(published_metadata.relative_path)
+            compression = compression_type(name)
+            suffix = COMPRESSION_SUFFIXES[compression] if compression else ''
+            if name.endswith('-{t}.xml{suffix}'.format(t=data_type, suffix=suffix)):
+                metadata[data_type] = published_metadata
+    if len(metadata) != len(PACKAGE_REPODATA):
+        return None, None
+    return previous, metadata
+
+
+def copy_package_entries(published_metadata, writer, skipped_pkgids):
+    """
+    Copy the package entries of a published metadata file to a new one.
+
+    The metadata files are generated by createrepo_c, so each package entry starts with a line
+    beginning with `<package` and ends with a line beginning with `</package>`. The pkgId of an
+    entry is its first `pkgid` attribute, or for primary.xml the checksum marked as the pkgid.
+
+    Args:
+        published_metadata (pulpcore.plugin.models.PublishedMetadata): a primary, filelists or
+            other XML file of a previous publication
+        writer (pulp_rpm.app.tasks.writers.MetadataWriter): writer of the new metadata file
+        skipped_pkgids (set): pkgIds of the packages whose entries are not copied
+
+    """
+    entry = []
+    compression = compression_type(published_metadata.relative_path)
+    with published_metadata.file.open('rb') as compressed:
+        with open_compressed(compressed, compression) as lines:
+            for line in lines:
+                if not entry and not line.startswith('<package'):
+                    continue
+                entry.append(line)
+                if not line.startswith('</package>'):
+                    continue
+
+                chunk = ''.join(entry)
+                entry = []
+                match = PKGID_PATTERN.search(chunk)
+                if match is None or match.group(1) not in skipped_pkgids:
+                    writer.add_chunk(chunk)
+
+
+def publish(repository_version_pk, changelog_limit=None, sqlite_metadata=True,
+            incremental=False, metadata_compression=COMPRESSION_TYPES.GZ,
+            sqlite_compression=COMPRESSION_TYPES.BZ2, metadata_compression_level=None,
+            sqlite_compression_level=None, zchunk_metadata=False):
     """
     Create a Publication based on a RepositoryVersion.
 
+    An incremental publish starts from the package metadata of a previous publication of the
+    same repository. The entries of the packages which are still in the repository are copied
+    from it and only the entries of the added packages are written, so the packages of the
+    repository don't need to be loaded. If there is no suitable previous publication, all the
+    metadata is generated.
+
+    The metadata files are compressed, and their sqlite databases created, by one worker process
+    per file, so publishing takes about as long as writing the biggest file.
+
+    If the same content has already been published with the same options, in any repository,
+    the metadata of that publication is copied instead of generated.
+
     Args:
         repository_version_pk (str): Create a publication from this repository version.
+        changelog_limit (int): Number of the newest changelogs to publish for each package.
+        sqlite_metadata (bool): Whether to publish the sqlite databases of the metadata.
+        incremental (bool): Whether to start from the metadata of a previous publication.
+        metadata_compression (str): Compression type of the XML metadata files.
+        sqlite_compression (str): Compression type of the sqlite databases.
+        metadata_compression_level (int): Compression level of the XML metadata files, the
+            default one of the compression type if None.
+        sqlite_compression_level (int): Compression level of the sqlite databases, the default
+            one of the compression type if None.
+        zchunk_metadata (bool): Whether to publish zchunk files of the package metadata.
+
+    Raises:
+        ValueError: If zchunk files are requested but the zck tool is not installed.
+
     """
+    if zchunk_metadata and not zchunk_available():
+        raise ValueError(_("zchunk metadata can't be published, the zck tool is not installed "
+                           "on this worker."))
+
     repository_version = RepositoryVersion.objects.get(pk=repository_version_pk)
 
     log.info(_('Publishing: repository={repo}, version={version}').format(
@@ -96,82 +305,103 @@ def publish(repository_version_pk):
 
     with WorkingDirectory():
         with RpmPublication.create(repository_version) as publication:
-            packages = populate(publication)
+            publication.changelog_limit = changelog_limit
+            publication.sqlite_metadata = sqlite_metadata
+            publication.metadata_compression = metadata_compression
+            publication.sqlite_compression = sqlite_compression
+            publication.metadata_compression_level = metadata_compression_level
+            publication.sqlite_compression_level = sqlite_compression_level
+            publication.zchunk_metadata = zchunk_metadata
+            publication.content_fingerprint = content_fingerprint(repository_version)
+            publication.save()
+            packages, relative_paths = populate(publication)
+
+            # The metadata of a publication of the same content with the same options is reused
+            identical = identical_publication(publication)
+            if identical is not None:
+                log.info(_('Reusing the metadata of the publication of {repo} version '
+                           '{version}').format(repo=identical.repository_version.repository.name,
+                                               version=identical.repository_version.number))
+                copy_published_metadata(identical, publication)
+                return
 
-            # Prepare metadata files
             repomd_path = os.path.join(os.getcwd(), "repomd.xml")
-            pri_xml_path = os.path.join(os.getcwd(), "primary.xml.gz")
-            fil_xml_path = os.path.join(os.getcwd(), "filelists.xml.gz")
-            oth_xml_path = os.path.join(os.getcwd(), "other.xml.gz")
-            pri_db_path = os.path.join(os.getcwd(), "primary.sqlite")
-            fil_db_path = os.path.join(os.getcwd(), "filelists.sqlite")
-            oth_db_path = os.path.join(os.getcwd(), "other.sqlite")
-            upd_xml_path = os.path.join(os.getcwd(), "updateinfo.xml.gz")
-
-            pri_xml = cr.PrimaryXmlFile(pri_xml_path)
-            fil_xml = cr.FilelistsXmlFile(fil_xml_path)
-            oth_xml = cr.OtherXmlFile(oth_xml_path)
-            pri_db = cr.PrimarySqlite(pri_db_path)
-            fil_db = cr.FilelistsSqlite(fil_db_path)
-            oth_db = cr.OtherSqlite(oth_db_path)
-            upd_xml = cr.UpdateInfoXmlFile(upd_xml_path)
-
-            pri_xml.set_num_of_pkgs(len(packages))
-            fil_xml.set_num_of_pkgs(len(packages))
-            oth_xml.set_num_of_pkgs(len(packages))
-
-            # Process all packages
-            for package in packages:
-                pkg = package.to_createrepo_c()
-                pkg.location_href = package.contentartifact_set.first().relative_path
-                pri_xml.add_pkg(pkg)
-                fil_xml.add_pkg(pkg)
-                oth_xml.add_pkg(pkg)
-                pri_db.add_pkg(pkg)
-                fil_db.add_pkg(pkg)
-                oth_db.add_pkg(pkg)
-
-            # Process update records
-            for update_record in UpdateRecord.objects.filter(
-                    pk__in=publication.repository_version.content):
-                upd_xml.add_chunk(update_record_xml(update_record))
-
-            pri_xml.close()
-            fil_xml.close()
-            oth_xml.close()
-            upd_xml.close()
 
-            repomd = cr.Repomd()
+            previous, previous_metadata = None, None
+            if incremental:
+                previous, previous_metadata = previous_package_metadata(repository_version,
+                                                                        changelog_limit)
+
+            num_of_pkgs = packages.count()
+            if previous is not None:
+                log.info(_('Publishing incrementally from the publication of version '
+                           '{version}').format(version=previous.repository_version.number))
+                previous_content = previous.repository_version.content
+                removed_pkgids = set(Package.objects.filter(pk__in=previous_content).exclude(
+                    pk__in=repository_version.content).values_list('pkgId', flat=True))
+                packages = packages.exclude(pk__in=previous_content)
+
+            # Each metadata file, with its sqlite database, is written by a separate process
+            compression = {
+                'compression': metadata_compression,
+                'sqlite_compression': sqlite_compression,
+                'compression_level': metadata_compression_level,
+                'sqlite_compression_level': sqlite_compression_level,
+            }
+            writers = {
+                data_type: MetadataWriter(data_type, num_of_pkgs=num_of_pkgs,
+                                          sqlite_metadata=sqlite_metadata,
+                                          zchunk=zchunk_metadata, **compression)
+                for data_type in PACKAGE_REPODATA
+            }
+            writers['updateinfo'] = MetadataWriter('updateinfo', **compression)
+
+            content = publication.repository_version.content
+            comps = [
+                (PackageGroup.objects.filter(pk__in=content), package_group_xml),
+                (Category.objects.filter(pk__in=content), category_xml),
+                (Environment.objects.filter(pk__in=content), environment_xml),
+                (Langpacks.objects.filter(pk__in=content), langpacks_xml),
+            ]
+            # Modules are not published, only some fields of their modulemd documents are
+            # stored, which are not enough to write valid documents
+            if any(queryset.exists() for queryset, render in comps):
+                writers['group'] = MetadataWriter('group', **compression)
+            try:
+                if previous is not None:
+                    for data_type in PACKAGE_REPODATA:
+                        copy_package_entries(previous_metadata[data_type], writers[data_type],
+                                             removed_pkgids)
+
+                publish_packages(packages, relative_paths, writers,
+                                 changelog_limit=changelog_limit)
+
+                publish_update_records(
+                    UpdateRecord.objects.filter(pk__in=publication.repository_version.content),
+                    writers['updateinfo']
+                )
+
+                if 'group' in writers:
+                    publish_content(comps, writers['group'], header=COMPS_HEADER,
+                                    footer=COMPS_FOOTER)
 
-            repomdrecords = (("primary", pri_xml_path, pri_db),
-                             ("filelists", fil_xml_path, fil_db),
-                             ("other", oth_xml_path, oth_db),
-                             ("primary_db", pri_db_path, None),
-                             ("filelists_db", fil_db_path, None),
-                             ("other_db", oth_db_path, None),
-                             ("updateinfo", upd_xml_path, None))
-
-            sqlite_files = ("primary_db", "filelists_db", "other_db")
-            for name, path, db_to_update in repomdrecords:
-                record = cr.RepomdRecord(name, path)
-                if name in sqlite_files:
-                    record_bz = record.compress_and_fill(cr.SHA256, cr.BZ2)
-                    record_bz.type = name
-                    record_bz.rename_file()
-                    path = record_bz.location_href.split('/')[-1]
-                    repomd.set_record(record_bz)
-                else:
-                    record.fill(cr.SHA256)
-                    if (db_to_update):
-                        db_to_update.dbinfo_update(record.checksum)
-                        db_to_update.close()
-                    record.rename_file()
-                    path = record.location_href.split('/')[-1]
-                    repomd.set_record(record)
+                records = []
+                for writer in writers.values():
+                    records.extend(writer.close())
+            except Exception:
+                for writer in writers.values():
+                    writer.terminate()
+                raise
+
+            repomd = cr.Repomd()
+            for fields in records:
+                record = repomd_record(fields)
+                repomd.set_record(record)
+                path = os.path.basename(record.location_href)
                 metadata = PublishedMetadata(
-                    relative_path=os.path.join(REPODATA_PATH, os.path.basename(path)),
+                    relative_path=os.path.join(REPODATA_PATH, path),
                     publication=publication,
-                    file=File(open(os.path.basename(path), 'rb'))
+                    file=File(open(path, 'rb'))
                 )
                 metadata.save()
 
@@ -186,6 +416,116 @@ def publish(repository_version_pk):
             metadata.save()
 
 
+def publish_packages(packages, relative_paths, writers, changelog_limit=None):
+    """
+    Write the primary, filelists and other XML of packages.
+
+    The packages are streamed in chunks, so the memory used doesn't depend on their number.
+    The XML of each package is rendered once and reused afterwards, the packages it had to be
+    rendered for are updated.
+
+    Args:
+        packages (django.db.models.QuerySet): the packages to write
+        relative_paths (dict): the relative paths the packages are published at, by their pk
+        writers (dict): MetadataWriters of the metadata files, by their type
+
+    Keyword Args:
+        changelog_limit (int): Number of the newest changelogs to publish for each package.
+            The other XML is rendered from the fields it is made of then, which are loaded
+            instead of the stored other XML.
+
+    """
+    # only the XML of the packages is loaded, one chunk at a time
+    fields = ['primary_xml', 'filelists_xml']
+    if changelog_limit is None:
+        fields.append('other_xml')
+    else:
+        fields.extend(Package.OTHER_XML_FIELDS)
+    fragments = packages.only(*fields).iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        chunk = list(islice(fragments, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        unrendered = {package.pk: package for package in chunk if package.primary_xml is None}
+        if unrendered:
+            # the fields are streamed as tuples, no full instances are loaded
+            cr_packages = Package.createrepo_c_packages(Package.objects.filter(pk__in=unrendered))
+            for pk, cr_package in cr_packages:
+                unrendered[pk].render_xml(cr_package)
+            Package.objects.bulk_update(
+                unrendered.values(), ['primary_xml', 'filelists_xml', 'other_xml']
+            )
+
+        for package in chunk:
+            writers['primary'].add_chunk(package.primary_xml_at(relative_paths[package.pk]))
+            writers['filelists'].add_chunk(package.filelists_xml)
+            if changelog_limit is None:
+                writers['other'].add_chunk(package.other_xml)
+            else:
+                writers['other'].add_chunk(package.render_other_xml(changelog_limit))
+
+
+def publish_update_records(update_records, writer):
+    """
+    Write the updateinfo XML of advisories.
+
+    The XML of an advisory is rendered by the first publish which includes it and stored, later
+    publishes only read it. The advisories which were not rendered yet are loaded in chunks
+    together with their collections, packages and references, so the number of queries only
+    depends on the number of chunks.
+
+    Args:
+        update_records (django.db.models.QuerySet): the advisories to write
+        writer (pulp_rpm.app.tasks.writers.MetadataWriter): writer of updateinfo.xml
+
+    """
+    rows = update_records.order_by('pk').values_list('pk', 'updateinfo_xml').\
+        iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        unrendered = [pk for pk, updateinfo_xml in chunk if updateinfo_xml is None]
+        rendered = {}
+        if unrendered:
+            rendered_records = list(
+                UpdateRecord.objects.filter(pk__in=unrendered).
+                prefetch_related('collections__packages', 'references')
+            )
+            for update_record in rendered_records:
+                update_record.updateinfo_xml = update_record_xml(update_record)
+                rendered[update_record.pk] = update_record.updateinfo_xml
+            UpdateRecord.objects.bulk_update(rendered_records, ['updateinfo_xml'])
+
+        for pk, updateinfo_xml in chunk:
+            writer.add_chunk(rendered.get(pk, updateinfo_xml))
+
+
+def publish_content(renderers, writer, header=None, footer=None):
+    """
+    Write the metadata of content which is not published by createrepo_c.
+
+    Args:
+        renderers (list): pairs of a queryset of content and a function rendering the metadata
+            of a content unit
+        writer (pulp_rpm.app.tasks.writers.MetadataWriter): writer of the metadata file
+
+    Keyword Args:
+        header (str): text written before the content
+        footer (str): text written after the content
+
+    """
+    if header:
+        writer.add_chunk(header)
+    for queryset, render in renderers:
+        for content in queryset.order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+            writer.add_chunk(render(content))
+    if footer:
+        writer.add_chunk(footer)
+
+
 def populate(publication):
     """
     Populate a publication.
@@ -196,21 +536,122 @@ def populate(publication):
         publication (pulpcore.plugin.models.Publication): A Publication to populate.
 
     Returns:
-        packages (pulp_rpm.models.Package): A list of published packages.
+        tuple: A queryset of the published packages and a dict of the relative paths they are
+            published at, by their pk.
 
     """
     packages = Package.objects.filter(pk__in=publication.repository_version.content).\
-        prefetch_related('contentartifact_set')
+        order_by('pk')
+    content_artifacts = ContentArtifact.objects.filter(content__in=packages.values('pk')).\
+        values_list('pk', 'content_id', 'relative_path')
+
+    relative_paths = {}
     published_artifacts = []
+    for content_artifact_pk, content_pk, relative_path in \
+            content_artifacts.iterator(chunk_size=CHUNK_SIZE):
+        relative_paths[content_pk] = relative_path
+        published_artifacts.append(PublishedArtifact(
+            relative_path=relative_path,
+            publication=publication,
+            content_artifact_id=content_artifact_pk
+        ))
+        if len(published_artifacts) >= CHUNK_SIZE:
+            PublishedArtifact.objects.bulk_create(published_artifacts)
+            published_artifacts = []
+    PublishedArtifact.objects.bulk_create(published_artifacts)
 
-    for package in packages:
-        for content_artifact in package.contentartifact_set.all():
-            published_artifacts.append(PublishedArtifact(
-                relative_path=content_artifact.relative_path,
-                publication=publication,
-                content_artifact=content_artifact)
-            )
+    return packages, relative_paths
 
-    PublishedArtifact.objects.bulk_create(published_artifacts)
 
-    return packages
+def mirrored_locations(repository_version):
+    """
+    Read the locations of the packages from the mirrored primary.xml of a RepositoryVersion.
+
+    Packages are shared by all the repositories they are synced to, so the location_href of a
+    package is the one of the first repository it was synced from. The mirrored metadata
+    points at the locations of this repository.
+
+    Args:
+        repository_version (pulpcore.plugin.models.RepositoryVersion): A mirrored
+            RepositoryVersion.
+
+    Returns:
+        dict: the location of each package in the upstream repository, by pkgId
+
+    """
+    locations = {}
+
+    def pkgcb(package):
+        """
+        Keep the location of a parsed package.
+
+        Args:
+            package(createrepo_c.Package): a parsed package
+
+        """
+        locations[package.pkgId] = package.location_href
+
+    primary_files = RepoMetadataFile.objects.filter(
+        pk__in=repository_version.content, data_type='primary'
+    )
+    content_artifacts = ContentArtifact.objects.filter(content__in=primary_files).\
+        select_related('artifact')
+    for content_artifact in content_artifacts:
+        cr.xml_parse_primary(content_artifact.artifact.file.path, pkgcb=pkgcb, do_files=False)
+    return locations
+
+
+def publish_mirror(repository_version):
+    """
+    Create a Publication which serves the upstream repodata of a mirrored RepositoryVersion.
+
+    The metadata files saved during a mirror sync are published as-is, so no metadata is
+    regenerated and the original checksums and signatures are kept. Packages are published
+    at the locations the mirrored primary.xml points to, the images of a kickstart tree at their
+    paths in the tree.
+
+    Args:
+        repository_version (pulpcore.plugin.models.RepositoryVersion): A mirrored
+            RepositoryVersion to publish.
+
+    """
+    log.info(_('Publishing mirrored metadata: repository={repo}, version={version}').format(
+        repo=repository_version.repository.name,
+        version=repository_version.number,
+    ))
+
+    with RpmPublication.create(repository_version) as publication:
+        packages = Package.objects.filter(pk__in=repository_version.content).\
+            prefetch_related('contentartifact_set')
+        metadata_files = RepoMetadataFile.objects.filter(pk__in=repository_version.content).\
+            prefetch_related('contentartifact_set')
+        distribution_trees = DistributionTree.objects.\
+            filter(pk__in=repository_version.content).prefetch_related('contentartifact_set')
+        published_artifacts = []
+        locations = mirrored_locations(repository_version)
+
+        for package in packages:
+            for content_artifact in package.contentartifact_set.all():
+                published_artifacts.append(PublishedArtifact(
+                    relative_path=locations.get(package.pkgId, package.location_href),
+                    publication=publication,
+                    content_artifact=content_artifact)
+                )
+
+        for metadata_file in metadata_files:
+            for content_artifact in metadata_file.contentartifact_set.all():
+                published_artifacts.append(PublishedArtifact(
+                    relative_path=metadata_file.relative_path,
+                    publication=publication,
+                    content_artifact=content_artifact)
+                )
+
+        for distribution_tree in distribution_trees:
+            for content_artifact in distribution_tree.contentartifact_set.all():
+                published_artifacts.append(PublishedArtifact(
+                    relative_path=content_artifact.relative_path,
+                    publication=publication,
+                    content_artifact=content_artifact)
+                )
+
+        PublishedArtifact.objects.bulk_create(published_artifacts)
@@ -0,0 +1,193 @@
+import json
+from xml.etree import ElementTree
+
+
+COMPS_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<!DOCTYPE comps PUBLIC "-//Red Hat, Inc.//DTD Comps info//EN" "comps.dtd">\n'
+    '<comps>\n'
+)
+COMPS_FOOTER = '</comps>\n'
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def load_json(value, default):
+    """
+    Load a list or a dict stored as JSON text in a field of comps content.
+
+    Args:
+        value (str): the JSON text
+        default: what an empty value stands for
+
+    Returns:
+        the loaded value, the default for an empty value
+
+    """
+    if not value:
+        return default
+    return json.loads(value)
+
+
+def _sub_element(parent, tag, text=None, **attributes):
+    """
+    Add a sub element with a text.
+
+    Args:
+        parent (xml.etree.ElementTree.Element): the parent element
+        tag (str): the tag of the element
+
+    Keyword Args:
+        text: the text of the element, converted to a string, the element has no text if None
+        attributes: the attributes of the element
+
+    Returns:
+        xml.etree.ElementTree.Element: the element
+
+    """
+    element = ElementTree.SubElement(parent, tag, attributes)
+    if text is not None:
+        element.text = str(text)
+    return element
+
+
+def _boolean(value):
+    """
+    Format a boolean the way comps.xml does.
+    """
+    return 'true' if value else 'false'
+
+
+def _add_translated(element, tag, text, by_lang):
+    """
+    Add an element and its translations.
+
+    Args:
+        element (xml.etree.ElementTree.Element): the parent element
+        tag (str): the tag of the elements
+        text (str): the untranslated text
+        by_lang (str): the translations, as JSON text of a dict by language
+
+    """
+    _sub_element(element, tag, text)
+    for lang, translation in sorted(load_json(by_lang, {}).items()):
+        _sub_element(element, tag, translation, **{XML_LANG: lang})
+
+
+def _add_group_ids(element, tag, group_ids):
+    """
+    Add a list of group ids.
+
+    Args:
+        element (xml.etree.ElementTree.Element): the parent element
+        tag (str): the tag of the list
+        group_ids (str): the group ids, as JSON text of a list of ids or of dicts with a 'name'
+            and a 'default' flag
+
+    """
+    group_list = _sub_element(element, tag)
+    for group_id in load_json(group_ids, []):
+        if isinstance(group_id, dict):
+            attributes = {'default': 'true'} if group_id.get('default') else {}
+            _sub_element(group_list, 'groupid', group_id['name'], **attributes)
+        else:
+            _sub_element(group_list, 'groupid', group_id)
+
+
+def _to_string(element):
+    """
+    Serialize an element of comps.xml.
+    """
+    return ElementTree.tostring(element, encoding='unicode') + '\n'
+
+
+def package_group_xml(group):
+    """
+    Render the comps.xml entry of a package group.
+
+    Args:
+        group (pulp_rpm.app.models.PackageGroup): the group
+
+    Returns:
+        str: the group element
+
+    """
+    element = ElementTree.Element('group')
+    _sub_element(element, 'id', group.id)
+    _add_translated(element, 'name', group.name, group.name_by_lang)
+    _add_translated(element, 'description', group.description, group.desc_by_lang)
+    _sub_element(element, 'default', _boolean(group.default))
+    _sub_element(element, 'uservisible', _boolean(group.user_visible))
+    _sub_element(element, 'biarchonly', _boolean(group.biarch_only))
+    _sub_element(element, 'display_order', group.display_order)
+
+    package_list = _sub_element(element, 'packagelist')
+    for package in load_json(group.packages, []):
+        if not isinstance(package, dict):
+            package = {'name': package}
+        attributes = {'type': package.get('type') or 'mandatory'}
+        if package.get('requires'):
+            attributes['requires'] = package['requires']
+        if package.get('basearchonly'):
+            attributes['basearchonly'] = 'true'
+        _sub_element(package_list, 'packagereq', package['name'], **attributes)
+    return _to_string(element)
+
+
+def category_xml(category):
+    """
+    Render the comps.xml entry of a category.
+
+    Args:
+        category (pulp_rpm.app.models.Category): the category
+
+    Returns:
+        str: the category element
+
+    """
+    element = ElementTree.Element('category')
+    _sub_element(element, 'id', category.id)
+    _add_translated(element, 'name', category.name, category.name_by_lang)
+    _add_translated(element, 'description', category.description, category.desc_by_lang)
+    _sub_element(element, 'display_order', category.display_order)
+    _add_group_ids(element, 'grouplist', category.group_ids)
+    return _to_string(element)
+
+
+def environment_xml(environment):
+    """
+    Render the comps.xml entry of an environment.
+
+    Args:
+        environment (pulp_rpm.app.models.Environment): the environment
+
+    Returns:
+        str: the environment element
+
+    """
+    element = ElementTree.Element('environment')
+    _sub_element(element, 'id', environment.id)
+    _add_translated(element, 'name', environment.name, environment.name_by_lang)
+    _add_translated(element, 'description', environment.description,
+                    environment.desc_by_lang)
+    _sub_element(element, 'display_order', environment.display_order)
+    _add_group_ids(element, 'grouplist', environment.group_ids)
+    _add_group_ids(element, 'optionlist', environment.option_ids)
+    return _to_string(element)
+
+
+def langpacks_xml(langpacks):
+    """
+    Render the comps.xml entry of langpacks.
+
+    Args:
+        langpacks (pulp_rpm.app.models.Langpacks): the langpacks
+
+    Returns:
+        str: the langpacks element
+
+    """
+    element = ElementTree.Element('langpacks')
+    for name, install in sorted(load_json(langpacks.matches, {}).items()):
+        _sub_element(element, 'match', install=install, name=name)
+    return _to_string(element)
@@ -1,32 +1,57 @@
 import asyncio
 import hashlib
+import json
 import logging
 import os
+import sys
 
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from gettext import gettext as _  # noqa:F401
 from urllib.parse import urljoin
 
 import createrepo_c as cr
 
-from pulpcore.plugin.models import Artifact, ProgressBar, Remote, Repository
+from aiohttp import ClientResponseError
+from django.conf import settings
+from django.db import connection, transaction
+
+from pulpcore.plugin.models import (
+    Artifact,
+    ProgressBar,
+    Remote,
+    Repository,
+    RepositoryVersion,
+)
 
 from pulpcore.plugin.stages import (
     ArtifactDownloader,
     ArtifactSaver,
+    ContentAssociation,
     ContentSaver,
     DeclarativeArtifact,
     DeclarativeContent,
     DeclarativeVersion,
     RemoteArtifactSaver,
-    RemoveDuplicates,
     Stage,
     QueryExistingArtifacts,
-    QueryExistingContents
+    QueryExistingContents,
+    create_pipeline,
+)
+from pulpcore.plugin.tasking import WorkingDirectory
+
+
+from pulp_rpm.app.constants import (
+    CHECKSUM_TYPES,
+    CR_PACKAGE_ATTRS,
+    PACKAGE_REPODATA,
+    REPOMD_DATA_TYPE,
+    REPOMD_SIGNATURE_FILES,
+    SIGNATURE_POLICIES,
+    SIGNATURE_STATUSES,
+    TREEINFO_DATA_TYPE,
+    UPDATE_REPODATA,
 )
-
-
-from pulp_rpm.app.constants import CHECKSUM_TYPES, PACKAGE_REPODATA, UPDATE_REPODATA
 from pulp_rpm.app.models import (
     Addon,
     Checksum,
@@ -34,26 +59,43 @@ from pulp_rpm.app.models import (
     Image,
     Variant,
     Package,
+    PackageCapability,
+    RepoMetadataFile,
     RpmRemote,
     UpdateCollection,
     UpdateCollectionPackage,
     UpdateRecord,
     UpdateReference,
 )
-from pulp_rpm.app.tasks.utils import get_kickstart_data, repodata_exists
+from pulp_rpm.app.tasks.instrumentation import PipelineInstrumentation
+from pulp_rpm.app.tasks.linking import link_update_collection_packages
+from pulp_rpm.app.tasks.publishing import publish_mirror
+from pulp_rpm.app.tasks.utils import (
+    check_package_signature,
+    get_kickstart_data,
+    import_gpg_keys,
+    repodata_exists,
+    rpm_header_to_dict,
+)
 
 log = logging.getLogger(__name__)
 
 
-def synchronize(remote_pk, repository_pk):
+def synchronize(remote_pk, repository_pk, mirror=False, mirror_metadata=False):
     """
     Sync content from the remote repository.
 
     Create a new version of the repository that is synchronized with the remote.
 
+    When the metadata is mirrored, the upstream repodata is stored as well and a publication
+    which serves it verbatim is created right away, so the mirrored repository version does not
+    need to be published. The repository version is then a mirror of the remote too.
+
     Args:
         remote_pk (str): The remote PK.
         repository_pk (str): The repository PK.
+        mirror (bool): True for mirror mode, False for additive mode.
+        mirror_metadata (bool): True to store and publish the upstream repodata as-is.
 
     Raises:
         ValueError: If the remote does not specify a url to sync.
@@ -72,6 +114,8 @@ def synchronize(remote_pk, repository_pk):
         r=repository.name, p=remote.name))
 
     deferred_download = (remote.policy != Remote.IMMEDIATE)  # Interpret download policy
+    # metadata served verbatim must describe exactly the content of the repository version
+    mirror = mirror or mirror_metadata
 
     kickstart = get_kickstart_data(remote)
     if kickstart:
@@ -88,24 +132,79 @@ def synchronize(remote_pk, repository_pk):
             path = f"{repodata}/"
             new_url = urljoin(remote.url, path)
             if repodata_exists(remote, new_url):
-                stage = RpmFirstStage(remote, deferred_download, new_url=new_url)
+                stage = RpmFirstStage(remote, deferred_download, new_url=new_url,
+                                      mirror_metadata=mirror_metadata)
                 dv = RpmDeclarativeVersion(first_stage=stage,
                                            repository=new_repository,
+                                           mirror=mirror,
                                            remove_duplicates=[package_dupe_criteria])
                 dv.create()
-
-    first_stage = RpmFirstStage(remote, deferred_download, kickstart=kickstart)
+                new_version = dv.created_version()
+                if new_version is not None:
+                    link_update_collection_packages(repository_version_pk=new_version.pk)
+                    if mirror_metadata:
+                        publish_mirror(new_version)
+
+    first_stage = RpmFirstStage(remote, deferred_download, kickstart=kickstart,
+                                mirror_metadata=mirror_metadata)
     dv = RpmDeclarativeVersion(first_stage=first_stage,
                                repository=repository,
+                               mirror=mirror,
                                remove_duplicates=[package_dupe_criteria])
     dv.create()
 
+    new_version = dv.created_version()
+    if new_version is not None:
+        # advisories may have been saved before the packages they refer to
+        link_update_collection_packages(repository_version_pk=new_version.pk)
+        if mirror_metadata:
+            publish_mirror(new_version)
+
 
 class RpmDeclarativeVersion(DeclarativeVersion):
     """
     Subclassed Declarative version creates a custom pipeline for RPM sync.
+
+    When the `RPM_SYNC_INSTRUMENTATION` setting is enabled, every stage of the pipeline,
+    including the ContentAssociation stage appended by pulpcore, is instrumented and the
+    collected statistics are logged as a JSON report once the pipeline is done.
     """
 
+    def create(self):
+        """
+        Perform the work specified by the pipeline and report its statistics if enabled.
+        """
+        self.new_version = None
+        if not getattr(settings, 'RPM_SYNC_INSTRUMENTATION', False):
+            super().create()
+            return
+
+        instrumentation = PipelineInstrumentation()
+        try:
+            with connection.execute_wrapper(instrumentation.db_wrapper):
+                self.create_instrumented(instrumentation)
+        finally:
+            log.info(_('Sync pipeline statistics: repository={repo} report={report}').format(
+                repo=self.repository.name,
+                report=json.dumps(instrumentation.report())
+            ))
+
+    def create_instrumented(self, instrumentation):
+        """
+        Perform the work like `DeclarativeVersion.create`, with all the stages instrumented.
+
+        Args:
+            instrumentation (PipelineInstrumentation): collects the statistics of the stages
+
+        """
+        with WorkingDirectory():
+            with self.repository.new_version() as new_version:
+                loop = asyncio.get_event_loop()
+                stages = self.pipeline_stages(new_version)
+                stages.append(ContentAssociation(new_version, self.mirror))
+                pipeline = create_pipeline(instrumentation.wrap(stages))
+                loop.run_until_complete(pipeline)
+
     def pipeline_stages(self, new_version):
         """
         Build a list of stages feeding into the ContentUnitAssociation stage.
@@ -120,20 +219,139 @@ class RpmDeclarativeVersion(DeclarativeVersion):
             list: List of :class:`~pulpcore.plugin.stages.Stage` instances
 
         """
+        self.new_version = new_version
         pipeline = [
             self.first_stage,
             QueryExistingArtifacts(),
             ArtifactDownloader(),
             ArtifactSaver(),
+        ]
+        remote = self.first_stage.remote
+        if remote.verify_headers:
+            pipeline.append(PackageHeaderVerifier())
+        if remote.gpgkey:
+            pipeline.append(PackageSignatureVerifier(remote.gpgkey, remote.signature_policy))
+        pipeline.extend([
             QueryExistingContents(),
             RpmContentSaver(),
             RemoteArtifactSaver(),
-        ]
+        ])
         for dupe_query_dict in self.remove_duplicates:
-            pipeline.append(RemoveDuplicates(new_version, **dupe_query_dict))
+            pipeline.append(BulkRemoveDuplicates(new_version, **dupe_query_dict))
 
         return pipeline
 
+    def created_version(self):
+        """
+        Get the repository version created by the last run of the pipeline.
+
+        Returns:
+            pulpcore.plugin.models.RepositoryVersion: the new version, or None if no version was
+                kept, e.g. because the sync didn't change the content of the repository
+
+        """
+        if self.new_version is None:
+            return None
+        return RepositoryVersion.objects.filter(pk=self.new_version.pk, complete=True).first()
+
+
+class PackageRecord:
+    """
+    A compact representation of a package between the parsing of repodata and its saving.
+
+    It holds the data of a createrepo_c package in slots, so the createrepo_c package can be
+    freed right after parsing and no JSON is encoded until a `Package` is actually needed.
+    Dependency, file and changelog entries are stored as tuples and the strings which repeat
+    across packages are interned.
+
+    The attributes are named the same as the ones of createrepo_c packages, so the record
+    can be converted with `Package.createrepo_to_dict`.
+    """
+
+    __slots__ = tuple(vars(CR_PACKAGE_ATTRS).values())
+
+    INTERNED = (
+        CR_PACKAGE_ATTRS.ARCH,
+        CR_PACKAGE_ATTRS.CHECKSUM_TYPE,
+        CR_PACKAGE_ATTRS.EPOCH,
+        CR_PACKAGE_ATTRS.RPM_BUILDHOST,
+        CR_PACKAGE_ATTRS.RPM_GROUP,
+        CR_PACKAGE_ATTRS.RPM_LICENSE,
+        CR_PACKAGE_ATTRS.RPM_PACKAGER,
+        CR_PACKAGE_ATTRS.RPM_VENDOR,
+    )
+
+    def __init__(self, package):
+        """
+        Copy the data of a createrepo_c package.
+
+        Args:
+            package(createrepo_c.Package): a parsed package
+
+        """
+        for attr in self.__slots__:
+            value = getattr(package, attr)
+            if isinstance(value, list):
+                value = tuple(self.compact_entry(entry) for entry in value)
+            elif attr in self.INTERNED and value:
+                value = sys.intern(value)
+            setattr(self, attr, value)
+
+    @staticmethod
+    def compact_entry(entry):
+        """
+        Convert an entry of a dependency, file or changelog list to a tuple of interned names.
+
+        The flags of dependencies and the types of files are interned, as well as the names of
+        the dependencies, which repeat across packages.
+
+        Args:
+            entry(tuple): an entry of a createrepo_c list attribute
+
+        Returns:
+            tuple: the same entry
+
+        """
+        return tuple(
+            sys.intern(item) if isinstance(item, str) and len(item) < 64 else item
+            for item in entry
+        )
+
+    def to_package(self):
+        """
+        Create the `Package` for the record.
+
+        Returns:
+            Package: an unsaved package
+
+        """
+        return Package(**Package.createrepo_to_dict(self))
+
+
+class PackageDeclarativeContent(DeclarativeContent):
+    """
+    A `DeclarativeContent` whose `Package` is created from a `PackageRecord` on first access.
+
+    Packages wait in the queues of the pipeline until they are needed by one of the stages, so
+    keeping them as records there cuts the memory of a sync. The record or the package is kept
+    in a slot, so the instances don't get a `__dict__` either.
+    """
+
+    __slots__ = ('_content',)
+
+    @property
+    def content(self):
+        """
+        The content unit, created from the record when accessed for the first time.
+        """
+        if isinstance(self._content, PackageRecord):
+            self._content = self._content.to_package()
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
 
 class RpmFirstStage(Stage):
     """
@@ -143,7 +361,8 @@ class RpmFirstStage(Stage):
     that should exist in the new :class:`~pulpcore.plugin.models.RepositoryVersion`.
     """
 
-    def __init__(self, remote, deferred_download, new_url=None, kickstart=None):
+    def __init__(self, remote, deferred_download, new_url=None, kickstart=None,
+                 mirror_metadata=False):
         """
         The first stage of a pulp_rpm sync pipeline.
 
@@ -155,6 +374,8 @@ class RpmFirstStage(Stage):
         Keyword Args:
             new_url(str): URL to replace remote url
             kickstart(dict): Kickstart data
+            mirror_metadata(bool): if True, the repomd.xml and all the metadata files it
+                references are saved as RepoMetadataFile content
 
         """
         super().__init__()
@@ -162,6 +383,7 @@ class RpmFirstStage(Stage):
         self.deferred_download = deferred_download
         self.new_url = new_url
         self.kickstart = kickstart
+        self.mirror_metadata = mirror_metadata
 
     @staticmethod
     async def parse_updateinfo(updateinfo_xml_path):
@@ -306,9 +528,11 @@ class RpmFirstStage(Stage):
                     updateinfo_url = urljoin(remote_url, record.location_href)
                     downloader = self.remote.get_downloader(url=updateinfo_url)
                     downloaders.append([downloader.run()])
+                elif self.mirror_metadata:
+                    log.info(_('Unknown repodata type: {t}. Mirrored as-is.').format(
+                        t=record.type))
                 else:
                     log.info(_('Unknown repodata type: {t}. Skipped.').format(t=record.type))
-                    # TODO: skip databases, save unknown types to publish them as-is
 
             # to preserve order, downloaders are created after all repodata urls are identified
             package_repodata_downloaders = []
@@ -320,11 +544,13 @@ class RpmFirstStage(Stage):
 
             # asyncio.gather is used to preserve the order of results for package repodata
             pending = [asyncio.gather(*downloaders_group) for downloaders_group in downloaders]
+            downloaded_metadata = {}
 
             while pending:
                 done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
                 for downloader in done:
                     results = downloader.result()
+                    downloaded_metadata.update({result.url: result for result in results})
                     if results[0].url == package_repodata_urls['primary']:
                         primary_xml_path = results[0].path
                         filelists_xml_path = results[1].path
@@ -339,8 +565,10 @@ class RpmFirstStage(Stage):
                         packages_pb.state = 'running'
                         packages_pb.save()
 
-                        for pkg in packages.values():
-                            package = Package(**Package.createrepo_to_dict(pkg))
+                        # free every createrepo_c package as soon as its record is built,
+                        # in the order of the repodata
+                        for pkg_id in list(packages):
+                            package = PackageRecord(packages.pop(pkg_id))
                             artifact = Artifact(size=package.size_package)
                             checksum_type = getattr(CHECKSUM_TYPES, package.checksum_type.upper())
                             setattr(artifact, checksum_type, package.pkgId)
@@ -353,7 +581,7 @@ class RpmFirstStage(Stage):
                                 remote=self.remote,
                                 deferred_download=self.deferred_download
                             )
-                            dc = DeclarativeContent(content=package, d_artifacts=[da])
+                            dc = PackageDeclarativeContent(content=package, d_artifacts=[da])
                             packages_pb.increment()
                             await self.put(dc)
 
@@ -391,20 +619,373 @@ class RpmFirstStage(Stage):
                             dc.extra_data = future_relations
                             await self.put(dc)
 
+            if self.mirror_metadata:
+                await self.put_repo_metadata_files(remote_url, result, repomd, downloaded_metadata)
+
         packages_pb.state = 'completed'
         erratum_pb.state = 'completed'
         packages_pb.save()
         erratum_pb.save()
 
+    async def put_repo_metadata_files(self, remote_url, repomd_result, repomd, downloads):
+        """
+        Build `DeclarativeContent` for the repomd.xml and every metadata file it references.
+
+        Files which have already been downloaded for parsing are reused, the rest of them are
+        downloaded by the pipeline. The treeinfo file of a kickstart tree is kept as well, its
+        images are published from the distribution tree.
+
+        Args:
+            remote_url(str): URL of the repository being synced
+            repomd_result(DownloadResult): the result of the repomd.xml download
+            repomd(createrepo_c.Repomd): the parsed repomd.xml
+            downloads(dict): results of the metadata downloads with the URL as a key
+
+        """
+        def downloaded_artifact(relative_path, download):
+            return DeclarativeArtifact(
+                artifact=Artifact(**download.artifact_attributes, file=download.path),
+                url=download.url,
+                relative_path=relative_path,
+                remote=self.remote,
+                deferred_download=False
+            )
+
+        repomd_file = RepoMetadataFile(
+            data_type=REPOMD_DATA_TYPE,
+            checksum_type=CHECKSUM_TYPES.SHA256,
+            checksum=repomd_result.artifact_attributes[CHECKSUM_TYPES.SHA256],
+            relative_path='repodata/repomd.xml'
+        )
+        da = downloaded_artifact(repomd_file.relative_path, repomd_result)
+        await self.put(DeclarativeContent(content=repomd_file, d_artifacts=[da]))
+
+        for data_type, relative_path in REPOMD_SIGNATURE_FILES.items():
+            downloader = self.remote.get_downloader(url=urljoin(remote_url, relative_path))
+            try:
+                download = await downloader.run()
+            except ClientResponseError as exc:
+                if 404 == exc.status:
+                    continue
+                raise
+
+            signature_file = RepoMetadataFile(
+                data_type=data_type,
+                checksum_type=CHECKSUM_TYPES.SHA256,
+                checksum=download.artifact_attributes[CHECKSUM_TYPES.SHA256],
+                relative_path=relative_path
+            )
+            da = downloaded_artifact(relative_path, download)
+            await self.put(DeclarativeContent(content=signature_file, d_artifacts=[da]))
+
+        if self.kickstart:
+            relative_path = self.kickstart['treeinfo']
+            downloader = self.remote.get_downloader(url=urljoin(remote_url, relative_path))
+            download = await downloader.run()
+            treeinfo_file = RepoMetadataFile(
+                data_type=TREEINFO_DATA_TYPE,
+                checksum_type=CHECKSUM_TYPES.SHA256,
+                checksum=download.artifact_attributes[CHECKSUM_TYPES.SHA256],
+                relative_path=relative_path
+            )
+            da = downloaded_artifact(relative_path, download)
+            await self.put(DeclarativeContent(content=treeinfo_file, d_artifacts=[da]))
+
+        for record in repomd.records:
+            checksum_type = getattr(CHECKSUM_TYPES, record.checksum_type.upper())
+            metadata_file = RepoMetadataFile(
+                data_type=record.type,
+                checksum_type=checksum_type,
+                checksum=record.checksum,
+                relative_path=record.location_href
+            )
+            url = urljoin(remote_url, record.location_href)
+            if url in downloads:
+                da = downloaded_artifact(record.location_href, downloads[url])
+            else:
+                artifact = Artifact(size=record.size or None)
+                setattr(artifact, checksum_type, record.checksum)
+                da = DeclarativeArtifact(
+                    artifact=artifact,
+                    url=url,
+                    relative_path=record.location_href,
+                    remote=self.remote,
+                    deferred_download=False
+                )
+            await self.put(DeclarativeContent(content=metadata_file, d_artifacts=[da]))
+
+
+class PackageVerifier(Stage):
+    """
+    Base class for stages which verify downloaded package files in a process pool.
+
+    The files of a batch are verified in parallel, so the verification keeps up with the
+    downloads instead of serializing the sync. Packages which were not downloaded, e.g. because
+    of a deferred download policy, are not verified.
+
+    Subclasses define the function which verifies a file in the process pool and how its
+    result is handled.
+    """
+
+    progress_message = None
+
+    def __init__(self, max_workers=None):
+        """
+        A stage verifying package files.
+
+        Keyword Args:
+            max_workers(int): Size of the process pool, the number of CPUs by default.
+
+        """
+        super().__init__()
+        self.max_workers = max_workers
+
+    def verification(self, package, path):
+        """
+        Define how to verify a package file.
+
+        Args:
+            package(Package): a package created from the repository metadata
+            path(str): path to the downloaded package file
+
+        Returns:
+            tuple: a picklable function and its arguments to be run in the process pool, or None
+                if the package can't be verified
+
+        """
+        raise NotImplementedError
+
+    def handle_result(self, package, result):
+        """
+        Handle the result of a package verification.
+
+        Args:
+            package(Package): the verified package
+            result: the value returned by the verification function, or the exception it raised
+
+        Returns:
+            bool: False if the package should be dropped from the sync, True otherwise
+
+        """
+        raise NotImplementedError
+
+    def report(self):
+        """
+        Report the results of all the verifications, once the last batch is verified.
+        """
+        pass
+
+    async def run(self):
+        """
+        Verify the packages in each batch and pass on the ones which are kept.
+        """
+        loop = asyncio.get_event_loop()
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            with ProgressBar(message=self.progress_message) as pb:
+                async for batch in self.batches():
+                    verified = []
+                    futures = []
+                    for declarative_content in batch:
+                        package = declarative_content.content
+                        if not isinstance(package, Package):
+                            continue
+                        artifact = declarative_content.d_artifacts[0].artifact
+                        if artifact._state.adding or not artifact.file:
+                            continue
+                        verification = self.verification(package, artifact.file.path)
+                        if verification is None:
+                            continue
+                        function, args = verification
+                        verified.append(declarative_content)
+                        futures.append(loop.run_in_executor(executor, function, *args))
+
+                    results = await asyncio.gather(*futures, return_exceptions=True)
+                    dropped = set()
+                    for declarative_content, result in zip(verified, results):
+                        if not self.handle_result(declarative_content.content, result):
+                            dropped.add(declarative_content)
+                    pb.done += len(verified)
+                    pb.save()
+
+                    for declarative_content in batch:
+                        if declarative_content not in dropped:
+                            await self.put(declarative_content)
+
+        self.report()
+
+
+class PackageHeaderVerifier(PackageVerifier):
+    """
+    Verify the headers of downloaded packages against the metadata they were synced with.
+
+    Only the header byte range of each package file is read. Mismatches are reported but do not
+    stop the sync.
+    """
+
+    progress_message = 'Verifying Package Headers'
+    VERIFIED_FIELDS = ('name', 'epoch', 'version', 'release', 'arch', 'size_installed')
+
+    def __init__(self, max_workers=None):
+        """
+        A stage verifying package headers.
+
+        Keyword Args:
+            max_workers(int): Size of the process pool, the number of CPUs by default.
+
+        """
+        super().__init__(max_workers=max_workers)
+        self.mismatched = 0
+
+    @classmethod
+    def header_mismatches(cls, package, header):
+        """
+        Find the fields of a package which disagree with its RPM header.
+
+        Args:
+            package(Package): a package created from the repository metadata
+            header(dict): fields read from the RPM header by `rpm_header_to_dict`
+
+        Returns:
+            list: names of the fields which do not match
+
+        """
+        mismatches = []
+        for field in cls.VERIFIED_FIELDS:
+            value = getattr(package, field)
+            if field == 'epoch':
+                value = value or '0'
+            if str(value) != str(header[field]):
+                mismatches.append(field)
+
+        provides = sorted({provide[0] for provide in package.provides})
+        if provides != header['provides']:
+            mismatches.append('provides')
+
+        return mismatches
+
+    def verification(self, package, path):
+        """
+        Parse the header byte range of the package file.
+        """
+        if package.rpm_header_end is None:
+            return None
+        return rpm_header_to_dict, (path, package.rpm_header_start, package.rpm_header_end)
+
+    def handle_result(self, package, result):
+        """
+        Report the fields which do not match the header, the package is always kept.
+        """
+        if isinstance(result, Exception):
+            mismatches = [str(result)]
+        else:
+            mismatches = self.header_mismatches(package, result)
+        if mismatches:
+            self.mismatched += 1
+            log.warning(_('Package {nevra} does not match its header: {mismatches}').format(
+                nevra=package.nevra, mismatches=', '.join(mismatches)))
+        return True
+
+    def report(self):
+        """
+        Report the number of packages which do not match their headers.
+        """
+        if self.mismatched:
+            log.warning(_('{count} package(s) do not match their headers.').format(
+                count=self.mismatched))
+
+
+class PackageSignatureVerifier(PackageVerifier):
+    """
+    Verify the signatures of downloaded packages against the keys configured on the remote.
+
+    The verification runs offline against a local keyring. Depending on the signature policy,
+    packages which are unsigned or whose signature can't be verified are either dropped from the
+    sync or only reported.
+    """
+
+    progress_message = 'Verifying Package Signatures'
+
+    def __init__(self, gpgkey, policy, max_workers=None):
+        """
+        A stage verifying package signatures.
+
+        Args:
+            gpgkey(str): ASCII armored public keys the packages should be signed with
+            policy(str): one of the SIGNATURE_POLICIES
+
+        Keyword Args:
+            max_workers(int): Size of the process pool, the number of CPUs by default.
+
+        """
+        super().__init__(max_workers=max_workers)
+        self.gpgkey = gpgkey
+        self.policy = policy
+        self.keyring = None
+
+    def verification(self, package, path):
+        """
+        Check the signature of the package file against the local keyring.
+        """
+        return check_package_signature, (self.keyring, path)
+
+    def handle_result(self, package, result):
+        """
+        Apply the signature policy to a package which is not correctly signed.
+        """
+        if isinstance(result, Exception):
+            result = str(result)
+        elif result == SIGNATURE_STATUSES.SIGNED:
+            return True
+
+        if self.policy == SIGNATURE_POLICIES.REJECT:
+            log.error(_('Package {nevra} is rejected, signature check: {result}').format(
+                nevra=package.nevra, result=result))
+            return False
+
+        log.warning(_('Package {nevra} signature check: {result}').format(
+            nevra=package.nevra, result=result))
+        return True
+
+    async def run(self):
+        """
+        Import the keys into a local keyring and verify the packages against it.
+
+        Each stage gets a keyring of its own, a sync runs one pipeline per repository of a
+        kickstart tree in the same working directory. The keys are imported in a thread, so
+        the rpm tools don't block the other stages.
+        """
+        self.keyring = await asyncio.get_event_loop().run_in_executor(
+            None, import_gpg_keys, self.gpgkey, os.getcwd()
+        )
+        await super().run()
+
 
 class RpmContentSaver(ContentSaver):
     """
     A modification of ContentSaver stage that additionally saves RPM plugin specific items.
 
     Saves UpdateCollection, UpdateCollectionPackage, UpdateReference objects related to
-    the UpdateRecord content unit.
+    the UpdateRecord content unit, and the PackageCapability objects of new packages.
     """
 
+    async def _pre_save(self, batch):
+        """
+        Remember the packages of a batch which are not saved yet.
+
+        Args:
+            batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
+                :class:`~pulpcore.plugin.stages.DeclarativeContent` objects to be saved.
+
+        """
+        self.new_packages = []
+        for declarative_content in batch:
+            if declarative_content is None:
+                continue
+            content = declarative_content.content
+            if isinstance(content, Package) and content._state.adding:
+                self.new_packages.append(content)
+
     async def _post_save(self, batch):
         """
         Save a batch of UpdateCollection, UpdateCollectionPackage, UpdateReference objects.
@@ -502,7 +1083,75 @@ class RpmContentSaver(ContentSaver):
             UpdateCollection.objects.bulk_create(update_collections_to_save)
 
         if update_collection_packages_to_save:
+            # packages saved later are linked once they are in the new repository version
+            UpdateCollectionPackage.link_packages(update_collection_packages_to_save)
             UpdateCollectionPackage.objects.bulk_create(update_collection_packages_to_save)
 
         if update_references_to_save:
             UpdateReference.objects.bulk_create(update_references_to_save)
+
+        # packages which failed to save were replaced by the existing ones
+        PackageCapability.create_for_packages(
+            package for package in self.new_packages if not package._state.adding
+        )
+
+
+class BulkRemoveDuplicates(Stage):
+    """
+    Remove units from the new repository version which duplicate the units of the sync.
+
+    A set-based replacement of :class:`~pulpcore.plugin.stages.RemoveDuplicates`. Instead of
+    one OR-ed condition per unit, the content of the repository version is queried once per
+    batch by the values of the first criteria field, which is indexed, and the duplicates are
+    matched in Python.
+    """
+
+    def __init__(self, new_version, model, field_names):
+        """
+        A stage removing duplicates.
+
+        Args:
+            new_version (:class:`~pulpcore.plugin.models.RepositoryVersion`): The repo version
+                the duplicates are removed from.
+            model (:class:`pulpcore.plugin.models.Content`): Subclass of a Content model to
+                remove the duplicates of.
+            field_names (list): Names of the fields whose values identify a duplicate. The
+                first one should be indexed.
+
+        """
+        super().__init__()
+        self.new_version = new_version
+        self.model = model
+        self.field_names = field_names
+
+    async def run(self):
+        """
+        Remove the duplicates of each batch from the repository version.
+        """
+        lookup = '{field}__in'.format(field=self.field_names[0])
+        async for batch in self.batches():
+            keys = set()
+            pks = set()
+            for declarative_content in batch:
+                content = declarative_content.content
+                if type(content) is self.model:
+                    keys.add(tuple(getattr(content, field) for field in self.field_names))
+                    pks.add(content.pk)
+
+            if keys:
+                candidates = self.model.objects.filter(
+                    pk__in=self.new_version.content,
+                    **{lookup: {key[0] for key in keys}}
+                ).values_list('pk', *self.field_names)
+                duplicates = [
+                    pk for pk, *key in candidates.iterator()
+                    if tuple(key) in keys and pk not in pks
+                ]
+                if duplicates:
+                    with transaction.atomic():
+                        self.new_version.remove_content(
+                            self.model.objects.filter(pk__in=duplicates)
+                        )
+
+            for declarative_content in batch:
+                await self.put(declarative_content)
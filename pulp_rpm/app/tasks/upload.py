@@ -7,7 +7,7 @@ from pulpcore.plugin.models import (
 )
 
 from pulp_rpm.app.shared_utils import _prepare_package
-from pulp_rpm.app.models import Package
+from pulp_rpm.app.models import Package, PackageCapability
 
 
 def one_shot_upload(artifact_pk, filename, repository_pk=None):
@@ -27,11 +27,15 @@ def one_shot_upload(artifact_pk, filename, repository_pk=None):
     except OSError:
         raise OSError('RPM file cannot be parsed for metadata.')
 
-    pkg, created = Package.objects.get_or_create(**new_pkg)
+    # look up by the natural key only, the other fields include compressed and JSON data
+    natural_key = {field: new_pkg.pop(field) for field in Package.natural_key_fields()}
+    pkg, created = Package.objects.get_or_create(defaults=new_pkg, **natural_key)
 
     if not created:
         raise OSError('RPM package {} already exists.'.format(pkg.filename))
 
+    PackageCapability.create_for_packages([pkg])
+
     ContentArtifact.objects.create(
         artifact=artifact,
         content=pkg,
@@ -1,3 +1,8 @@
+import os
+import struct
+import subprocess
+import tempfile
+from gettext import gettext as _
 from urllib.parse import urljoin
 
 from aiohttp import ClientResponseError
@@ -6,6 +11,186 @@ from django.utils.timezone import now
 from productmd.common import SortedConfigParser
 from productmd.treeinfo import TreeInfo
 
+from pulp_rpm.app.constants import SIGNATURE_STATUSES
+
+
+RPM_HEADER_MAGIC = b'\x8e\xad\xe8'
+
+# RPM header tags which are compared against the package metadata
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_SIZE = 1009
+RPMTAG_ARCH = 1022
+RPMTAG_SOURCERPM = 1044
+RPMTAG_PROVIDENAME = 1047
+RPMTAG_NOSOURCE = 1051
+RPMTAG_NOPATCH = 1052
+RPMTAG_LONGSIZE = 5009
+
+RPM_INT32_TYPE = 4
+RPM_INT64_TYPE = 5
+RPM_STRING_TYPE = 6
+RPM_STRING_ARRAY_TYPE = 8
+RPM_I18NSTRING_TYPE = 9
+
+
+def read_rpm_header(path, start, end):
+    """
+    Read the main header of an RPM package file.
+
+    Only the byte range of the header is read from the file, the payload is never touched.
+
+    Args:
+        path(str): path to the package file
+        start(int): first byte of the header, as reported by `rpm_header_start`
+        end(int): last byte of the header, as reported by `rpm_header_end`
+
+    Returns:
+        dict: integer and string tags of the header with the tag number as a key. Integers and
+            strings are returned as lists of values.
+
+    Raises:
+        ValueError: If the byte range does not contain an RPM header.
+
+    """
+    with open(path, 'rb') as rpm_file:
+        rpm_file.seek(start)
+        data = rpm_file.read(end - start)
+
+    if len(data) < 16 or data[:3] != RPM_HEADER_MAGIC:
+        raise ValueError(_('No RPM header found at bytes {start}-{end} of {path}').format(
+            start=start, end=end, path=path))
+
+    index_length, store_size = struct.unpack('>II', data[8:16])
+    store_start = 16 + index_length * 16
+    store = data[store_start:store_start + store_size]
+
+    tags = {}
+    for i in range(index_length):
+        tag, tag_type, offset, count = struct.unpack('>iIiI', data[16 + i * 16:32 + i * 16])
+        if tag_type == RPM_INT32_TYPE:
+            tags[tag] = list(struct.unpack_from('>{}I'.format(count), store, offset))
+        elif tag_type == RPM_INT64_TYPE:
+            tags[tag] = list(struct.unpack_from('>{}Q'.format(count), store, offset))
+        elif tag_type in (RPM_STRING_TYPE, RPM_STRING_ARRAY_TYPE, RPM_I18NSTRING_TYPE):
+            if tag_type == RPM_STRING_TYPE:
+                count = 1
+            values = store[offset:].split(b'\x00', count)[:count]
+            tags[tag] = [value.decode('utf-8', 'replace') for value in values]
+
+    return tags
+
+
+def rpm_header_to_dict(path, start, end):
+    """
+    Extract the fields verified against the package metadata from an RPM header.
+
+    The architecture is reported the same way createrepo_c does it, i.e. 'src' or 'nosrc'
+    for source packages.
+
+    Args:
+        path(str): path to the package file
+        start(int): first byte of the header
+        end(int): last byte of the header
+
+    Returns:
+        dict: name, epoch, version, release, arch, size_installed and provides of the package
+
+    """
+    tags = read_rpm_header(path, start, end)
+
+    if RPMTAG_SOURCERPM in tags:
+        arch = tags.get(RPMTAG_ARCH, [''])[0]
+    elif RPMTAG_NOSOURCE in tags or RPMTAG_NOPATCH in tags:
+        arch = 'nosrc'
+    else:
+        arch = 'src'
+
+    return {
+        'name': tags.get(RPMTAG_NAME, [''])[0],
+        'epoch': str(tags.get(RPMTAG_EPOCH, [0])[0]),
+        'version': tags.get(RPMTAG_VERSION, [''])[0],
+        'release': tags.get(RPMTAG_RELEASE, [''])[0],
+        'arch': arch,
+        'size_installed': tags.get(RPMTAG_LONGSIZE, tags.get(RPMTAG_SIZE, [None]))[0],
+        'provides': sorted(set(tags.get(RPMTAG_PROVIDENAME, []))),
+    }
+
+
+PGP_PUBLIC_KEY_BLOCK = '-----BEGIN PGP PUBLIC KEY BLOCK-----'
+
+# run rpm tools with a fixed locale, their output is parsed
+RPM_ENV = dict(os.environ, LC_ALL='C')
+
+
+def import_gpg_keys(gpgkey, directory):
+    """
+    Create a local rpm keyring with the given public keys.
+
+    Args:
+        gpgkey(str): one or more ASCII armored public keys
+        directory(str): path to the directory a new keyring is created in
+
+    Returns:
+        str: path to the keyring, to be used as an rpm database path
+
+    Raises:
+        ValueError: If no public key is found or a key can't be imported.
+
+    """
+    keys = [PGP_PUBLIC_KEY_BLOCK + block for block in gpgkey.split(PGP_PUBLIC_KEY_BLOCK)[1:]]
+    if not keys:
+        raise ValueError(_('No ASCII armored public key found.'))
+
+    keyring = tempfile.mkdtemp(prefix='keyring-', dir=directory)
+    subprocess.run(['rpmdb', '--dbpath', keyring, '--initdb'], env=RPM_ENV, check=True)
+    for number, key in enumerate(keys):
+        key_path = os.path.join(keyring, 'key-{}.asc'.format(number))
+        with open(key_path, 'w') as key_file:
+            key_file.write(key)
+        process = subprocess.run(['rpmkeys', '--dbpath', keyring, '--import', key_path],
+                                 env=RPM_ENV, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 universal_newlines=True)
+        if process.returncode:
+            raise ValueError(_('Public key can not be imported: {error}').format(
+                error=process.stdout.strip()))
+
+    return keyring
+
+
+def check_package_signature(keyring, path):
+    """
+    Check the signature of a package against a local keyring.
+
+    No network access is needed, only the keys in the keyring are trusted.
+
+    Args:
+        keyring(str): path to a keyring created by `import_gpg_keys`
+        path(str): path to the package file
+
+    Returns:
+        str: one of the SIGNATURE_STATUSES
+
+    """
+    process = subprocess.run(['rpmkeys', '--dbpath', keyring, '--checksig', path],
+                             env=RPM_ENV, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True)
+    if process.returncode:
+        return SIGNATURE_STATUSES.BAD_SIGNATURE
+
+    # e.g. "foo.rpm: digests signatures OK", older versions of rpm report "pgp" or "gpg". The
+    # path is left out, it could contain any of them.
+    output = process.stdout.strip()
+    prefix = '{path}:'.format(path=path)
+    if output.startswith(prefix):
+        output = output[len(prefix):]
+    output = output.lower()
+    if 'signatures' in output or 'pgp' in output or 'gpg' in output:
+        return SIGNATURE_STATUSES.SIGNED
+    return SIGNATURE_STATUSES.UNSIGNED
+
 
 def get_kickstart_data(remote):
     """
@@ -30,7 +215,7 @@ def get_kickstart_data(remote):
         kickstart.serialize(parser)
         kickstart_parsed = parser._sections
         sha256 = result.artifact_attributes["sha256"]
-        kickstart = KickstartData(kickstart_parsed).to_dict(hash=sha256)
+        kickstart = KickstartData(kickstart_parsed).to_dict(hash=sha256, treeinfo=namespace)
         break
 
     return kickstart
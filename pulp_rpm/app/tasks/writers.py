@@ -0,0 +1,401 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import time
+import traceback
+from gettext import gettext as _
+
+import createrepo_c as cr
+from django.db import connections
+
+from pulp_rpm.app.compression import compress_file, compress_zchunk
+from pulp_rpm.app.constants import COMPRESSION_TYPES
+
+
+XML_FILES = {
+    'primary': cr.PrimaryXmlFile,
+    'filelists': cr.FilelistsXmlFile,
+    'other': cr.OtherXmlFile,
+    'updateinfo': cr.UpdateInfoXmlFile,
+}
+
+# metadata files written from text chunks, without createrepo_c
+TEXT_FILES = {
+    'group': 'comps.xml',
+}
+
+SQLITE_DATABASES = {
+    'primary': (cr.PrimarySqlite, cr.xml_parse_primary),
+    'filelists': (cr.FilelistsSqlite, cr.xml_parse_filelists),
+    'other': (cr.OtherSqlite, cr.xml_parse_other),
+}
+
+# database_version of the sqlite databases created by createrepo_c
+SQLITE_DB_VERSION = 10
+
+# zchunk files get a chunk per package, so unchanged packages give the same chunks. The space
+# keeps the <packager> elements of primary.xml from starting chunks.
+ZCHUNK_SPLIT = '<package '
+
+
+def plain_record(data_type, path):
+    """
+    Describe an uncompressed metadata file for repomd.xml, and name it after its checksum.
+
+    Args:
+        data_type (str): the type of the repomd record
+        path (str): the path of the file
+
+    Returns:
+        dict: the fields of the repomd record of the file
+
+    """
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as metadata_file:
+        for block in iter(lambda: metadata_file.read(1024 * 1024), b''):
+            checksum.update(block)
+    name = '{checksum}-{name}'.format(checksum=checksum.hexdigest(),
+                                      name=os.path.basename(path))
+    os.rename(path, os.path.join(os.path.dirname(path), name))
+    return {
+        'type': data_type,
+        'location_href': 'repodata/{name}'.format(name=name),
+        'checksum': checksum.hexdigest(),
+        'checksum_type': 'sha256',
+        'timestamp': int(time.time()),
+        'size': os.path.getsize(os.path.join(os.path.dirname(path), name)),
+    }
+
+
+def _record(data_type, compressed, db_ver=None):
+    """
+    Name a compressed metadata file after its checksum and describe it for repomd.xml.
+
+    Args:
+        data_type (str): the type of the repomd record
+        compressed (dict): the path, checksums and sizes of the compressed file
+
+    Keyword Args:
+        db_ver (int): the database version of an sqlite database
+
+    Returns:
+        dict: the fields of the repomd record of the compressed file
+
+    """
+    name = '{checksum}-{name}'.format(checksum=compressed['checksum'],
+                                      name=os.path.basename(compressed['path']))
+    os.rename(compressed['path'], os.path.join(os.path.dirname(compressed['path']), name))
+    record = {
+        'type': data_type,
+        'location_href': 'repodata/{name}'.format(name=name),
+        'checksum': compressed['checksum'],
+        'checksum_type': 'sha256',
+        'checksum_open': compressed['checksum_open'],
+        'checksum_open_type': 'sha256',
+        'timestamp': int(time.time()),
+        'size': compressed['size'],
+        'size_open': compressed['size_open'],
+        'db_ver': db_ver,
+    }
+    if 'checksum_header' in compressed:
+        record['checksum_header'] = compressed['checksum_header']
+        record['checksum_header_type'] = 'sha256'
+        record['size_header'] = compressed['size_header']
+    return record
+
+
+def compressed_record(data_type, path, compression, level=None, db_ver=None):
+    """
+    Compress a metadata file and describe it for repomd.xml.
+
+    The file is compressed here rather than by createrepo_c, which only has default levels and
+    single threaded gzip, so the fields of its repomd record are computed here as well.
+
+    Args:
+        data_type (str): the type of the repomd record
+        path (str): the path of the uncompressed file
+        compression (str): the compression type
+
+    Keyword Args:
+        level (int): the compression level, the default one of the compression type if None
+        db_ver (int): the database version of an sqlite database
+
+    Returns:
+        dict: the fields of the repomd record of the compressed file
+
+    """
+    return _record(data_type, compress_file(path, compression, level=level), db_ver=db_ver)
+
+
+def run_worker(data_type, num_of_pkgs, sqlite_metadata, compression, chunks, results):
+    """
+    Write a metadata file in a worker process and send back the result.
+
+    The repomd records of the files are sent back as dicts of their fields, createrepo_c objects
+    can't be pickled. If writing fails, the traceback of the error is sent instead, so it can be
+    reported by the publish.
+
+    Args:
+        data_type (str): the type of the metadata, see `write_metadata`
+        num_of_pkgs (int): number of the packages in the metadata, None for updateinfo
+        sqlite_metadata (bool): whether to create the sqlite database of the metadata
+        compression (dict): compression types and level, see `write_metadata`
+        chunks (multiprocessing.connection.Connection): lists of chunks, ended by None
+        results (multiprocessing.connection.Connection): where a pair of the records and the
+            traceback of the error, if any, is sent
+
+    """
+    try:
+        records = write_metadata(data_type, num_of_pkgs, sqlite_metadata, compression, chunks)
+    except Exception:
+        results.send((None, traceback.format_exc()))
+    else:
+        results.send((records, None))
+
+
+def write_metadata(data_type, num_of_pkgs, sqlite_metadata, compression, chunks):
+    """
+    Write a metadata file from a stream of XML chunks, in a worker process.
+
+    The sqlite database of the metadata is created from the finished XML file, the same way
+    sqliterepo_c does it, so only XML has to be sent to the worker.
+
+    Args:
+        data_type (str): the type of the metadata, one of the keys of `XML_FILES`
+        num_of_pkgs (int): number of the packages in the metadata, None for updateinfo
+        sqlite_metadata (bool): whether to create the sqlite database of the metadata
+        compression (dict): compression types of the XML file and of the sqlite database,
+            under 'xml' and 'sqlite', their compression levels, under 'xml_level' and
+            'sqlite_level', and whether to publish a zchunk file as well, under 'zchunk'
+        chunks (multiprocessing.connection.Connection): lists of XML chunks, ended by None
+
+    Returns:
+        list: the fields of the repomd records of the files, as dicts
+
+    """
+    if data_type in TEXT_FILES:
+        return write_text_metadata(data_type, compression, chunks)
+
+    xml_path = os.path.join(os.getcwd(), '{t}.xml'.format(t=data_type))
+    xml_file = XML_FILES[data_type](xml_path, cr.NO_COMPRESSION)
+    if num_of_pkgs is not None:
+        xml_file.set_num_of_pkgs(num_of_pkgs)
+    for batch in iter(chunks.recv, None):
+        for chunk in batch:
+            xml_file.add_chunk(chunk)
+    xml_file.close()
+
+    if sqlite_metadata:
+        sqlite_class, parse = SQLITE_DATABASES[data_type]
+        db_path = os.path.join(os.getcwd(), '{t}.sqlite'.format(t=data_type))
+        db = sqlite_class(db_path)
+        parse(xml_path, pkgcb=db.add_pkg)
+
+    zchunk_records = []
+    if compression['zchunk']:
+        zchunk_records.append(_record('{t}_zck'.format(t=data_type),
+                                      compress_zchunk(xml_path, ZCHUNK_SPLIT)))
+
+    records = [compressed_record(data_type, xml_path, compression['xml'],
+                                 level=compression['xml_level'])]
+
+    if sqlite_metadata:
+        db.dbinfo_update(records[0]['checksum'])
+        db.close()
+        records.append(compressed_record('{t}_db'.format(t=data_type), db_path,
+                                         compression['sqlite'], level=compression['sqlite_level'],
+                                         db_ver=SQLITE_DB_VERSION))
+
+    return records + zchunk_records
+
+
+def write_text_metadata(data_type, compression, chunks):
+    """
+    Write a metadata file which is not generated by createrepo_c, in a worker process.
+
+    comps.xml is published both uncompressed, as the "group" record, and gzipped, as the
+    "group_gz" record, which are the names yum and dnf look for. Other files are only
+    published compressed.
+
+    Args:
+        data_type (str): the type of the metadata, one of the keys of `TEXT_FILES`
+        compression (dict): compression types and level, see `write_metadata`
+        chunks (multiprocessing.connection.Connection): lists of text chunks, ended by None
+
+    Returns:
+        list: the fields of the repomd records of the files, as dicts
+
+    """
+    path = os.path.join(os.getcwd(), TEXT_FILES[data_type])
+    with open(path, 'w', encoding='utf-8') as text_file:
+        for batch in iter(chunks.recv, None):
+            text_file.writelines(batch)
+
+    if data_type == 'group':
+        records = [plain_record(data_type, path)]
+        shutil.copyfile(
+            os.path.join(os.path.dirname(path), os.path.basename(records[0]['location_href'])),
+            path
+        )
+        level = compression['xml_level'] if compression['xml'] == COMPRESSION_TYPES.GZ else None
+        records.append(compressed_record('group_gz', path, COMPRESSION_TYPES.GZ, level=level))
+    else:
+        records = [compressed_record(data_type, path, compression['xml'],
+                                     level=compression['xml_level'])]
+    return records
+
+
+class MetadataWriter:
+    """
+    A worker process writing a metadata file.
+
+    The XML chunks are buffered and sent to the worker in batches over a pipe. Writing blocks
+    when the pipe is full, so the publish can't get far ahead of the slowest file.
+
+    The database connections are closed before the worker is forked, a connection shared with
+    the worker would be broken for both processes if the worker closed it. They are reopened by
+    the next query of the publish. A connection in a transaction can't be closed without
+    aborting it, the worker never uses it and exits without closing it.
+    """
+
+    BATCH_SIZE = 200
+
+    def __init__(self, data_type, num_of_pkgs=None, sqlite_metadata=False,
+                 compression=COMPRESSION_TYPES.GZ, sqlite_compression=COMPRESSION_TYPES.BZ2,
+                 compression_level=None, sqlite_compression_level=None, zchunk=False):
+        """
+        Start a worker process.
+
+        Args:
+            data_type (str): the type of the metadata, one of the keys of `XML_FILES` or
+                `TEXT_FILES`
+
+        Keyword Args:
+            num_of_pkgs (int): number of the packages in the metadata, None for updateinfo
+            sqlite_metadata (bool): whether to create the sqlite database of the metadata
+            compression (str): the compression type of the XML file
+            sqlite_compression (str): the compression type of the sqlite database
+            compression_level (int): the compression level of the XML file, the default one if
+                None
+            sqlite_compression_level (int): the compression level of the sqlite database, the
+                default one if None
+            zchunk (bool): whether to publish a zchunk file of the XML as well
+
+        """
+        compression = {
+            'xml': compression, 'sqlite': sqlite_compression, 'xml_level': compression_level,
+            'sqlite_level': sqlite_compression_level, 'zchunk': zchunk
+        }
+        context = multiprocessing.get_context('fork')
+        chunks_reader, self._chunks = context.Pipe(duplex=False)
+        self._results, results_writer = context.Pipe(duplex=False)
+        self.data_type = data_type
+        self._batch = []
+        self._process = context.Process(
+            target=run_worker,
+            args=(data_type, num_of_pkgs, sqlite_metadata, compression, chunks_reader,
+                  results_writer),
+            name='{t}-writer'.format(t=data_type)
+        )
+        for connection in connections.all():
+            if not connection.in_atomic_block:
+                connection.close()
+        self._process.start()
+        # the ends of the pipes used by the worker are closed here, so that a worker which
+        # died is noticed instead of blocking the publish
+        chunks_reader.close()
+        results_writer.close()
+
+    def add_chunk(self, chunk):
+        """
+        Add an XML chunk to the metadata.
+
+        Args:
+            chunk (str): the XML of a package or an update record
+
+        """
+        self._batch.append(chunk)
+        if len(self._batch) >= self.BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        """
+        Send the buffered chunks to the worker.
+        """
+        try:
+            self._chunks.send(self._batch)
+        except BrokenPipeError:
+            self._fail()
+        self._batch = []
+
+    def close(self):
+        """
+        Finish the metadata and wait for the worker.
+
+        Returns:
+            list: the fields of the repomd records of the files written by the worker, as dicts
+
+        Raises:
+            RuntimeError: if the worker failed, with the traceback of its error
+
+        """
+        self._flush()
+        try:
+            self._chunks.send(None)
+            records, error = self._results.recv()
+        except (BrokenPipeError, EOFError):
+            self._fail()
+        finally:
+            self._chunks.close()
+        self._process.join()
+        if error is not None:
+            self._fail(error)
+        return records
+
+    def terminate(self):
+        """
+        Stop the worker without finishing the metadata.
+        """
+        self._process.terminate()
+        self._process.join()
+
+    def _fail(self, error=None):
+        """
+        Report a worker which failed.
+
+        Keyword Args:
+            error (str): the traceback sent by the worker, it is received here if None
+
+        Raises:
+            RuntimeError: always
+
+        """
+        self._process.join()
+        if error is None:
+            try:
+                if self._results.poll():
+                    records, error = self._results.recv()
+            except EOFError:
+                pass
+        raise RuntimeError(_('Writing {t} metadata failed, exit code {code}:\n{error}').format(
+            t=self.data_type, code=self._process.exitcode, error=error or _('no traceback')))
+
+
+def repomd_record(fields):
+    """
+    Create a repomd record from the fields sent by a worker.
+
+    Args:
+        fields (dict): the fields of the record
+
+    Returns:
+        createrepo_c.RepomdRecord: the record
+
+    """
+    path = os.path.join(os.getcwd(), os.path.basename(fields['location_href']))
+    record = cr.RepomdRecord(fields['type'], path)
+    for field, value in fields.items():
+        if value is not None:
+            setattr(record, field, value)
+    return record
@@ -2,6 +2,7 @@ from gettext import gettext as _
 
 from django.db import transaction
 from django.db.utils import IntegrityError
+from django_filters import CharFilter
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import serializers, status, viewsets, mixins
 from rest_framework.decorators import action
@@ -10,10 +11,7 @@ from rest_framework.parsers import FormParser, MultiPartParser
 
 from pulpcore.plugin.models import Artifact
 from pulpcore.plugin.tasking import enqueue_with_reservation
-from pulpcore.plugin.serializers import (
-    AsyncOperationResponseSerializer,
-    RepositorySyncURLSerializer
-)
+from pulpcore.plugin.serializers import AsyncOperationResponseSerializer
 from pulpcore.plugin.viewsets import (
     BaseDistributionViewSet,
     ContentFilter,
@@ -25,10 +23,12 @@ from pulpcore.plugin.viewsets import (
 )
 
 from pulp_rpm.app import tasks
+from pulp_rpm.app.constants import CAPABILITY_KINDS
 from pulp_rpm.app.shared_utils import _prepare_package
 from pulp_rpm.app.models import (
     DistributionTree,
     Package,
+    PackageCapability,
     RpmDistribution,
     RpmRemote,
     RpmPublication,
@@ -45,6 +45,7 @@ from pulp_rpm.app.serializers import (
     RpmDistributionSerializer,
     RpmRemoteSerializer,
     RpmPublicationSerializer,
+    RpmRepositorySyncURLSerializer,
     UpdateRecordSerializer,
 )
 
@@ -54,6 +55,30 @@ class PackageFilter(ContentFilter):
     FilterSet for Package.
     """
 
+    provides = CharFilter(field_name=CAPABILITY_KINDS.PROVIDES, method='filter_capability',
+                          help_text=_('Filter results where a provided capability is named '
+                                      'as the value'))
+    requires = CharFilter(field_name=CAPABILITY_KINDS.REQUIRES, method='filter_capability',
+                          help_text=_('Filter results where a required capability is named '
+                                      'as the value'))
+    file = CharFilter(field_name=CAPABILITY_KINDS.FILE, method='filter_capability',
+                      help_text=_('Filter results which contain a file of the value path'))
+
+    def filter_capability(self, queryset, name, value):
+        """
+        Filter packages by the name of a capability of a kind.
+
+        Args:
+            queryset (django.db.models.QuerySet): packages to filter
+            name (str): kind of the capability, one of the CAPABILITY_KINDS
+            value (str): name of the capability
+
+        Returns:
+            django.db.models.QuerySet: the packages with the capability
+
+        """
+        return queryset.filter(capabilities__kind=name, capabilities__name=value)
+
     class Meta:
         model = Package
         fields = {
@@ -109,7 +134,8 @@ class PackageViewSet(ContentViewSet):
 
         serializer = self.get_serializer(data=new_pkg)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        package = serializer.save()
+        PackageCapability.create_for_packages([package])
 
         headers = self.get_success_headers(request.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -129,25 +155,29 @@ class RpmRemoteViewSet(RemoteViewSet):
         operation_summary="Sync from remote",
         responses={202: AsyncOperationResponseSerializer}
     )
-    @action(detail=True, methods=['post'], serializer_class=RepositorySyncURLSerializer)
+    @action(detail=True, methods=['post'], serializer_class=RpmRepositorySyncURLSerializer)
     def sync(self, request, pk):
         """
         Dispatches a sync task.
         """
         remote = self.get_object()
-        serializer = RepositorySyncURLSerializer(
+        serializer = RpmRepositorySyncURLSerializer(
             data=request.data,
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
         repository = serializer.validated_data.get('repository')
+        mirror = serializer.validated_data.get('mirror')
+        mirror_metadata = serializer.validated_data.get('mirror_metadata')
 
         result = enqueue_with_reservation(
             tasks.synchronize,
             [repository, remote],
             kwargs={
                 'remote_pk': remote.pk,
-                'repository_pk': repository.pk
+                'repository_pk': repository.pk,
+                'mirror': mirror,
+                'mirror_metadata': mirror_metadata
             }
         )
         return OperationPostponedResponse(result, request)
@@ -165,6 +195,8 @@ class UpdateRecordFilter(ContentFilter):
             'status': ['exact', 'in'],
             'severity': ['exact', 'in'],
             'type': ['exact', 'in'],
+            'issued_date': ['exact', 'lt', 'lte', 'gt', 'gte', 'range'],
+            'updated_date': ['exact', 'lt', 'lte', 'gt', 'gte', 'range'],
         }
 
 
@@ -264,7 +296,17 @@ class RpmPublicationViewSet(PublicationViewSet):
             tasks.publish,
             [repository_version.repository],
             kwargs={
-                'repository_version_pk': repository_version.pk
+                'repository_version_pk': repository_version.pk,
+                'changelog_limit': serializer.validated_data.get('changelog_limit'),
+                'sqlite_metadata': serializer.validated_data.get('sqlite_metadata'),
+                'incremental': serializer.validated_data.get('incremental'),
+                'metadata_compression': serializer.validated_data.get('metadata_compression'),
+                'sqlite_compression': serializer.validated_data.get('sqlite_compression'),
+                'metadata_compression_level':
+                    serializer.validated_data.get('metadata_compression_level'),
+                'sqlite_compression_level':
+                    serializer.validated_data.get('sqlite_compression_level'),
+                'zchunk_metadata': serializer.validated_data.get('zchunk_metadata')
             }
         )
         return OperationPostponedResponse(result, request)
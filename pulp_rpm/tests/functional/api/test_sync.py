@@ -4,10 +4,14 @@ import os
 import unittest
 from urllib.parse import urljoin
 
-from pulp_smash import api, cli, config
+from requests.exceptions import HTTPError
+
+from pulp_smash import api, cli, config, utils
 from pulp_smash.pulp3.constants import MEDIA_PATH, REPO_PATH, ARTIFACTS_PATH
 from pulp_smash.pulp3.utils import (
     delete_orphans,
+    download_content_unit,
+    gen_distribution,
     gen_repo,
     get_added_content,
     get_added_content_summary,
@@ -18,10 +22,12 @@ from pulp_smash.pulp3.utils import (
 )
 
 from pulp_rpm.tests.functional.constants import (
+    RPM_DISTRIBUTION_PATH,
     RPM_EPEL_URL,
     RPM_FIXTURE_SUMMARY,
     RPM_PACKAGE_COUNT,
     RPM_PACKAGE_CONTENT_NAME,
+    RPM_PUBLICATION_PATH,
     RPM_REFERENCES_UPDATEINFO_URL,
     RPM_REMOTE_PATH,
     RPM_SHA512_FIXTURE_URL,
@@ -256,6 +262,94 @@ class KickstartSyncTestCase(unittest.TestCase):
         self.assertDictEqual(get_added_content_summary(repo), {})
 
 
+class MirrorSyncTestCase(unittest.TestCase):
+    """Sync repositories mirroring their metadata."""
+
+    def test_mirror_without_metadata(self):
+        """Sync in mirror mode only, which doesn't publish the repository version.
+
+        Do the following:
+
+        1. Create a repository and a remote with the rpm fixture url.
+        2. Sync the remote in mirror mode, without mirror_metadata.
+        3. Assert that no publication of the new repository version is created.
+        """
+        cfg = config.get_config()
+        client = api.Client(cfg, api.json_handler)
+
+        repo = client.post(REPO_PATH, gen_repo())
+        self.addCleanup(client.delete, repo['_href'])
+
+        remote = client.post(RPM_REMOTE_PATH, gen_rpm_remote())
+        self.addCleanup(client.delete, remote['_href'])
+
+        sync(cfg, remote, repo, mirror=True)
+        repo = client.get(repo['_href'])
+
+        publications = [
+            publication
+            for publication in api.Client(cfg, api.page_handler).get(RPM_PUBLICATION_PATH)
+            if publication['repository_version'] == repo['_latest_version_href']
+        ]
+        self.assertEqual(publications, [])
+
+    def test_kickstart_mirror(self):
+        """Sync a kickstart tree mirroring its metadata and serve the upstream metadata.
+
+        Do the following:
+
+        1. Create a repository and a remote with the kickstart fixture url.
+        2. Sync the remote with mirror_metadata.
+        3. Distribute the publication created by the sync.
+        4. Assert that the repomd.xml and the treeinfo file served by Pulp are
+           the same as the ones of the fixture.
+        """
+        cfg = config.get_config()
+        client = api.Client(cfg, api.json_handler)
+
+        repo = client.post(REPO_PATH, gen_repo())
+        self.addCleanup(client.delete, repo['_href'])
+
+        body = gen_rpm_remote(url=RPM_KICKSTART_FIXTURE_URL)
+        remote = client.post(RPM_REMOTE_PATH, body)
+        self.addCleanup(client.delete, remote['_href'])
+
+        sync(cfg, remote, repo, mirror_metadata=True)
+        repo = client.get(repo['_href'])
+
+        # The publication is created by the sync task.
+        publications = [
+            publication
+            for publication in api.Client(cfg, api.page_handler).get(RPM_PUBLICATION_PATH)
+            if publication['repository_version'] == repo['_latest_version_href']
+        ]
+        self.assertEqual(len(publications), 1, publications)
+        self.addCleanup(client.delete, publications[0]['_href'])
+
+        body = gen_distribution()
+        body['publication'] = publications[0]['_href']
+        distribution = client.using_handler(api.task_handler).post(
+            RPM_DISTRIBUTION_PATH, body
+        )
+        self.addCleanup(client.delete, distribution['_href'])
+
+        paths = ['repodata/repomd.xml']
+        for treeinfo in ('.treeinfo', 'treeinfo'):
+            try:
+                utils.http_get(urljoin(RPM_KICKSTART_FIXTURE_URL, treeinfo))
+            except HTTPError:
+                continue
+            paths.append(treeinfo)
+            break
+
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(
+                    utils.http_get(urljoin(RPM_KICKSTART_FIXTURE_URL, path)),
+                    download_content_unit(cfg, distribution, path)
+                )
+
+
 class FileDescriptorsTestCase(unittest.TestCase):
     """Test whether file descriptors are closed properly after a sync."""
 
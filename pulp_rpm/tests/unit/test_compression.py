@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from django.test import TestCase
+
+from pulp_rpm.app import compression
+from pulp_rpm.app.compression import (
+    available_compression_types,
+    compress_file,
+    compress_zchunk,
+    open_compressed,
+    zchunk_available,
+    zchunk_header,
+)
+
+
+class TestCompressFile(TestCase):
+    """Test compressing metadata files."""
+
+    DATA = ''.join('<package name="{i}"/>\n'.format(i=i) for i in range(50000))
+
+    def setUp(self):
+        """Create a directory for the files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'primary.xml')
+
+    def write(self):
+        """Write the uncompressed file."""
+        with open(self.path, 'w') as xml:
+            xml.write(self.DATA)
+
+    def tearDown(self):
+        """Remove the files."""
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Test that the files can be read back and that the checksums and sizes are right."""
+        for compression_type in available_compression_types():
+            with self.subTest(compression=compression_type):
+                self.write()
+                result = compress_file(self.path, compression_type)
+                self.assertFalse(os.path.exists(self.path))
+                with open(result['path'], 'rb') as compressed:
+                    content = compressed.read()
+                    compressed.seek(0)
+                    self.assertEqual(open_compressed(compressed, compression_type).read(),
+                                     self.DATA)
+                self.assertEqual(result['checksum'], hashlib.sha256(content).hexdigest())
+                self.assertEqual(result['size'], len(content))
+                self.assertEqual(result['checksum_open'],
+                                 hashlib.sha256(self.DATA.encode()).hexdigest())
+                self.assertEqual(result['size_open'], len(self.DATA))
+
+    def test_parallel_gzip(self):
+        """Test that a gzip file of several members is read as a whole."""
+        block_size = compression.GZIP_BLOCK_SIZE
+        compression.GZIP_BLOCK_SIZE = 4096
+        self.write()
+        try:
+            result = compress_file(self.path, 'gz')
+        finally:
+            compression.GZIP_BLOCK_SIZE = block_size
+        with open(result['path'], 'rb') as compressed:
+            self.assertEqual(open_compressed(compressed, 'gz').read(), self.DATA)
+
+
+class TestZchunkHeader(TestCase):
+    """Test reading the header of zchunk files."""
+
+    def test_header(self):
+        """Test that the header is the lead, the header digest and the header size bytes."""
+        # SHA-256 header digest, a header of 300 bytes as a zchunk compressed integer
+        header = b'\x00ZCK1' + b'\x81' + b'\x2c\x82' + b'd' * 32 + b'h' * 300
+        with tempfile.NamedTemporaryFile() as zchunk_file:
+            zchunk_file.write(header + b'chunks')
+            zchunk_file.flush()
+            checksum, size = zchunk_header(zchunk_file.name)
+        self.assertEqual(size, len(header))
+        self.assertEqual(checksum, hashlib.sha256(header).hexdigest())
+
+    def test_not_zchunk(self):
+        """Test that other files are rejected."""
+        with tempfile.NamedTemporaryFile() as other_file:
+            other_file.write(b'\x1f\x8b not zchunk')
+            other_file.flush()
+            with self.assertRaises(ValueError):
+                zchunk_header(other_file.name)
+
+
+@unittest.skipUnless(zchunk_available(), 'zck is not installed')
+class TestCompressZchunk(TestCase):
+    """Test compressing metadata files with zchunk."""
+
+    DATA = ''.join(
+        '<package type="rpm">\n  <name>{i}</name>\n  <rpm:packager>{i}</rpm:packager>\n'
+        '</package>\n'.format(i=i) for i in range(1000)
+    )
+
+    def test_compress(self):
+        """Test that the file is compressed and described, and the uncompressed file kept."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'primary.xml')
+            with open(path, 'w') as xml:
+                xml.write(self.DATA)
+
+            result = compress_zchunk(path, '<package ')
+
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(result['path'], path + '.zck')
+            with open(result['path'], 'rb') as compressed:
+                content = compressed.read()
+            self.assertEqual(result['checksum'], hashlib.sha256(content).hexdigest())
+            self.assertEqual(result['size'], len(content))
+            self.assertEqual(result['checksum_open'],
+                             hashlib.sha256(self.DATA.encode()).hexdigest())
+            self.assertEqual(result['size_open'], len(self.DATA))
+            self.assertEqual((result['checksum_header'], result['size_header']),
+                             zchunk_header(result['path']))
+
+            if shutil.which('unzck'):
+                process = subprocess.run(['unzck', '--stdout', result['path']], check=True,
+                                         stdout=subprocess.PIPE)
+                self.assertEqual(process.stdout.decode(), self.DATA)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from django.test import TestCase
+
+from pulpcore.plugin.stages import Stage, create_pipeline
+
+from pulp_rpm.app.tasks.instrumentation import PipelineInstrumentation, StageStatistics
+
+
+class Producer(Stage):
+    """Emit a number of items."""
+
+    ITEMS = 3
+
+    async def run(self):
+        """Emit the items."""
+        for item in range(self.ITEMS):
+            await self.put(item)
+
+
+class SlowConsumer(Stage):
+    """Take some time to handle each item, without emitting it."""
+
+    DELAY = 0.01
+
+    async def run(self):
+        """Handle the items."""
+        async for item in self.items():
+            await asyncio.sleep(self.DELAY)
+
+
+class TestPipelineInstrumentation(TestCase):
+    """Test the statistics collected for sync pipelines."""
+
+    def run_pipeline(self, stages):
+        """Run an instrumented pipeline and return its report."""
+        instrumentation = PipelineInstrumentation()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(create_pipeline(instrumentation.wrap(stages)))
+        finally:
+            loop.close()
+        return instrumentation.report()
+
+    def test_report(self):
+        """Test that the items, run time and position of each stage are reported."""
+        report = self.run_pipeline([Producer(), SlowConsumer()])
+        producer, consumer = report['stages']
+
+        self.assertEqual((producer['position'], producer['stage']), (0, 'Producer'))
+        self.assertEqual((consumer['position'], consumer['stage']), (1, 'SlowConsumer'))
+        self.assertEqual((producer['items_in'], producer['items_out']), (0, Producer.ITEMS))
+        self.assertEqual((consumer['items_in'], consumer['items_out']), (Producer.ITEMS, 0))
+        self.assertGreaterEqual(consumer['run_time'], Producer.ITEMS * SlowConsumer.DELAY)
+        self.assertGreaterEqual(report['run_time'], consumer['run_time'])
+        self.assertTrue(json.dumps(report))
+
+    def test_db_wrapper(self):
+        """Test that queries made outside of the stages are accounted separately."""
+        instrumentation = PipelineInstrumentation()
+        result = instrumentation.db_wrapper(lambda *args: 'rows', 'SELECT 1', None, False, {})
+
+        self.assertEqual(result, 'rows')
+        self.assertEqual(instrumentation.report()['other_db_queries'], 1)
+
+
+class TestStageStatistics(TestCase):
+    """Test the statistics of a stage."""
+
+    def test_queue_depth(self):
+        """Test that the queue depth is sampled once per interval and its maximum is kept."""
+        statistics = StageStatistics(0, 'Stage')
+        for now, depth in ((10.0, 1), (10.5, 5), (11.2, 2), (11.3, 0)):
+            statistics.sample_queue_depth(now, depth, 10.0)
+
+        self.assertEqual(statistics.queue_depth, [(0.0, 1), (1.2, 2)])
+        self.assertEqual(statistics.max_queue_depth, 5)
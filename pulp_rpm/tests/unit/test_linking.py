@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from pulpcore.plugin.models import Repository, RepositoryContent, RepositoryVersion
+
+from pulp_rpm.app.models import (
+    Package,
+    UpdateCollection,
+    UpdateCollectionPackage,
+    UpdateRecord,
+)
+from pulp_rpm.app.tasks.linking import link_batches, link_update_collection_packages
+
+
+class TestLinkPackages(TestCase):
+    """Test linking the packages of advisories to the packages they refer to."""
+
+    NEVRA = {'epoch': '0', 'version': '1.0', 'release': '1', 'arch': 'noarch'}
+
+    def setUp(self):
+        """Create a repository version with a package and an advisory, and other packages."""
+        repository = Repository.objects.create(name='linking')
+        self.version = RepositoryVersion.objects.create(
+            repository=repository, number=1, complete=True
+        )
+        self.in_version = self.package('foo', 'in-version', add=True)
+        self.same_nevra = self.package('foo', 'same-nevra')
+        self.other = self.package('bar', 'other')
+
+        self.update_record = UpdateRecord.objects.create(id='RHBA-1', digest='linking')
+        self.add(self.update_record)
+        self.collection = UpdateCollection.objects.create(
+            update_record=self.update_record, name='collection', shortname='collection'
+        )
+
+    def add(self, content):
+        """Add content to the repository version."""
+        RepositoryContent.objects.create(
+            repository=self.version.repository, content=content, version_added=self.version
+        )
+
+    def package(self, name, pkgId, add=False):
+        """Create a package, in the repository version if add is True."""
+        package = Package.objects.create(name=name, pkgId=pkgId, checksum_type='sha256',
+                                         **self.NEVRA)
+        if add:
+            self.add(package)
+        return package
+
+    def collection_package(self, name, checksum=''):
+        """Create a package of the advisory, with the checksum of its file as its sum."""
+        return UpdateCollectionPackage.objects.create(
+            update_collection=self.collection, name=name, sum=checksum, sum_type='sha256',
+            filename='{name}-1.0-1.noarch.rpm'.format(name=name), **self.NEVRA
+        )
+
+    def test_link_packages(self):
+        """Test that packages are matched by checksum only, not by NEVRA."""
+        by_checksum = self.collection_package('foo', checksum='same-nevra')
+        by_nevra = self.collection_package('foo')
+        unknown = self.collection_package('bar', checksum='unknown')
+
+        linked = UpdateCollectionPackage.link_packages([by_checksum, by_nevra, unknown])
+
+        self.assertEqual(linked, [by_checksum])
+        self.assertEqual(by_checksum.package_id, self.same_nevra.pk)
+        self.assertIsNone(by_nevra.package_id)
+        self.assertIsNone(unknown.package_id)
+
+    def test_link_batches(self):
+        """Test that only the given packages are linked, and only once."""
+        in_version = self.collection_package('foo', checksum='in-version')
+        not_in_version = self.collection_package('bar', checksum='other')
+        packages = Package.objects.filter(pk__in=self.version.content)
+
+        self.assertEqual(sum(link_batches(packages)), 1)
+
+        in_version.refresh_from_db()
+        not_in_version.refresh_from_db()
+        self.assertEqual(in_version.package_id, self.in_version.pk)
+        self.assertIsNone(not_in_version.package_id)
+        self.assertEqual(sum(link_batches(packages)), 0)
+
+    def test_link_update_collection_packages(self):
+        """Test that only the packages added in the repository version are linked to."""
+        added = self.collection_package('foo', checksum='in-version')
+        previous = self.collection_package('bar', checksum='other')
+        RepositoryContent.objects.create(
+            repository=self.version.repository, content=self.other,
+            version_added=RepositoryVersion.objects.create(
+                repository=self.version.repository, number=0, complete=True
+            )
+        )
+
+        with mock.patch('pulp_rpm.app.tasks.linking.ProgressBar'):
+            link_update_collection_packages(self.version.pk)
+
+        added.refresh_from_db()
+        previous.refresh_from_db()
+        self.assertEqual(added.package_id, self.in_version.pk)
+        self.assertIsNone(previous.package_id)
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from importlib import import_module
+
+from django.test import TestCase
+
+updaterecord_datetimes = import_module('pulp_rpm.app.migrations.0012_updaterecord_datetimes')
+
+
+class TestParseDate(TestCase):
+    """Test parsing the dates of advisories stored as text."""
+
+    def test_formats(self):
+        """Test that the upstream date formats are parsed as UTC dates."""
+        for date, expected in (
+            ('2013-12-02 10:05:30', datetime(2013, 12, 2, 10, 5, 30, tzinfo=timezone.utc)),
+            ('2013-12-02', datetime(2013, 12, 2, tzinfo=timezone.utc)),
+            ('1483228800', datetime(2017, 1, 1, tzinfo=timezone.utc)),
+            (' 1483228800 ', datetime(2017, 1, 1, tzinfo=timezone.utc)),
+        ):
+            with self.subTest(date=date):
+                self.assertEqual(updaterecord_datetimes.parse_date(date), expected)
+
+    def test_empty(self):
+        """Test that empty, missing and invalid dates are None."""
+        for date in ('', ' ', None, 'None', '2013-13-02 00:00:00', 'yesterday'):
+            with self.subTest(date=date):
+                self.assertIsNone(updaterecord_datetimes.parse_date(date))
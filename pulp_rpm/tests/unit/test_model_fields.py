@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from pulp_rpm.app.model_fields import CompressedJSONField, CompressedTextField
+
+
+class TestCompressedJSONField(TestCase):
+    """Test the compressed JSON model field."""
+
+    def test_round_trip(self):
+        """Test that a stored value is loaded back unchanged."""
+        field = CompressedJSONField()
+        files = [['', '/usr/bin/', 'foo'], ['dir', '/usr/share/', 'foo']]
+        stored = field.get_prep_value(files)
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(field.from_db_value(memoryview(stored), None, None), files)
+
+    def test_compression(self):
+        """Test that repetitive values are stored compressed."""
+        field = CompressedJSONField()
+        changelogs = [['Joe <joe@example.com>', 1500000000, '- Rebuilt']] * 100
+        self.assertLess(len(field.get_prep_value(changelogs)), 200)
+
+    def test_none(self):
+        """Test that None is stored and loaded as None."""
+        field = CompressedJSONField()
+        self.assertIsNone(field.get_prep_value(None))
+        self.assertIsNone(field.from_db_value(None, None, None))
+
+
+class TestCompressedTextField(TestCase):
+    """Test the compressed text model field."""
+
+    def test_round_trip(self):
+        """Test that a stored text is loaded back unchanged, not as JSON."""
+        field = CompressedTextField()
+        xml = '<package type="rpm">\n  <name>fóó</name>\n</package>\n'
+        stored = field.get_prep_value(xml)
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(field.from_db_value(memoryview(stored), None, None), xml)
+        self.assertEqual(field.to_python(stored), xml)
+        self.assertEqual(field.to_python(xml), xml)
+
+    def test_none(self):
+        """Test that None is stored and loaded as None."""
+        field = CompressedTextField()
+        self.assertIsNone(field.get_prep_value(None))
+        self.assertIsNone(field.from_db_value(None, None, None))
@@ -1,5 +1,26 @@
+from unittest import mock
+
+import createrepo_c as cr
 from django.test import TestCase
 
+from pulp_rpm.app.constants import CAPABILITY_KINDS, PULP_PACKAGE_ATTRS
+from pulp_rpm.app.models import Package, PackageCapability
+
+
+def create_package(i):
+    """Create a package with dependencies, files and changelogs."""
+    return Package.objects.create(
+        name='package-{i}'.format(i=i), epoch='0', version='1.0', release='1', arch='noarch',
+        pkgId='package-{i}'.format(i=i), checksum_type='sha256', summary='summary',
+        description='description', url='https://example.com', size_package=1234,
+        location_href='package-{i}-1.0-1.noarch.rpm'.format(i=i),
+        files=[[None, '/usr/share/package-{i}/'.format(i=i), 'README']],
+        provides=[['package-{i}'.format(i=i), 'EQ', '0', '1.0', '1', False]],
+        requires=[['glibc', None, None, None, None, True]],
+        changelogs=[['author', date, 'changelog {date}'.format(date=date)]
+                    for date in (3, 1, 2)],
+    )
+
 
 class TestNothing(TestCase):
     """Test Nothing (placeholder)."""
@@ -7,3 +28,103 @@ class TestNothing(TestCase):
     def test_nothing_at_all(self):
         """Test that the tests are running and that's it."""
         self.assertTrue(True)
+
+
+class TestLimitChangelogs(TestCase):
+    """Test limiting the changelogs of a package."""
+
+    CHANGELOGS = [('author', date, 'changelog {date}'.format(date=date)) for date in (3, 1, 2)]
+
+    def test_newest(self):
+        """Test that the newest changelogs are kept, oldest first."""
+        self.assertEqual(Package.limit_changelogs(self.CHANGELOGS, 2),
+                         [self.CHANGELOGS[2], self.CHANGELOGS[0]])
+
+    def test_no_limit(self):
+        """Test that all the changelogs are kept without a limit or under it."""
+        self.assertEqual(Package.limit_changelogs(self.CHANGELOGS), self.CHANGELOGS)
+        self.assertEqual(Package.limit_changelogs(self.CHANGELOGS, 3), self.CHANGELOGS)
+
+    def test_zero(self):
+        """Test that no changelog is kept with a limit of 0."""
+        self.assertEqual(Package.limit_changelogs(self.CHANGELOGS, 0), [])
+
+
+class TestCreaterepoCPackages(TestCase):
+    """Test the bulk conversion of packages to createrepo_c packages."""
+
+    def setUp(self):
+        """Create a few packages."""
+        for i in range(3):
+            create_package(i)
+        self.packages = Package.objects.order_by('name')
+
+    def assertEquivalent(self, cr_package, expected):
+        """Assert that two createrepo_c packages are the same."""
+        for attr in vars(PULP_PACKAGE_ATTRS).values():
+            self.assertEqual(getattr(cr_package, attr), getattr(expected, attr), attr)
+        for dump in (cr.xml_dump_primary, cr.xml_dump_filelists, cr.xml_dump_other):
+            self.assertEqual(dump(cr_package), dump(expected))
+
+    def test_equivalence(self):
+        """Test that the packages are converted like one instance at a time, in order."""
+        for changelog_limit in (None, 1):
+            converted = list(Package.createrepo_c_packages(
+                self.packages, changelog_limit=changelog_limit, chunk_size=2
+            ))
+            self.assertEqual([pk for pk, cr_package in converted],
+                             [package.pk for package in self.packages])
+            for (pk, cr_package), package in zip(converted, self.packages):
+                self.assertEquivalent(cr_package,
+                                      package.to_createrepo_c(changelog_limit=changelog_limit))
+
+    def test_render_other_xml(self):
+        """Test that the other XML is rendered from its fields only like from the package."""
+        for changelog_limit in (None, 1):
+            for package in self.packages.only(*Package.OTHER_XML_FIELDS):
+                expected = Package.objects.get(pk=package.pk).to_createrepo_c(
+                    changelog_limit=changelog_limit
+                )
+                self.assertEqual(package.render_other_xml(changelog_limit),
+                                 cr.xml_dump_other(expected))
+
+    def test_no_instances(self):
+        """Test that the packages are converted with one query and without model instances."""
+        with mock.patch.object(Package, 'from_db', side_effect=AssertionError('instance')):
+            with self.assertNumQueries(1):
+                converted = list(Package.createrepo_c_packages(self.packages, chunk_size=2))
+        self.assertEqual(len(converted), 3)
+
+
+class TestPackageCapability(TestCase):
+    """Test the capabilities of packages."""
+
+    def test_for_package(self):
+        """Test that each distinct name of each kind is a capability, files by full path."""
+        package = create_package(0)
+        package.provides.append(['package-0', 'EQ', '0', '1.1', '1', False])
+        package.files.append(['dir', '/usr/share/package-0/', ''])
+
+        capabilities = PackageCapability.for_package(package)
+
+        self.assertEqual(sorted((capability.kind, capability.name) for capability in capabilities),
+                         [(CAPABILITY_KINDS.FILE, '/usr/share/package-0/'),
+                          (CAPABILITY_KINDS.FILE, '/usr/share/package-0/README'),
+                          (CAPABILITY_KINDS.PROVIDES, 'package-0'),
+                          (CAPABILITY_KINDS.REQUIRES, 'glibc')])
+        self.assertTrue(all(capability.package is package for capability in capabilities))
+        self.assertTrue(all(capability.pk is None for capability in capabilities))
+
+    def test_create_for_packages(self):
+        """Test that the capabilities of several packages are saved."""
+        packages = [create_package(i) for i in range(2)]
+
+        PackageCapability.create_for_packages(packages)
+
+        for i, package in enumerate(packages):
+            self.assertEqual(
+                sorted(package.capabilities.values_list('kind', 'name')),
+                [(CAPABILITY_KINDS.FILE, '/usr/share/package-{i}/README'.format(i=i)),
+                 (CAPABILITY_KINDS.PROVIDES, 'package-{i}'.format(i=i)),
+                 (CAPABILITY_KINDS.REQUIRES, 'glibc')]
+            )
@@ -0,0 +1,586 @@
+import bz2
+import gzip
+import io
+import lzma
+import hashlib
+import re
+import tempfile
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+import createrepo_c as cr
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from pulpcore.plugin.models import (
+    Artifact,
+    ContentArtifact,
+    PublishedArtifact,
+    PublishedMetadata,
+    Repository,
+    RepositoryContent,
+    RepositoryVersion,
+)
+
+from pulp_rpm.app.models import (
+    DistributionTree,
+    Package,
+    RepoMetadataFile,
+    RpmPublication,
+    UpdateCollection,
+    UpdateCollectionPackage,
+    UpdateRecord,
+    UpdateReference,
+)
+from pulp_rpm.app.tasks.publishing import (
+    PKGID_PATTERN,
+    content_fingerprint,
+    copy_package_entries,
+    copy_published_metadata,
+    identical_publication,
+    populate,
+    previous_package_metadata,
+    publish,
+    publish_mirror,
+    publish_packages,
+    publish_update_records,
+)
+
+
+LOCATION_PATTERN = re.compile(r'<location href="([^"]+)"')
+
+
+def create_publication(repository_version):
+    """Create a publication, without the created resource only a task can have."""
+    return RpmPublication.objects.create(repository_version=repository_version)
+
+
+class FakeWriter:
+    """Collect the chunks of a metadata file."""
+
+    def __init__(self):
+        """Start without chunks."""
+        self.chunks = []
+
+    def add_chunk(self, chunk):
+        """Collect a chunk."""
+        self.chunks.append(chunk)
+
+
+class TestPublishPackages(TestCase):
+    """Test the number of queries made to publish packages."""
+
+    QUERY_BUDGET = 5
+
+    def publish(self, number, unrendered=False):
+        """Publish a repository version of a number of packages, return the queries made."""
+        repository = Repository.objects.create(name='repo-{n}'.format(n=number))
+        version = RepositoryVersion.objects.create(repository=repository, number=1, complete=True)
+        for i in range(number):
+            package = Package.objects.create(
+                name='package-{n}-{i}'.format(n=number, i=i), epoch='0', version='1.0',
+                release='1', arch='noarch', pkgId='{n}-{i}'.format(n=number, i=i),
+                checksum_type='sha256'
+            )
+            ContentArtifact.objects.create(
+                content=package, relative_path='package-{i}.rpm'.format(i=i)
+            )
+            RepositoryContent.objects.create(
+                repository=repository, content=package, version_added=version
+            )
+        if unrendered:
+            Package.objects.filter(pk__in=version.content).update(
+                primary_xml=None, filelists_xml=None, other_xml=None
+            )
+        publication = RpmPublication.objects.create(repository_version=version)
+        writers = {data_type: FakeWriter() for data_type in ('primary', 'filelists', 'other')}
+
+        with CaptureQueriesContext(connection) as queries:
+            packages, relative_paths = populate(publication)
+            publish_packages(packages, relative_paths, writers)
+
+        # the packages are published in the order of their pks, which are random
+        self.assertEqual(
+            sorted(LOCATION_PATTERN.search(chunk).group(1) for chunk in writers['primary'].chunks),
+            sorted('package-{i}.rpm'.format(i=i) for i in range(number))
+        )
+        return len(queries)
+
+    def test_query_budget(self):
+        """Test that the number of queries doesn't depend on the number of packages."""
+        few = self.publish(2)
+        many = self.publish(20)
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, self.QUERY_BUDGET)
+
+    def test_unrendered(self):
+        """Test that packages without stored XML are rendered in bulk and updated."""
+        few = self.publish(2, unrendered=True)
+        many = self.publish(20, unrendered=True)
+        self.assertEqual(few, many)
+        self.assertFalse(Package.objects.filter(primary_xml__isnull=True).exists())
+
+    def test_changelog_limit(self):
+        """Test that only the newest changelogs are published, and all of them are kept."""
+        repository = Repository.objects.create(name='changelogs')
+        version = RepositoryVersion.objects.create(repository=repository, number=1, complete=True)
+        changelogs = [['author', 1, 'oldest changelog'], ['author', 2, 'newest changelog']]
+        package = Package.objects.create(
+            name='package', epoch='0', version='1.0', release='1', arch='noarch',
+            pkgId='changelogs', checksum_type='sha256', changelogs=changelogs
+        )
+        ContentArtifact.objects.create(content=package, relative_path='package.rpm')
+        RepositoryContent.objects.create(
+            repository=repository, content=package, version_added=version
+        )
+        publication = RpmPublication.objects.create(repository_version=version)
+        writers = {data_type: FakeWriter() for data_type in ('primary', 'filelists', 'other')}
+
+        packages, relative_paths = populate(publication)
+        publish_packages(packages, relative_paths, writers, changelog_limit=1)
+
+        self.assertIn('newest changelog', writers['other'].chunks[0])
+        self.assertNotIn('oldest changelog', writers['other'].chunks[0])
+        self.assertEqual(Package.objects.get(pk=package.pk).changelogs, changelogs)
+
+
+class TestPublish(TestCase):
+    """Test the checks made before publishing."""
+
+    @mock.patch('pulp_rpm.app.tasks.publishing.zchunk_available', return_value=False)
+    def test_zchunk_unavailable(self, zchunk_available):
+        """Test that zchunk metadata is refused by workers without the zck tool."""
+        with self.assertRaisesRegex(ValueError, 'zck'):
+            publish('unused', zchunk_metadata=True)
+
+
+class TestPublishUpdateRecords(TestCase):
+    """Test the number of queries made to publish advisories."""
+
+    def create(self, number):
+        """Create a number of advisories with a collection, a package and a reference."""
+        for i in range(number):
+            update_record = UpdateRecord.objects.create(
+                id='RHSA-{n}:{i}'.format(n=number, i=i), digest='{n}-{i}'.format(n=number, i=i)
+            )
+            collection = UpdateCollection.objects.create(
+                update_record=update_record, name='collection', shortname='collection'
+            )
+            UpdateCollectionPackage.objects.create(
+                update_collection=collection, name='package', epoch='0', version='1.0',
+                release='1', arch='noarch', filename='package-1.0-1.noarch.rpm'
+            )
+            UpdateReference.objects.create(
+                update_record=update_record, href='https://example.com/{i}'.format(i=i)
+            )
+        return UpdateRecord.objects.filter(id__startswith='RHSA-{n}:'.format(n=number))
+
+    def publish(self, number):
+        """Publish a number of advisories, return the number of queries made."""
+        update_records = self.create(number)
+        writer = FakeWriter()
+
+        with CaptureQueriesContext(connection) as queries:
+            publish_update_records(update_records, writer)
+
+        self.assertEqual(len(writer.chunks), number)
+        return len(queries)
+
+    def test_query_count(self):
+        """Test that the number of queries doesn't depend on the number of advisories."""
+        self.assertEqual(self.publish(2), self.publish(20))
+
+    def test_rendered_once(self):
+        """Test that a second publish reads the stored XML and writes the same entries."""
+        update_records = self.create(3)
+        first, second = FakeWriter(), FakeWriter()
+        publish_update_records(update_records, first)
+
+        with CaptureQueriesContext(connection) as queries:
+            publish_update_records(update_records, second)
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('collection', queries[0]['sql'])
+        self.assertEqual(second.chunks, first.chunks)
+        self.assertEqual(len(second.chunks), 3)
+        self.assertIsInstance(update_records.first().updateinfo_xml, str)
+
+
+class TestContentFingerprint(TestCase):
+    """Test the fingerprints of the content of repository versions."""
+
+    def version(self, name, update_records):
+        """Create a repository version of advisories."""
+        repository = Repository.objects.create(name=name)
+        version = RepositoryVersion.objects.create(repository=repository, number=1, complete=True)
+        for update_record in update_records:
+            RepositoryContent.objects.create(
+                repository=repository, content=update_record, version_added=version
+            )
+        return version
+
+    def test_fingerprint(self):
+        """Test that only versions with the same content have the same fingerprint."""
+        update_records = [
+            UpdateRecord.objects.create(id='RHBA-{i}'.format(i=i), digest=str(i))
+            for i in range(3)
+        ]
+        source = self.version('source', update_records)
+        copy = self.version('copy', reversed(update_records))
+        other = self.version('other', update_records[:2])
+
+        self.assertEqual(content_fingerprint(source), content_fingerprint(copy))
+        self.assertNotEqual(content_fingerprint(source), content_fingerprint(other))
+
+
+class TestIdenticalPublication(TestCase):
+    """Test reusing the metadata of publications of the same content with the same options."""
+
+    def setUp(self):
+        """Create two repository versions with the same package, and store files in a directory."""
+        self.media_root = tempfile.TemporaryDirectory()
+        media_root = override_settings(MEDIA_ROOT=self.media_root.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.addCleanup(self.media_root.cleanup)
+
+        package = Package.objects.create(
+            name='package', epoch='0', version='1.0', release='1', arch='noarch',
+            pkgId='identical', checksum_type='sha256'
+        )
+        self.versions = []
+        for name in ('source', 'copy'):
+            repository = Repository.objects.create(name=name)
+            version = RepositoryVersion.objects.create(repository=repository, number=1,
+                                                       complete=True)
+            RepositoryContent.objects.create(
+                repository=repository, content=package, version_added=version
+            )
+            self.versions.append(version)
+
+    def publication(self, version, **options):
+        """Create a publication of a repository version with its content fingerprint."""
+        return RpmPublication.objects.create(
+            repository_version=version, content_fingerprint=content_fingerprint(version),
+            **options
+        )
+
+    def test_reuse(self):
+        """Test that the metadata of the same content is published at the same paths."""
+        source = self.publication(self.versions[0], complete=True)
+        for relative_path, data in (('repodata/1234-primary.xml.gz', b'primary'),
+                                    ('repodata/repomd.xml', b'repomd')):
+            PublishedMetadata(relative_path=relative_path, publication=source,
+                              file=ContentFile(data, name=relative_path.split('/')[-1])).save()
+        publication = self.publication(self.versions[1])
+
+        self.assertEqual(identical_publication(publication), source)
+        copy_published_metadata(source, publication)
+
+        def published(publication):
+            """Return the checksums of the published metadata by relative path."""
+            checksums = {}
+            for published_metadata in PublishedMetadata.objects.filter(publication=publication):
+                with published_metadata.file.open('rb') as metadata_file:
+                    checksums[published_metadata.relative_path] = \
+                        hashlib.sha256(metadata_file.read()).hexdigest()
+            return checksums
+
+        self.assertEqual(published(publication), published(source))
+        self.assertEqual(len(published(publication)), 2)
+
+    def test_other_options(self):
+        """Test that publications with other options or content are not reused."""
+        self.publication(self.versions[0], complete=True, changelog_limit=10)
+        self.publication(self.versions[0], complete=False)
+        self.assertIsNone(identical_publication(self.publication(self.versions[1])))
+
+        self.publication(self.versions[0], complete=True, metadata_compression='xz')
+        self.assertIsNone(identical_publication(
+            self.publication(self.versions[1], metadata_compression='bz2')
+        ))
+
+        other = Repository.objects.create(name='other')
+        empty = RepositoryVersion.objects.create(repository=other, number=1, complete=True)
+        self.assertIsNone(identical_publication(self.publication(empty)))
+
+
+class TestPublishMirror(TestCase):
+    """Test the publications of mirrored repository versions."""
+
+    def add_content(self, version, content, relative_path, artifact=None):
+        """Add a content unit with an artifact at a relative path to a repository version."""
+        if content.pk is None:
+            content.save()
+        ContentArtifact.objects.get_or_create(content=content, relative_path=relative_path,
+                                              defaults={'artifact': artifact})
+        RepositoryContent.objects.create(
+            repository=version.repository, content=content, version_added=version
+        )
+
+    def add_primary(self, version, package, location_href):
+        """Add a mirrored primary.xml locating a package to a repository version."""
+        path = os.path.join(self.media_root.name, 'primary.xml')
+        cr_package = package.to_createrepo_c()
+        cr_package.location_href = location_href
+        primary = cr.PrimaryXmlFile(path, cr.NO_COMPRESSION)
+        primary.set_num_of_pkgs(1)
+        primary.add_pkg(cr_package)
+        primary.close()
+
+        artifact = Artifact.init_and_validate(path)
+        artifact.save()
+        self.add_content(version, RepoMetadataFile(
+            data_type='primary', checksum_type='sha256', checksum=artifact.sha256,
+            relative_path='repodata/primary.xml'
+        ), 'repodata/primary.xml', artifact=artifact)
+
+    def published_paths(self, version):
+        """Return the relative paths published by the publication of a repository version."""
+        publication = RpmPublication.objects.get(repository_version=version)
+        self.assertTrue(publication.complete)
+        return set(PublishedArtifact.objects.filter(publication=publication).
+                   values_list('relative_path', flat=True))
+
+    def setUp(self):
+        """Store artifacts in a temporary directory."""
+        self.media_root = tempfile.TemporaryDirectory()
+        media_root = override_settings(MEDIA_ROOT=self.media_root.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.addCleanup(self.media_root.cleanup)
+
+    @mock.patch.object(RpmPublication, 'create', create_publication)
+    def test_published_paths(self):
+        """Test that the mirrored files are published at their upstream locations."""
+        repository = Repository.objects.create(name='mirror')
+        version = RepositoryVersion.objects.create(repository=repository, number=1, complete=True)
+        self.add_content(version, Package(
+            name='package', epoch='0', version='1.0', release='1', arch='noarch', pkgId='1',
+            checksum_type='sha256', location_href='Packages/p/package-1.0-1.noarch.rpm'
+        ), 'package-1.0-1.noarch.rpm')
+        for data_type, relative_path in (('repomd', 'repodata/repomd.xml'),
+                                         ('treeinfo', '.treeinfo')):
+            self.add_content(version, RepoMetadataFile(
+                data_type=data_type, checksum_type='sha256', checksum=data_type,
+                relative_path=relative_path
+            ), relative_path)
+        self.add_content(version, DistributionTree(
+            header_version='1.0', release_name='Fedora', release_short='Fedora',
+            release_version='30', arch='x86_64', build_timestamp=0
+        ), 'images/pxeboot/vmlinuz')
+
+        publish_mirror(version)
+
+        self.assertEqual(
+            self.published_paths(version),
+            {'Packages/p/package-1.0-1.noarch.rpm', 'repodata/repomd.xml', '.treeinfo',
+             'images/pxeboot/vmlinuz'}
+        )
+
+    @mock.patch.object(RpmPublication, 'create', create_publication)
+    def test_shared_package(self):
+        """Test that a package synced from two layouts is published where each one has it."""
+        package = Package.objects.create(
+            name='package', epoch='0', version='1.0', release='1', arch='noarch',
+            pkgId='shared', checksum_type='sha256',
+            location_href='Packages/p/package-1.0-1.noarch.rpm'
+        )
+        layouts = {'by-letter': 'Packages/p/package-1.0-1.noarch.rpm',
+                   'flat': 'package-1.0-1.noarch.rpm'}
+        versions = {}
+        for name, location_href in layouts.items():
+            repository = Repository.objects.create(name=name)
+            versions[name] = RepositoryVersion.objects.create(repository=repository, number=1,
+                                                              complete=True)
+            self.add_content(versions[name], package, 'package-1.0-1.noarch.rpm')
+            self.add_primary(versions[name], package, location_href)
+
+        for name, location_href in layouts.items():
+            with self.subTest(layout=name):
+                publish_mirror(versions[name])
+                self.assertEqual(self.published_paths(versions[name]),
+                                 {location_href, 'repodata/primary.xml'})
+
+
+PRIMARY_ENTRY = """<package type="rpm">
+  <name>{name}</name>
+  <arch>noarch</arch>
+  <version epoch="0" ver="1.0" rel="1"/>
+  <checksum type="sha256" pkgid="YES">{pkgid}</checksum>
+  <format>
+    <rpm:packager>Packager</rpm:packager>
+  </format>
+</package>
+"""
+FILELISTS_ENTRY = """<package pkgid="{pkgid}" name="{name}" arch="noarch">
+  <version epoch="0" ver="1.0" rel="1"/>
+  <file>/usr/bin/{name}</file>
+</package>
+"""
+OTHER_ENTRY = """<package pkgid="{pkgid}" name="{name}" arch="noarch">
+  <version epoch="0" ver="1.0" rel="1"/>
+  <changelog author="author" date="1">changelog</changelog>
+</package>
+"""
+ENTRIES = {'primary': PRIMARY_ENTRY, 'filelists': FILELISTS_ENTRY, 'other': OTHER_ENTRY}
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<metadata packages="2">\n'
+FOOTER = '</metadata>\n'
+COMPRESSORS = {'gz': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+
+class FakeFile:
+    """A stored file holding some data."""
+
+    def __init__(self, data):
+        """Hold the data."""
+        self.data = data
+
+    def open(self, mode):
+        """Open the file for reading."""
+        return io.BytesIO(self.data)
+
+
+def fake_metadata(data_type, names, compression='gz'):
+    """Create a published metadata file with the entries of packages named after their pkgIds."""
+    entries = ''.join(ENTRIES[data_type].format(name=name, pkgid=name) for name in names)
+    data = COMPRESSORS[compression]((HEADER + entries + FOOTER).encode('utf-8'))
+    relative_path = 'repodata/1234-{t}.xml.{c}'.format(t=data_type, c=compression)
+    return SimpleNamespace(relative_path=relative_path, file=FakeFile(data))
+
+
+class TestPkgidPattern(TestCase):
+    """Test finding the pkgId of a package entry."""
+
+    def test_entries(self):
+        """Test that the pkgId is found in the entries of primary, filelists and other."""
+        for data_type, entry in ENTRIES.items():
+            with self.subTest(data_type=data_type):
+                match = PKGID_PATTERN.search(entry.format(name='foo', pkgid='abc123'))
+                self.assertEqual(match.group(1), 'abc123')
+
+    def test_primary_checksum(self):
+        """Test that the checksum marked as the pkgid is found in primary entries."""
+        match = PKGID_PATTERN.search(
+            '<checksum type="sha256" pkgid="YES">abc123</checksum>'
+        )
+        self.assertEqual(match.group(1), 'abc123')
+
+
+class TestCopyPackageEntries(TestCase):
+    """Test copying the package entries of a previous publication."""
+
+    def test_removed(self):
+        """Test that all the entries but the ones of the removed packages are copied."""
+        for data_type in ENTRIES:
+            with self.subTest(data_type=data_type):
+                writer = FakeWriter()
+                copy_package_entries(fake_metadata(data_type, ['foo', 'bar', 'baz']), writer,
+                                     {'bar'})
+                self.assertEqual(writer.chunks, [
+                    ENTRIES[data_type].format(name=name, pkgid=name) for name in ('foo', 'baz')
+                ])
+
+    def test_compression(self):
+        """Test that the entries are copied whatever the compression of the previous files."""
+        for compression in COMPRESSORS:
+            with self.subTest(compression=compression):
+                writer = FakeWriter()
+                copy_package_entries(fake_metadata('primary', ['foo'], compression), writer,
+                                     set())
+                self.assertEqual(writer.chunks, [PRIMARY_ENTRY.format(name='foo', pkgid='foo')])
+
+    def test_added(self):
+        """Test that the entries of added packages follow the copied ones."""
+        repository = Repository.objects.create(name='incremental')
+        version = RepositoryVersion.objects.create(repository=repository, number=2, complete=True)
+        package = Package.objects.create(
+            name='added', epoch='0', version='1.0', release='1', arch='noarch', pkgId='added',
+            checksum_type='sha256'
+        )
+        ContentArtifact.objects.create(content=package, relative_path='added.rpm')
+        RepositoryContent.objects.create(
+            repository=repository, content=package, version_added=version
+        )
+        publication = RpmPublication.objects.create(repository_version=version)
+        writers = {data_type: FakeWriter() for data_type in ENTRIES}
+
+        for data_type in ENTRIES:
+            copy_package_entries(fake_metadata(data_type, ['kept', 'removed']),
+                                 writers[data_type], {'removed'})
+        packages, relative_paths = populate(publication)
+        publish_packages(packages, relative_paths, writers)
+
+        for data_type, writer in writers.items():
+            with self.subTest(data_type=data_type):
+                pkgids = [PKGID_PATTERN.search(chunk).group(1) for chunk in writer.chunks]
+                self.assertEqual(pkgids, ['kept', 'added'])
+
+
+class TestPreviousPackageMetadata(TestCase):
+    """Test finding the publication an incremental publish starts from."""
+
+    def setUp(self):
+        """Create a repository with a few versions."""
+        self.repository = Repository.objects.create(name='previous')
+        self.versions = [
+            RepositoryVersion.objects.create(repository=self.repository, number=number,
+                                             complete=True)
+            for number in range(3)
+        ]
+
+    def publish(self, version, changelog_limit=None, compression='gz', data_types=ENTRIES):
+        """Create a complete publication with package metadata of a compression type."""
+        publication = RpmPublication.objects.create(
+            repository_version=version, changelog_limit=changelog_limit, complete=True,
+            content_fingerprint='fingerprint-{number}'.format(number=version.number)
+        )
+        for data_type in data_types:
+            PublishedMetadata.objects.create(
+                publication=publication,
+                relative_path='repodata/1234-{t}.xml.{c}'.format(t=data_type, c=compression),
+                file='1234-{t}.xml.{c}'.format(t=data_type, c=compression)
+            )
+        return publication
+
+    def test_latest(self):
+        """Test that the latest publication of an older version is found."""
+        self.publish(self.versions[0])
+        previous = self.publish(self.versions[1], compression='xz')
+        self.publish(self.versions[2])
+
+        publication, metadata = previous_package_metadata(self.versions[2], None)
+
+        self.assertEqual(publication, previous)
+        self.assertEqual(sorted(metadata), sorted(ENTRIES))
+        self.assertEqual(metadata['primary'].relative_path, 'repodata/1234-primary.xml.xz')
+
+    def test_changelog_limit(self):
+        """Test that publications with another changelog limit are not used."""
+        self.publish(self.versions[0])
+        self.publish(self.versions[1], changelog_limit=10)
+
+        publication, metadata = previous_package_metadata(self.versions[2], None)
+        self.assertEqual(publication.repository_version, self.versions[0])
+        self.assertEqual(previous_package_metadata(self.versions[2], 5), (None, None))
+
+    def test_missing_metadata(self):
+        """Test that publications without all the package metadata are not used."""
+        self.publish(self.versions[1], data_types=['primary', 'other'])
+        self.assertEqual(previous_package_metadata(self.versions[2], None), (None, None))
+
+    def test_mirror_publication(self):
+        """Test that a mirror publication of a newer version doesn't hide an older one."""
+        previous = self.publish(self.versions[0])
+        mirror = RpmPublication.objects.create(repository_version=self.versions[1], complete=True)
+        PublishedMetadata.objects.create(
+            publication=mirror, relative_path='repodata/repomd.xml', file='repomd.xml'
+        )
+
+        publication, metadata = previous_package_metadata(self.versions[2], None)
+        self.assertEqual(publication, previous)
+        self.assertEqual(sorted(metadata), sorted(ENTRIES))
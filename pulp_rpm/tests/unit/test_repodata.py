@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+from django.test import TestCase
+
+from pulp_rpm.app.tasks.repodata import (
+    COMPS_FOOTER,
+    COMPS_HEADER,
+    category_xml,
+    environment_xml,
+    langpacks_xml,
+    package_group_xml,
+)
+
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+class TestRepodata(TestCase):
+    """Test rendering comps.xml entries."""
+
+    def test_package_group(self):
+        """Test that a group is rendered with its translations and packages."""
+        group = SimpleNamespace(
+            id='core', name='Core', name_by_lang='{"de": "Kern"}', description='',
+            desc_by_lang='', default=True, user_visible=False, biarch_only=False,
+            display_order=1, packages='["bash", {"name": "vim", "type": "optional"}]'
+        )
+        element = ElementTree.fromstring(package_group_xml(group))
+        self.assertEqual(element.find('id').text, 'core')
+        self.assertEqual(
+            [name.text for name in element.findall('name')], ['Core', 'Kern']
+        )
+        self.assertEqual(
+            [(req.text, req.get('type')) for req in element.iter('packagereq')],
+            [('bash', 'mandatory'), ('vim', 'optional')]
+        )
+
+    def test_category(self):
+        """Test that a category is rendered with its groups, plain or marked as default."""
+        category = SimpleNamespace(
+            id='desktops', name='Desktops', name_by_lang='', description='Desktops',
+            desc_by_lang='{"fr": "Bureaux"}', display_order=10,
+            group_ids='["gnome", {"name": "kde", "default": true}]'
+        )
+        element = ElementTree.fromstring(category_xml(category))
+        self.assertEqual(element.tag, 'category')
+        self.assertEqual(
+            [(description.text, description.get(XML_LANG))
+             for description in element.findall('description')],
+            [('Desktops', None), ('Bureaux', 'fr')]
+        )
+        self.assertEqual(
+            [(group.text, group.get('default')) for group in element.find('grouplist')],
+            [('gnome', None), ('kde', 'true')]
+        )
+
+    def test_environment(self):
+        """Test that an environment is rendered with its groups and options."""
+        environment = SimpleNamespace(
+            id='workstation', name='Workstation', name_by_lang='', description='',
+            desc_by_lang='', display_order=1, group_ids='["core", "gnome"]',
+            option_ids='[{"name": "office", "default": true}]'
+        )
+        element = ElementTree.fromstring(environment_xml(environment))
+        self.assertEqual(element.find('id').text, 'workstation')
+        self.assertEqual([group.text for group in element.find('grouplist')],
+                         ['core', 'gnome'])
+        self.assertEqual(
+            [(option.text, option.get('default')) for option in element.find('optionlist')],
+            [('office', 'true')]
+        )
+
+    def test_empty_lists(self):
+        """Test that empty texts are rendered as empty lists."""
+        environment = SimpleNamespace(
+            id='minimal', name='Minimal', name_by_lang='', description='', desc_by_lang='',
+            display_order=1, group_ids='', option_ids='[]'
+        )
+        element = ElementTree.fromstring(environment_xml(environment))
+        self.assertEqual(list(element.find('grouplist')), [])
+        self.assertEqual(list(element.find('optionlist')), [])
+
+    def test_langpacks(self):
+        """Test that the langpacks are rendered as matches sorted by package name."""
+        langpacks = SimpleNamespace(
+            matches='{"hunspell": "hunspell-%s", "autocorr-*": "autocorr-%s"}'
+        )
+        element = ElementTree.fromstring(langpacks_xml(langpacks))
+        self.assertEqual(
+            [(match.get('name'), match.get('install')) for match in element.iter('match')],
+            [('autocorr-*', 'autocorr-%s'), ('hunspell', 'hunspell-%s')]
+        )
+
+    def test_comps(self):
+        """Test that the entries make a well-formed comps.xml between the header and footer."""
+        langpacks = SimpleNamespace(matches='{"hunspell": "hunspell-%s"}')
+        comps = ElementTree.fromstring(COMPS_HEADER + langpacks_xml(langpacks) + COMPS_FOOTER)
+        self.assertEqual([element.tag for element in comps], ['langpacks'])
@@ -0,0 +1,70 @@
+from django.test import TestCase
+
+from pulp_rpm.app.rpm_version import evr_sort_key, version_sort_key
+
+
+class TestVersionSortKey(TestCase):
+    """Test that version sort keys compare like rpmvercmp."""
+
+    # (older, newer) pairs from the rpmvercmp test suite of rpm
+    OLDER_NEWER = [
+        ('1.0', '2.0'),
+        ('2.0', '2.0.1'),
+        ('2.0.1', '2.0.1a'),
+        ('5.5p1', '5.5p2'),
+        ('5.5p1', '5.5p10'),
+        ('10xyz', '10.1xyz'),
+        ('xyz10', 'xyz10.1'),
+        ('xyz.4', '8'),
+        ('xyz.4', '2'),
+        ('5.5p2', '5.6p1'),
+        ('5.6p1', '6.5p1'),
+        ('6.0', '6.0.rc1'),
+        ('10a2', '10b2'),
+        ('1.0a', '1.0aa'),
+        ('10.0001', '10.0039'),
+        ('4.999.9', '5.0'),
+        ('20101121', '20101122'),
+        ('a', 'b'),
+        ('a+', 'b+'),
+        ('1.0~rc1', '1.0'),
+        ('1.0~rc1', '1.0~rc2'),
+        ('1.0~rc1~git123', '1.0~rc1'),
+        ('1.0', '1.0^'),
+        ('1.0', '1.0^git1'),
+        ('1.0^git1', '1.0^git2'),
+        ('1.0^git1', '1.01'),
+        ('1.0^20160101', '1.0.1'),
+        ('1.0~rc1', '1.0~rc1^git1'),
+        ('1.0^git1~pre', '1.0^git1'),
+    ]
+
+    EQUAL = [
+        ('1.0', '1.0'),
+        ('1.0', '1_0'),
+        ('1.0010', '1.10'),
+        ('2_0', '2_0'),
+        ('2.0', '2_0'),
+        ('a', 'a'),
+        ('+a', '_a'),
+        ('+_', '_+'),
+        ('1.0^', '1.0^'),
+    ]
+
+    def test_older_newer(self):
+        """Test that the keys of older versions are smaller."""
+        for older, newer in self.OLDER_NEWER:
+            self.assertLess(version_sort_key(older), version_sort_key(newer), (older, newer))
+
+    def test_equal(self):
+        """Test that versions which rpm considers equal have equal keys."""
+        for one, two in self.EQUAL:
+            self.assertEqual(version_sort_key(one), version_sort_key(two), (one, two))
+
+    def test_evr(self):
+        """Test that the epoch is compared first, then the version and then the release."""
+        self.assertLess(evr_sort_key('0', '2.0', '1'), evr_sort_key('1', '1.0', '1'))
+        self.assertEqual(evr_sort_key('', '1.0', '1'), evr_sort_key('0', '1.0', '1'))
+        self.assertLess(evr_sort_key('0', '1.0', '9'), evr_sort_key('0', '1.0.1', '1'))
+        self.assertLess(evr_sort_key('0', '1.0', '1'), evr_sort_key('0', '1.0', '1.el8'))
+        self.assertLess(evr_sort_key('9', '1', '1'), evr_sort_key('10', '1', '1'))
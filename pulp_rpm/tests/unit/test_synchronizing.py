@@ -0,0 +1,290 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from pulpcore.plugin.models import Repository, RepositoryContent, RepositoryVersion
+from pulpcore.plugin.stages import DeclarativeContent, Stage
+
+from pulp_rpm.app.constants import (
+    CR_PACKAGE_ATTRS,
+    SIGNATURE_POLICIES,
+    SIGNATURE_STATUSES,
+)
+from pulp_rpm.app.models import Package, UpdateRecord
+from pulp_rpm.app.tasks.synchronizing import (
+    BulkRemoveDuplicates,
+    PackageDeclarativeContent,
+    PackageHeaderVerifier,
+    PackageRecord,
+    PackageSignatureVerifier,
+    RpmDeclarativeVersion,
+    RpmFirstStage,
+)
+
+
+def make_package():
+    """Create an unsaved package."""
+    return Package(name='foo', epoch='0', version='1.0', release='1', arch='noarch',
+                   size_installed=1234, provides=[['foo', None, None, None, None, False]])
+
+
+class TestPackageRecord(TestCase):
+    """Test the records of parsed packages."""
+
+    def test_changelogs(self):
+        """Test that all the changelogs of a synced package are kept."""
+        changelogs = [('author', date, 'changelog {date}'.format(date=date))
+                      for date in (3, 1, 2)]
+        cr_package = SimpleNamespace(**dict.fromkeys(vars(CR_PACKAGE_ATTRS).values()))
+        cr_package.name, cr_package.epoch, cr_package.version = 'foo', '0', '1.0'
+        cr_package.release, cr_package.arch, cr_package.pkgId = '1', 'noarch', 'abc'
+        cr_package.changelogs = changelogs
+
+        package = PackageRecord(cr_package).to_package()
+        self.assertEqual([tuple(changelog) for changelog in package.changelogs], changelogs)
+
+
+class FakeRecord(PackageRecord):
+    """A package record counting its conversions."""
+
+    __slots__ = ()
+    converted = 0
+
+    def __init__(self):
+        """Create an empty record."""
+
+    def to_package(self):
+        """Create an unsaved package."""
+        FakeRecord.converted += 1
+        return make_package()
+
+
+class TestPackageDeclarativeContent(TestCase):
+    """Test the declarative content of packages waiting in the pipeline."""
+
+    def test_slots(self):
+        """Test that the declarative content has no __dict__, which would double its size."""
+        declarative_content = PackageDeclarativeContent(content=make_package())
+        self.assertFalse(hasattr(declarative_content, '__dict__'))
+
+    def test_record(self):
+        """Test that the package is created from the record on first access only."""
+        FakeRecord.converted = 0
+        declarative_content = PackageDeclarativeContent(content=FakeRecord())
+        self.assertEqual(FakeRecord.converted, 0)
+
+        package = declarative_content.content
+        self.assertIsInstance(package, Package)
+        self.assertIs(declarative_content.content, package)
+        self.assertEqual(FakeRecord.converted, 1)
+
+
+class TestPackageSignatureVerifier(TestCase):
+    """Test the signature policies."""
+
+    NOT_SIGNED = (
+        SIGNATURE_STATUSES.UNSIGNED,
+        SIGNATURE_STATUSES.BAD_SIGNATURE,
+        OSError('rpmkeys failed'),
+    )
+
+    def test_signed(self):
+        """Test that signed packages are kept under all the policies."""
+        for policy in (SIGNATURE_POLICIES.REJECT, SIGNATURE_POLICIES.WARN):
+            verifier = PackageSignatureVerifier('key', policy)
+            self.assertTrue(verifier.handle_result(make_package(), SIGNATURE_STATUSES.SIGNED))
+
+    def test_reject(self):
+        """Test that packages which are not correctly signed are dropped under 'reject'."""
+        verifier = PackageSignatureVerifier('key', SIGNATURE_POLICIES.REJECT)
+        for result in self.NOT_SIGNED:
+            with self.assertLogs('pulp_rpm.app.tasks.synchronizing', 'ERROR'):
+                self.assertFalse(verifier.handle_result(make_package(), result))
+
+    def test_warn(self):
+        """Test that packages which are not correctly signed are kept under 'warn'."""
+        verifier = PackageSignatureVerifier('key', SIGNATURE_POLICIES.WARN)
+        for result in self.NOT_SIGNED:
+            with self.assertLogs('pulp_rpm.app.tasks.synchronizing', 'WARNING'):
+                self.assertTrue(verifier.handle_result(make_package(), result))
+
+
+class TestPackageHeaderVerifier(TestCase):
+    """Test the verification of package headers."""
+
+    HEADER = {
+        'name': 'foo',
+        'epoch': '0',
+        'version': '1.0',
+        'release': '1',
+        'arch': 'noarch',
+        'size_installed': 1234,
+        'provides': ['foo'],
+    }
+
+    def test_mismatches(self):
+        """Test that the fields which differ from the header are reported."""
+        header = dict(self.HEADER, version='2.0', provides=['bar', 'foo'])
+        self.assertEqual(PackageHeaderVerifier.header_mismatches(make_package(), header),
+                         ['version', 'provides'])
+        self.assertEqual(PackageHeaderVerifier.header_mismatches(make_package(), self.HEADER),
+                         [])
+
+    def test_report(self):
+        """Test that the packages which don't match their headers are counted and kept."""
+        verifier = PackageHeaderVerifier()
+        self.assertTrue(verifier.handle_result(make_package(), self.HEADER))
+        with self.assertLogs('pulp_rpm.app.tasks.synchronizing', 'WARNING'):
+            self.assertTrue(verifier.handle_result(make_package(), ValueError('no header')))
+            self.assertTrue(verifier.handle_result(make_package(),
+                                                   dict(self.HEADER, arch='x86_64')))
+        with self.assertLogs('pulp_rpm.app.tasks.synchronizing', 'WARNING') as logs:
+            verifier.report()
+        self.assertIn('2 package(s)', logs.output[0])
+
+
+class TestRpmDeclarativeVersion(TestCase):
+    """Test the pipeline of RPM syncs."""
+
+    @override_settings(RPM_SYNC_INSTRUMENTATION=True)
+    def test_instrumented_stages(self):
+        """Test that all the stages, including ContentAssociation, are instrumented."""
+        repository = mock.MagicMock()
+        repository.name = 'repo'
+        dv = RpmDeclarativeVersion(Stage(), repository)
+        stages = []
+
+        async def create_pipeline(pipeline):
+            stages.extend(pipeline)
+
+        with mock.patch.object(RpmDeclarativeVersion, 'pipeline_stages', return_value=[Stage()]), \
+                mock.patch('pulp_rpm.app.tasks.synchronizing.WorkingDirectory'), \
+                mock.patch('pulp_rpm.app.tasks.synchronizing.create_pipeline', create_pipeline):
+            dv.create()
+
+        self.assertEqual([type(stage.stage).__name__ for stage in stages],
+                         ['Stage', 'ContentAssociation'])
+
+
+class TestBulkRemoveDuplicates(TestCase):
+    """Test removing the packages duplicating the packages of a sync."""
+
+    NEVRA_FIELDS = ['name', 'epoch', 'version', 'release', 'arch']
+
+    def setUp(self):
+        """Create a repository version which is being built."""
+        self.repository = Repository.objects.create(name='duplicates')
+        self.version = RepositoryVersion.objects.create(repository=self.repository, number=1)
+
+    def package(self, pkgId, name='foo', epoch='0', add=False):
+        """Create a package, in the repository version if add is True."""
+        package = Package.objects.create(name=name, epoch=epoch, version='1.0', release='1',
+                                         arch='noarch', pkgId=pkgId, checksum_type='sha256')
+        if add:
+            RepositoryContent.objects.create(
+                repository=self.repository, content=package, version_added=self.version
+            )
+        return package
+
+    def run_stage(self, packages):
+        """Run the stage on a batch of packages, return the number of packages it emitted."""
+        stage = BulkRemoveDuplicates(self.version, Package, self.NEVRA_FIELDS)
+
+        async def run():
+            in_q, out_q = asyncio.Queue(), asyncio.Queue()
+            for package in packages:
+                await in_q.put(DeclarativeContent(content=package))
+            await in_q.put(None)
+            stage._connect(in_q, out_q)
+            await stage()
+            # the None ending the pipeline is emitted too
+            return out_q.qsize() - 1
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def content(self):
+        """Get the pkgIds of the packages in the repository version."""
+        return set(Package.objects.filter(pk__in=self.version.content).values_list(
+            'pkgId', flat=True
+        ))
+
+    def test_existing(self):
+        """Test that a package of the version with the NEVRA of a synced package is removed."""
+        self.package('existing', add=True)
+        self.package('kept', name='bar', add=True)
+
+        self.assertEqual(self.run_stage([self.package('synced')]), 1)
+        self.assertEqual(self.content(), {'kept'})
+
+    def test_same_batch(self):
+        """Test that the packages of a batch aren't removed as duplicates of each other."""
+        existing = self.package('existing', add=True)
+        synced = self.package('synced')
+
+        self.assertEqual(self.run_stage([existing, synced]), 2)
+        self.assertEqual(self.content(), {'existing'})
+
+    def test_epoch(self):
+        """Test that a package with another epoch is not a duplicate."""
+        self.package('existing', epoch='0', add=True)
+
+        self.assertEqual(self.run_stage([self.package('synced', epoch='1')]), 1)
+        self.assertEqual(self.content(), {'existing'})
+
+
+class TestUpdateRecordDates(TestCase):
+    """Test the dates of synced advisories."""
+
+    UPDATEINFO = """<?xml version="1.0" encoding="UTF-8"?>
+<updates>
+  <update from="security@example.com" status="final" type="bugfix" version="1">
+    <id>RHBA-1</id>
+    <title>formatted</title>
+    <issued date="2013-12-02 10:05:30"/>
+    <updated date="2013-12-03 00:00:00"/>
+  </update>
+  <update from="security@example.com" status="final" type="bugfix" version="1">
+    <id>RHBA-2</id>
+    <title>epoch seconds</title>
+    <issued date="1483228800"/>
+  </update>
+</updates>
+"""
+
+    def parse(self):
+        """Parse the advisories like a sync, return their dates by id."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'updateinfo.xml')
+            with open(path, 'w') as updateinfo:
+                updateinfo.write(self.UPDATEINFO)
+            loop = asyncio.new_event_loop()
+            try:
+                updates = loop.run_until_complete(RpmFirstStage.parse_updateinfo(path))
+            finally:
+                loop.close()
+
+        dates = {}
+        for update in updates:
+            update_record = UpdateRecord(**UpdateRecord.createrepo_to_dict(update))
+            update_record.digest = update_record.id
+            update_record.save()
+            update_record.refresh_from_db()
+            dates[update_record.id] = (update_record.issued_date, update_record.updated_date)
+        return dates
+
+    def test_dates(self):
+        """Test that formatted and epoch dates are stored in UTC, missing ones as None."""
+        self.assertEqual(self.parse(), {
+            'RHBA-1': (datetime(2013, 12, 2, 10, 5, 30, tzinfo=timezone.utc),
+                       datetime(2013, 12, 3, tzinfo=timezone.utc)),
+            'RHBA-2': (datetime(2017, 1, 1, tzinfo=timezone.utc), None),
+        })
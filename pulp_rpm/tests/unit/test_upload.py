@@ -0,0 +1,58 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from pulpcore.plugin.models import Artifact
+
+from pulp_rpm.app.models import Package
+from pulp_rpm.app.tasks.upload import one_shot_upload
+
+
+class TestOneShotUpload(TestCase):
+    """Test uploading packages."""
+
+    FIELDS = {
+        'name': 'foo', 'epoch': '0', 'version': '1.0', 'release': '1', 'arch': 'noarch',
+        'pkgId': 'abc123', 'checksum_type': 'sha256', 'location_href': 'foo-1.0-1.noarch.rpm',
+        'files': [[None, '/usr/bin/', 'foo']],
+        'changelogs': [['author', 1, 'changelog']],
+    }
+
+    def setUp(self):
+        """Store the artifact of the uploaded file in a temporary directory."""
+        self.media_root = tempfile.TemporaryDirectory()
+        media_root = override_settings(MEDIA_ROOT=self.media_root.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.addCleanup(self.media_root.cleanup)
+
+        path = os.path.join(self.media_root.name, 'foo.rpm')
+        with open(path, 'wb') as rpm:
+            rpm.write(b'foo')
+        self.artifact = Artifact.init_and_validate(path)
+        self.artifact.save()
+
+    def upload(self, fields):
+        """Upload the file as a package with the given fields."""
+        with mock.patch('pulp_rpm.app.tasks.upload._prepare_package', return_value=fields), \
+                mock.patch('pulp_rpm.app.tasks.upload.CreatedResource'):
+            one_shot_upload(self.artifact.pk, fields['location_href'])
+
+    def test_upload(self):
+        """Test that the package is created with all its fields."""
+        self.upload(dict(self.FIELDS))
+
+        package = Package.objects.get(pkgId='abc123')
+        self.assertEqual(package.files, self.FIELDS['files'])
+        self.assertEqual(package.changelogs, self.FIELDS['changelogs'])
+        self.assertNotEqual(package.evr_sort_key, b'')
+
+    def test_existing(self):
+        """Test that a package is found by its NEVRA and checksum, whatever its other fields."""
+        self.upload(dict(self.FIELDS))
+
+        with self.assertRaisesRegex(OSError, 'already exists'):
+            self.upload(dict(self.FIELDS, changelogs=[['author', 2, 'other changelog']]))
+        self.assertEqual(Package.objects.filter(pkgId='abc123').count(), 1)
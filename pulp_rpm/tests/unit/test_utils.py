@@ -0,0 +1,167 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from django.test import TestCase
+
+from pulp_rpm.app.constants import SIGNATURE_STATUSES
+from pulp_rpm.app.tasks.utils import (
+    check_package_signature,
+    import_gpg_keys,
+    rpm_header_to_dict,
+)
+
+
+def build_rpm_header(entries):
+    """Build an RPM header from a list of (tag, type, data, count) tuples."""
+    index = b''
+    store = b''
+    for tag, tag_type, data, count in entries:
+        if tag_type == 4:
+            store += b'\x00' * (-len(store) % 4)
+        index += struct.pack('>iIiI', tag, tag_type, len(store), count)
+        store += data
+    return b'\x8e\xad\xe8\x01\x00\x00\x00\x00' + struct.pack('>II', len(entries), len(store)) + \
+        index + store
+
+
+class TestRpmHeader(TestCase):
+    """Test reading RPM headers."""
+
+    LEAD = b'\x00' * 96
+
+    def read(self, header):
+        """Write a fake package with the header and read it back."""
+        with tempfile.NamedTemporaryFile() as rpm_file:
+            rpm_file.write(self.LEAD + header + b'payload')
+            rpm_file.flush()
+            return rpm_header_to_dict(rpm_file.name, len(self.LEAD), len(self.LEAD) + len(header))
+
+    def test_binary_package(self):
+        """Test that the NEVRA, size and provides of a binary package are read."""
+        header = build_rpm_header([
+            (1000, 6, b'foo\x00', 1),
+            (1001, 6, b'1.0\x00', 1),
+            (1002, 6, b'1.el8\x00', 1),
+            (1003, 4, struct.pack('>I', 2), 1),
+            (1009, 4, struct.pack('>I', 1234), 1),
+            (1022, 6, b'x86_64\x00', 1),
+            (1044, 6, b'foo-1.0-1.el8.src.rpm\x00', 1),
+            (1047, 8, b'foo\x00foo(x86-64)\x00foo\x00', 3),
+        ])
+        self.assertEqual(self.read(header), {
+            'name': 'foo',
+            'epoch': '2',
+            'version': '1.0',
+            'release': '1.el8',
+            'arch': 'x86_64',
+            'size_installed': 1234,
+            'provides': ['foo', 'foo(x86-64)'],
+        })
+
+    def test_source_package(self):
+        """Test that a package without a source rpm is reported as 'src' with epoch '0'."""
+        header = build_rpm_header([
+            (1000, 6, b'foo\x00', 1),
+            (1022, 6, b'x86_64\x00', 1),
+        ])
+        result = self.read(header)
+        self.assertEqual(result['arch'], 'src')
+        self.assertEqual(result['epoch'], '0')
+
+    def test_no_header(self):
+        """Test that a byte range without a header is rejected."""
+        with self.assertRaises(ValueError):
+            self.read(b'\x00' * 32)
+
+
+def generate_gpg_key(directory):
+    """Generate a signing key in a new gpg home directory, return its ASCII armored public key."""
+    env = dict(os.environ, GNUPGHOME=directory)
+    subprocess.run(['gpg', '--batch', '--passphrase', '', '--quick-generate-key',
+                    'Pulp Test <test@example.com>', 'rsa2048', 'sign', 'never'],
+                   env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return subprocess.run(['gpg', '--armor', '--export'], env=env, check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+class TestImportGpgKeys(TestCase):
+    """Test creating local rpm keyrings."""
+
+    def setUp(self):
+        """Create a directory for the keyrings."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_no_key(self):
+        """Test that text without a public key is refused."""
+        with self.assertRaises(ValueError):
+            import_gpg_keys('not a key', self.directory)
+
+    @unittest.skipUnless(shutil.which('rpmkeys') and shutil.which('gpg'),
+                         'rpm and gpg are not installed')
+    def test_keyrings(self):
+        """Test that each import creates a keyring of its own in the same directory."""
+        gpgkey = generate_gpg_key(tempfile.mkdtemp(dir=self.directory))
+        first = import_gpg_keys(gpgkey, self.directory)
+        second = import_gpg_keys(gpgkey, self.directory)
+        self.assertNotEqual(first, second)
+        for keyring in (first, second):
+            self.assertEqual(os.path.dirname(keyring), self.directory)
+
+    @unittest.skipUnless(shutil.which('rpmkeys') and shutil.which('gpg'),
+                         'rpm and gpg are not installed')
+    def test_bad_key(self):
+        """Test that a key rpm can't import is refused."""
+        with self.assertRaises(ValueError):
+            import_gpg_keys('-----BEGIN PGP PUBLIC KEY BLOCK-----\n\nnot a key\n'
+                            '-----END PGP PUBLIC KEY BLOCK-----\n', self.directory)
+
+
+@unittest.skipUnless(shutil.which('rpmkeys') and shutil.which('gpg'),
+                     'rpm and gpg are not installed')
+class TestCheckPackageSignature(TestCase):
+    """Test checking package signatures against a local keyring."""
+
+    def setUp(self):
+        """Create a keyring."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        gpgkey = generate_gpg_key(tempfile.mkdtemp(dir=self.directory))
+        self.keyring = import_gpg_keys(gpgkey, self.directory)
+
+    def test_not_a_package(self):
+        """Test that a file which is not a package doesn't pass the check."""
+        path = os.path.join(self.directory, 'foo.rpm')
+        with open(path, 'wb') as rpm_file:
+            rpm_file.write(b'\x00' * 1024)
+        self.assertEqual(check_package_signature(self.keyring, path),
+                         SIGNATURE_STATUSES.BAD_SIGNATURE)
+
+
+class TestSignatureOutput(TestCase):
+    """Test reading the output of rpmkeys --checksig."""
+
+    PATH = '/var/lib/pulp/gpg-keys/pgp/foo.rpm'
+
+    def check(self, output):
+        """Check the signature of a package for which rpmkeys reports an output."""
+        process = subprocess.CompletedProcess([], 0, stdout=output)
+        with mock.patch('pulp_rpm.app.tasks.utils.subprocess.run', return_value=process):
+            return check_package_signature('keyring', self.PATH)
+
+    def test_path(self):
+        """Test that gpg or pgp in the path of an unsigned package don't make it signed."""
+        self.assertEqual(self.check('{path}: digests OK\n'.format(path=self.PATH)),
+                         SIGNATURE_STATUSES.UNSIGNED)
+
+    def test_signed(self):
+        """Test that the signatures reported by recent and old versions of rpm are found."""
+        for status in ('digests signatures OK', 'sha1 md5 gpg OK', 'rsa sha1 (md5) pgp md5 OK'):
+            with self.subTest(status=status):
+                output = '{path}: {status}\n'.format(path=self.PATH, status=status)
+                self.assertEqual(self.check(output), SIGNATURE_STATUSES.SIGNED)
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from pulpcore.plugin.models import Artifact
+from pulpcore.plugin.stages import DeclarativeContent
+
+from pulp_rpm.app.constants import CAPABILITY_KINDS
+from pulp_rpm.app.models import Package, UpdateRecord
+from pulp_rpm.app.tasks.synchronizing import RpmContentSaver
+from pulp_rpm.app.tasks.upload import one_shot_upload
+from pulp_rpm.app.viewsets import PackageFilter, UpdateRecordFilter
+
+
+def package_fields(name, provides, requires, files):
+    """Build the fields of a package."""
+    return {
+        'name': name, 'epoch': '0', 'version': '1.0', 'release': '1', 'arch': 'noarch',
+        'pkgId': name, 'checksum_type': 'sha256', 'provides': provides, 'requires': requires,
+        'files': files, 'location_href': '{name}-1.0-1.noarch.rpm'.format(name=name),
+    }
+
+
+class TestPackageFilter(TestCase):
+    """Test filtering packages by their capabilities."""
+
+    def setUp(self):
+        """Upload a package and sync another one."""
+        self.media_root = tempfile.TemporaryDirectory()
+        media_root = override_settings(MEDIA_ROOT=self.media_root.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.addCleanup(self.media_root.cleanup)
+
+        self.uploaded = self.upload(package_fields(
+            'uploaded', provides=[['webserver', None, None, None, None, False]],
+            requires=[['glibc', None, None, None, None, True]],
+            files=[[None, '/usr/bin/', 'uploaded']],
+        ))
+        self.synced = self.sync(package_fields(
+            'synced', provides=[['webserver', None, None, None, None, False]],
+            requires=[['openssl', None, None, None, None, False]],
+            files=[[None, '/usr/bin/', 'synced']],
+        ))
+
+    def upload(self, fields):
+        """Upload a package with the given fields."""
+        path = os.path.join(self.media_root.name, 'uploaded.rpm')
+        with open(path, 'wb') as rpm:
+            rpm.write(b'uploaded')
+        artifact = Artifact.init_and_validate(path)
+        artifact.save()
+
+        with mock.patch('pulp_rpm.app.tasks.upload._prepare_package', return_value=fields), \
+                mock.patch('pulp_rpm.app.tasks.upload.CreatedResource'):
+            one_shot_upload(artifact.pk, fields['location_href'])
+        return Package.objects.get(pkgId=fields['pkgId'])
+
+    def sync(self, fields):
+        """Save a package with the given fields like the content saver of a sync does."""
+        package = Package(**fields)
+        batch = [DeclarativeContent(content=package)]
+        saver = RpmContentSaver()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(saver._pre_save(batch))
+            package.save()
+            loop.run_until_complete(saver._post_save(batch))
+        finally:
+            loop.close()
+        return package
+
+    def filter(self, **data):
+        """Filter the packages."""
+        return set(PackageFilter(data, queryset=Package.objects.all()).qs)
+
+    def test_capabilities(self):
+        """Test that the capabilities of uploaded and synced packages are saved."""
+        self.assertEqual(
+            sorted(self.uploaded.capabilities.values_list('kind', 'name')),
+            [(CAPABILITY_KINDS.FILE, '/usr/bin/uploaded'),
+             (CAPABILITY_KINDS.PROVIDES, 'webserver'),
+             (CAPABILITY_KINDS.REQUIRES, 'glibc')]
+        )
+        self.assertEqual(
+            sorted(self.synced.capabilities.values_list('kind', 'name')),
+            [(CAPABILITY_KINDS.FILE, '/usr/bin/synced'),
+             (CAPABILITY_KINDS.PROVIDES, 'webserver'),
+             (CAPABILITY_KINDS.REQUIRES, 'openssl')]
+        )
+
+    def test_provides(self):
+        """Test filtering the packages providing a capability."""
+        self.assertEqual(self.filter(provides='webserver'), {self.uploaded, self.synced})
+        self.assertEqual(self.filter(provides='glibc'), set())
+
+    def test_requires(self):
+        """Test filtering the packages requiring a capability."""
+        self.assertEqual(self.filter(requires='glibc'), {self.uploaded})
+        self.assertEqual(self.filter(requires='openssl'), {self.synced})
+        self.assertEqual(self.filter(requires='webserver'), set())
+
+    def test_file(self):
+        """Test filtering the packages containing a file by its full path."""
+        self.assertEqual(self.filter(file='/usr/bin/synced'), {self.synced})
+        self.assertEqual(self.filter(file='synced'), set())
+
+    def test_combined(self):
+        """Test that the capability filters are combined with each other."""
+        self.assertEqual(self.filter(provides='webserver', requires='openssl'), {self.synced})
+        self.assertEqual(self.filter(provides='webserver', file='/usr/bin/uploaded'),
+                         {self.uploaded})
+
+
+class TestUpdateRecordFilter(TestCase):
+    """Test filtering advisories by their dates."""
+
+    def setUp(self):
+        """Create advisories issued and updated on different days."""
+        self.first = self.update_record('RHBA-1', issued=1, updated=10)
+        self.second = self.update_record('RHBA-2', issued=2, updated=20)
+        self.undated = self.update_record('RHBA-3', issued=None, updated=None)
+
+    def update_record(self, advisory_id, issued, updated):
+        """Create an advisory issued and updated on days of January 2019."""
+        def day(number):
+            return None if number is None else datetime(2019, 1, number, tzinfo=timezone.utc)
+
+        return UpdateRecord.objects.create(id=advisory_id, digest=advisory_id,
+                                           issued_date=day(issued), updated_date=day(updated))
+
+    def filter(self, **data):
+        """Filter the advisories."""
+        return set(UpdateRecordFilter(data, queryset=UpdateRecord.objects.all()).qs)
+
+    def test_gte(self):
+        """Test filtering the advisories issued or updated on or after a date."""
+        self.assertEqual(self.filter(issued_date__gte='2019-01-02 00:00:00'), {self.second})
+        self.assertEqual(self.filter(updated_date__gte='2019-01-10 00:00:00'),
+                         {self.first, self.second})
+
+    def test_lt(self):
+        """Test filtering the advisories issued or updated before a date."""
+        self.assertEqual(self.filter(issued_date__lt='2019-01-02 00:00:00'), {self.first})
+        self.assertEqual(self.filter(updated_date__lt='2019-01-10 00:00:00'), set())
+
+    def test_range(self):
+        """Test filtering the advisories issued or updated within a range of dates."""
+        self.assertEqual(
+            self.filter(issued_date__range='2019-01-01 00:00:00,2019-01-01 23:59:59'),
+            {self.first}
+        )
+        self.assertEqual(
+            self.filter(updated_date__range='2019-01-05 00:00:00,2019-01-25 00:00:00'),
+            {self.first, self.second}
+        )
@@ -0,0 +1,97 @@
+import bz2
+import hashlib
+import os
+import sqlite3
+import tempfile
+
+import createrepo_c as cr
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from pulp_rpm.app.constants import COMPRESSION_TYPES
+from pulp_rpm.app.models import Package
+from pulp_rpm.app.tasks.writers import SQLITE_DB_VERSION, ZCHUNK_SPLIT, MetadataWriter
+
+
+class WorkingDirectoryMixin:
+    """Run each test in a temporary working directory, like the publish tasks."""
+
+    def setUp(self):
+        """Change to a temporary directory."""
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        """Change back and remove the directory."""
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+
+class TestMetadataWriter(WorkingDirectoryMixin, TestCase):
+    """Test writing metadata files in worker processes."""
+
+    def test_round_trip(self):
+        """Test that the XML file and its sqlite database are written and described."""
+        package = Package(
+            name='foo', epoch='0', version='1.0', release='1', arch='noarch', pkgId='abc123',
+            checksum_type='sha256', summary='summary', description='description', url='',
+            location_href='foo-1.0-1.noarch.rpm'
+        )
+        writer = MetadataWriter('primary', num_of_pkgs=1, sqlite_metadata=True,
+                                compression=COMPRESSION_TYPES.GZ,
+                                sqlite_compression=COMPRESSION_TYPES.BZ2)
+        writer.add_chunk(cr.xml_dump_primary(package.to_createrepo_c()))
+        xml_record, db_record = writer.close()
+
+        self.assertEqual((xml_record['type'], db_record['type']), ('primary', 'primary_db'))
+        self.assertEqual(db_record['db_ver'], SQLITE_DB_VERSION)
+        for record in (xml_record, db_record):
+            path = os.path.basename(record['location_href'])
+            with open(path, 'rb') as metadata_file:
+                data = metadata_file.read()
+            self.assertEqual(hashlib.sha256(data).hexdigest(), record['checksum'])
+            self.assertEqual(len(data), record['size'])
+            self.assertTrue(path.startswith(record['checksum']))
+
+        with open(os.path.basename(db_record['location_href']), 'rb') as compressed:
+            with open('primary.sqlite', 'wb') as db_file:
+                db_file.write(bz2.decompress(compressed.read()))
+        db = sqlite3.connect('primary.sqlite')
+        try:
+            self.assertEqual(db.execute('SELECT pkgId, name FROM packages').fetchall(),
+                             [('abc123', 'foo')])
+            self.assertEqual(db.execute('SELECT checksum FROM db_info').fetchone()[0],
+                             xml_record['checksum'])
+        finally:
+            db.close()
+
+    def test_error(self):
+        """Test that an error of the worker is reported with its traceback."""
+        writer = MetadataWriter('primary', num_of_pkgs=1)
+        writer.add_chunk(None)
+        with self.assertRaisesRegex(RuntimeError, 'Traceback'):
+            writer.close()
+
+
+class TestZchunkSplit(TestCase):
+    """Test the string the chunks of zchunk metadata start with."""
+
+    def test_package_entries(self):
+        """Test that chunks start at package entries only, not at packager elements."""
+        for entry in ('<package type="rpm">', '<package pkgid="abc123" name="foo">'):
+            self.assertTrue(entry.startswith(ZCHUNK_SPLIT))
+        for element in ('<packager>Packager</packager>', '<rpm:packager>Packager</rpm:packager>'):
+            self.assertNotIn(ZCHUNK_SPLIT, element)
+
+
+class TestMetadataWriterConnection(WorkingDirectoryMixin, TransactionTestCase):
+    """Test that the worker processes don't share the database connection."""
+
+    def test_closed(self):
+        """Test that the connection is closed before forking, and reopened afterwards."""
+        Package.objects.exists()
+        writer = MetadataWriter('updateinfo')
+        self.assertIsNone(connection.connection)
+        writer.close()
+        self.assertFalse(Package.objects.exists())